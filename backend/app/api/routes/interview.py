@@ -1,90 +1,166 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from app.models.schemas import (
-    DocumentUploadRequest, DocumentResponse, StartInterviewRequest,
+    DocumentUploadRequest, DocumentResponse, IngestionJobResponse, StartInterviewRequest,
     InterviewSession, QuestionResponse, AnswerRequest, AnswerResponse,
     InterviewReport, ChatRequest, ChatResponse
 )
-from app.services.document_service import document_parser
-from app.services.llm_service import vector_store
+from app.services.document_service import document_parser, UploadTooLargeError
+from app.services.llm_service import glm4_service, vector_store
+from app.services.llm_scheduler import Priority
 from app.services.interview_service import interview_engine
-from app.models.database import get_db, Document as DocumentModel
+from app.services.ingestion_queue import ingestion_queue
+from app.services.content_registry import content_registry
+from app.models.database import get_db, Document as DocumentModel, IngestionJob
+from app.core.config import get_settings
 from sqlalchemy.orm import Session
+import json
+import os
 import uuid
-from datetime import datetime
 
+settings = get_settings()
 router = APIRouter()
 
 
-@router.post("/documents/upload", response_model=DocumentResponse)
+@router.post("/documents/upload", response_model=DocumentResponse, status_code=202)
 async def upload_document(
     file: UploadFile = File(...),
     title: str = Form(...),
     description: Optional[str] = Form(None),
     db: Session = Depends(get_db)
 ):
-    """上传并解析文档"""
+    """上传文档（保存后立即返回，解析和入库在后台进行，进度见 /documents/{id}/status）"""
+    if not ingestion_queue.has_capacity(db):
+        raise HTTPException(status_code=503, detail="文档处理队列已满，请稍后重试")
+    
     try:
         # Save file
-        file_id, file_path, file_type, original_name = await document_parser.save_upload(file)
-        
-        # Create document record
-        doc_record = DocumentModel(
-            id=file_id,
-            title=title,
-            description=description,
-            file_type=file_type.value,
-            file_path=file_path,
-            status="processing"
-        )
-        db.add(doc_record)
-        db.commit()
-        
-        # Parse document
-        content = await document_parser.parse_document(file_path, file_type)
+        file_id, file_path, file_type, original_name, content_hash = await document_parser.save_upload(file)
         
-        # Chunk content
-        chunks = document_parser.chunk_text(content)
-        
-        # Store in vector database
-        documents = [chunk['text'] for chunk in chunks]
-        metadatas = [{
-            'source': original_name,
-            'document_id': file_id,
-            'chunk_index': i,
-            'created_at': datetime.now().isoformat()
-        } for i in range(len(chunks))]
-        
-        await vector_store.add_documents(
-            collection_name=file_id,
-            documents=documents,
-            metadatas=metadatas
-        )
+        for _ in range(3):
+            # 相同内容已入库（或正在入库）：关联已有分块，不再解析和Embedding
+            record = content_registry.lookup(db, "document", content_hash)
+            if record is not None:
+                linked = await _link_document(db, record, file_id, title, description, file_type, file_path)
+                if linked is not None:
+                    return linked
+            
+            # Create document record（与内容登记同一事务，并发上传同一文件时只有一个成功，其余关联到它）
+            doc_record = DocumentModel(
+                id=file_id,
+                title=title,
+                description=description,
+                file_type=file_type.value,
+                file_path=file_path,
+                content_id=file_id,
+                status="processing"
+            )
+            db.add(doc_record)
+            record = content_registry.register(
+                db, "document", content_hash,
+                content_id=file_id, file_path=file_path, file_size=os.path.getsize(file_path)
+            )
+            if record is None or record.content_id == file_id:
+                break
+        else:
+            raise Exception("相同内容的文档正在被并发上传和删除，请稍后重试")
         
-        # Update record
-        doc_record.status = "completed"
-        doc_record.chunk_count = len(chunks)
-        doc_record.updated_at = datetime.now()
-        db.commit()
+        job = ingestion_queue.submit(db, file_id, file_path, file_type.value, original_name, content_hash)
         
         return DocumentResponse(
             id=file_id,
             title=title,
             description=description,
             file_type=file_type,
-            status="completed",
+            status="processing",
             created_at=doc_record.created_at,
-            chunk_count=len(chunks)
+            chunk_count=0,
+            job_id=job.id
         )
         
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         import traceback
-        error_msg = f"文档处理失败: {str(e)}"
+        error_msg = f"文档上传失败: {str(e)}"
         print(f"[ERROR] {error_msg}")
         print(f"[ERROR] Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=error_msg)
 
 
+async def _link_document(db: Session, record, file_id, title, description, file_type, file_path):
+    """创建关联到已有分块的文档记录；已有分块的文档都已删除时返回 None（重新入库）"""
+    shared = content_registry.documents_for(db, record.content_id)
+    if not shared:
+        content_registry.forget(db, record.content_id)
+        return None
+    
+    # 重复的文件不再保留
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+    
+    source = shared[0]
+    doc_record = DocumentModel(
+        id=file_id,
+        title=title,
+        description=description,
+        file_type=file_type.value,
+        file_path=record.file_path or source.file_path,
+        content_id=record.content_id,
+        status=source.status,
+        chunk_count=source.chunk_count
+    )
+    db.add(doc_record)
+    db.commit()
+    
+    job = _latest_job(db, record.content_id)
+    return DocumentResponse(
+        id=file_id,
+        title=title,
+        description=description,
+        file_type=file_type,
+        status=doc_record.status,
+        created_at=doc_record.created_at,
+        chunk_count=doc_record.chunk_count or 0,
+        job_id=job.id if job else None
+    )
+
+
+def _latest_job(db: Session, content_id: str) -> Optional[IngestionJob]:
+    return db.query(IngestionJob).filter(
+        IngestionJob.document_id == content_id
+    ).order_by(IngestionJob.created_at.desc()).first()
+
+
+@router.get("/documents/{document_id}/status", response_model=IngestionJobResponse)
+async def get_document_status(document_id: str, db: Session = Depends(get_db)):
+    """获取文档入库进度（最近一次任务；关联已有分块的文档返回原入库任务）"""
+    doc = db.query(DocumentModel).filter(DocumentModel.id == document_id).first()
+    job = _latest_job(db, (doc.content_id if doc else None) or document_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="入库任务不存在")
+    
+    return IngestionJobResponse(
+        job_id=job.id,
+        document_id=document_id,
+        status=job.status,
+        stage=job.stage,
+        pages_parsed=job.pages_parsed or 0,
+        pages_total=job.pages_total or 0,
+        chunks_embedded=job.chunks_embedded or 0,
+        chunks_indexed=job.chunks_indexed or 0,
+        chunks_total=job.chunks_total or 0,
+        attempts=job.attempts or 0,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        finished_at=job.finished_at
+    )
+
+
 @router.get("/documents", response_model=List[DocumentResponse])
 async def list_documents(db: Session = Depends(get_db)):
     """获取文档列表"""
@@ -110,8 +186,17 @@ async def delete_document(document_id: str, db: Session = Depends(get_db)):
     if not doc:
         raise HTTPException(status_code=404, detail="文档不存在")
     
-    # Delete from vector store
-    await vector_store.delete_collection(document_id)
+    # 没有其他文档共用分块时才从向量库删除
+    content_id = doc.content_id or doc.id
+    if all(d.id == doc.id for d in content_registry.documents_for(db, content_id)):
+        await vector_store.delete_documents(settings.DOCUMENT_COLLECTION, {"document_id": content_id})
+        
+        # 排队中的任务一并删除，处理中的任务完成时会清理分块
+        db.query(IngestionJob).filter(
+            IngestionJob.document_id == content_id,
+            IngestionJob.status == "queued"
+        ).delete(synchronize_session=False)
+        content_registry.forget(db, content_id)
     
     # Delete from database
     db.delete(doc)
@@ -121,14 +206,19 @@ async def delete_document(document_id: str, db: Session = Depends(get_db)):
 
 
 @router.post("/interview/start")
-async def start_interview(request: StartInterviewRequest):
+async def start_interview(request: StartInterviewRequest, db: Session = Depends(get_db)):
     """开始面试会话"""
     try:
+        # 文档id -> 向量库中分块所属的 content_id（重复上传的文档共用分块）
+        knowledge_base_ids, knowledge_base_weights = content_registry.resolve(
+            db, request.knowledge_base_ids, request.knowledge_base_weights
+        )
         result = await interview_engine.start_interview(
             mode=request.mode,
-            knowledge_base_ids=request.knowledge_base_ids,
+            knowledge_base_ids=knowledge_base_ids,
             candidate_info=request.candidate_info,
-            duration_minutes=request.duration_minutes
+            duration_minutes=request.duration_minutes,
+            knowledge_base_weights=knowledge_base_weights
         )
         return result
     except Exception as e:
@@ -219,34 +309,53 @@ async def end_interview(session_id: str):
         raise HTTPException(status_code=500, detail=f"结束面试失败: {str(e)}")
 
 
+def _sse_event(payload: dict) -> str:
+    """编码一条Server-Sent Events消息"""
+    return f"data: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+
+def _sse_response(events) -> StreamingResponse:
+    """包装SSE流式响应（关闭代理缓冲）"""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _build_chat_messages(request: ChatRequest):
+    """检索上下文并构建开放式对话的消息列表"""
+    # Retrieve context if available
+    session = interview_engine.sessions.get(request.session_id)
+    contexts = []
+    if session and session.get('knowledge_base_ids'):
+        results = await vector_store.search_documents(
+            document_ids=session['knowledge_base_ids'],
+            query=request.message,
+            top_k=3,
+            weights=session.get('knowledge_base_weights')
+        )
+        contexts = [r['document'] for r in results]
+    
+    # Build messages
+    messages = [
+        {"role": "system", "content": "你是一位专业的面试官，正在进行开放式面试。请根据候选人的回答进行深入追问。"}
+    ]
+    
+    # Add context if available
+    if contexts:
+        context_text = "\n\n".join(contexts)
+        messages.append({"role": "system", "content": f"相关知识：{context_text}"})
+    
+    messages.append({"role": "user", "content": request.message})
+    return messages, contexts
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """开放式对话（用于开放式面试模式）"""
     try:
-        from app.services.llm_service import glm4_service
-        
-        # Retrieve context if available
-        session = interview_engine.sessions.get(request.session_id)
-        contexts = []
-        if session and session.get('knowledge_base_ids'):
-            results = await vector_store.search(
-                collection_name=session['knowledge_base_ids'][0],
-                query=request.message,
-                top_k=3
-            )
-            contexts = [r['document'] for r in results]
-        
-        # Build messages
-        messages = [
-            {"role": "system", "content": "你是一位专业的面试官，正在进行开放式面试。请根据候选人的回答进行深入追问。"}
-        ]
-        
-        # Add context if available
-        if contexts:
-            context_text = "\n\n".join(contexts)
-            messages.append({"role": "system", "content": f"相关知识：{context_text}"})
-        
-        messages.append({"role": "user", "content": request.message})
+        messages, contexts = await _build_chat_messages(request)
         
         # Generate response
         response = await glm4_service.chat_completion(messages)
@@ -260,19 +369,70 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail=f"对话失败: {str(e)}")
 
 
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """开放式对话（SSE流式输出）"""
+    async def events():
+        try:
+            messages, contexts = await _build_chat_messages(request)
+            if contexts:
+                yield _sse_event({"type": "context", "retrieved_contexts": contexts})
+            
+            chunks = []
+            async for delta in glm4_service.stream_chat_completion(messages):
+                chunks.append(delta)
+                yield _sse_event({"type": "delta", "content": delta})
+            
+            yield _sse_event({"type": "done", "message": "".join(chunks)})
+        except Exception as e:
+            yield _sse_event({"type": "error", "detail": f"对话失败: {str(e)}"})
+    
+    return _sse_response(events())
+
+
+@router.get("/interview/{session_id}/question/stream")
+async def get_question_stream(session_id: str):
+    """获取当前问题（SSE流式输出，开放式模式逐字生成追问）"""
+    if session_id not in interview_engine.sessions:
+        raise HTTPException(status_code=404, detail="会话不存在")
+    
+    async def events():
+        try:
+            found = False
+            async for event in interview_engine.stream_next_question(session_id):
+                if event['type'] == 'question':
+                    found = True
+                    yield _sse_event({"type": "question", "question": event['question'].model_dump()})
+                else:
+                    yield _sse_event(event)
+            if not found:
+                yield _sse_event({"type": "error", "detail": "没有更多问题"})
+            yield _sse_event({"type": "done"})
+        except Exception as e:
+            yield _sse_event({"type": "error", "detail": f"获取问题失败: {str(e)}"})
+    
+    return _sse_response(events())
+
+
 @router.post("/resume/parse")
-async def parse_resume(file: UploadFile = File(...)):
-    """解析简历文件并提取信息"""
+async def parse_resume(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """解析简历文件并提取信息（相同文件直接返回上次的解析结果）"""
     try:
         # Save uploaded file
-        file_id, file_path, file_type, original_name = await document_parser.save_upload(file)
+        file_id, file_path, file_type, original_name, content_hash = await document_parser.save_upload(file)
+        
+        record = content_registry.lookup(db, "resume", content_hash)
+        if record is not None and record.result is not None:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+            return record.result
         
         # Parse document content
         content = await document_parser.parse_document(file_path, file_type)
         
         # Use LLM to extract structured information from resume
-        from app.services.llm_service import glm4_service
-        
         prompt = f"""请从以下简历内容中提取关键信息，并以JSON格式返回：
 
 简历内容：
@@ -320,10 +480,11 @@ async def parse_resume(file: UploadFile = File(...)):
             {"role": "user", "content": prompt}
         ]
         
-        response = await glm4_service.chat_completion(messages, temperature=0.3)
+        response = await glm4_service.chat_completion(
+            messages, temperature=0.3, priority=Priority.RESUME
+        )
         
         # Parse JSON response
-        import json
         try:
             # Try to extract JSON from response
             json_start = response.find('{')
@@ -333,6 +494,12 @@ async def parse_resume(file: UploadFile = File(...)):
                 parsed_data = json.loads(json_str)
             else:
                 parsed_data = json.loads(response)
+            # 只缓存LLM成功提取的结果（并发解析同一文件时以先登记的为准）
+            record = content_registry.register(
+                db, "resume", content_hash, result=parsed_data, file_size=file.size or 0
+            )
+            if record is not None and record.result is not None:
+                parsed_data = record.result
         except json.JSONDecodeError:
             # If JSON parsing fails, return basic structure
             parsed_data = {
@@ -357,7 +524,6 @@ async def parse_resume(file: UploadFile = File(...)):
             }
         
         # Clean up uploaded file
-        import os
         try:
             os.remove(file_path)
         except:
@@ -365,6 +531,8 @@ async def parse_resume(file: UploadFile = File(...)):
         
         return parsed_data
         
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         import traceback
         print(f"[ERROR] 简历解析失败: {str(e)}")
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+
+from app.knowledge_base.vector_store import get_vector_store
+
+router = APIRouter()
+
+
+@router.get("/knowledge-base/stats")
+async def knowledge_base_stats():
+    """面试题库统计（总数、分类/难度/来源仓库分布）"""
+    return get_vector_store().get_stats()
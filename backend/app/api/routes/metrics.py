@@ -0,0 +1,38 @@
+from fastapi import APIRouter
+
+from app.services.llm_scheduler import get_llm_scheduler
+from app.services.llm_cache import get_llm_cache
+from app.services.singleflight import get_singleflight
+from app.services.embedding_cache import get_embedding_cache
+from app.services.retrieval_cache import get_retrieval_cache
+from app.services.vector_compression import get_compressed_index
+from app.services.llm_service import glm4_service, vector_store
+from app.core.config import get_settings
+
+settings = get_settings()
+
+router = APIRouter()
+
+
+@router.get("/metrics/llm")
+async def llm_metrics():
+    """LLM调用统计（调度队列深度、等待时间、缓存命中、请求合并、Embedding批处理与缓存）"""
+    return {
+        "scheduler": get_llm_scheduler().get_stats(),
+        "response_cache": get_llm_cache().get_stats(),
+        "singleflight": get_singleflight().get_stats(),
+        "embedding_batcher": glm4_service.get_embedding_batch_stats(),
+        "embedding_cache": get_embedding_cache().get_stats()
+    }
+
+
+@router.get("/metrics/retrieval")
+async def retrieval_metrics():
+    """检索结果缓存统计（命中率、失效次数），启用压缩层时附带其内存/磁盘占用"""
+    metrics = {
+        "retrieval_cache": get_retrieval_cache().get_stats()
+    }
+    if settings.VECTOR_COMPRESSION:
+        collection = vector_store.chroma.resolve(settings.DOCUMENT_COLLECTION)
+        metrics["compressed_index"] = get_compressed_index(collection).get_stats()
+    return metrics
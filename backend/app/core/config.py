@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -15,6 +15,25 @@ class Settings(BaseSettings):
     
     # ChromaDB
     CHROMA_DB_PATH: str = "./chroma_db"
+    CHROMA_COLLECTION_CACHE_SIZE: int = 64  # 缓存的集合句柄数
+    DOCUMENT_COLLECTION: str = "documents"  # 上传文档统一存放的集合（按 document_id 过滤）
+    COLLECTION_VERSIONS_KEEP: int = 2  # 蓝绿构建保留的旧版本数（用于回滚）
+    CHROMA_MODE: str = "embedded"  # embedded（每个进程一个 PersistentClient）/ http（多worker共享的 chromadb 服务）
+    CHROMA_HOST: str = "localhost"
+    CHROMA_PORT: int = 8001
+    CHROMA_HTTP_POOL_SIZE: int = 4  # http 模式下轮询使用的客户端数（每个客户端一个连接池）
+    CHROMA_WRITE_BATCH_SIZE: int = 1000  # 单次写入RPC的最大条数
+    
+    # 面试题mmap向量索引
+    QUESTION_INDEX_DIR: str = "./data/index/questions"
+    QUESTION_INDEX_DTYPE: str = "float32"  # float32 / float16（体积减半，检索稍慢）
+    
+    # 压缩向量层（只作用于 DOCUMENT_COLLECTION）
+    VECTOR_COMPRESSION: str = ""  # 空（关闭）/ int8 / pq
+    COMPRESSED_INDEX_DIR: str = "./data/index/compressed"
+    PQ_SUBSPACES: int = 64  # 每个向量的PQ码字节数
+    PQ_TRAIN_SIZE: int = 20000  # 训练量化器的样本数
+    COMPRESSION_RERANK_FACTOR: int = 4  # 粗排候选 = top_k * factor，再用原始向量精排
     
     # GLM-4 API
     GLM4_API_KEY: str = ""
@@ -22,6 +41,66 @@ class Settings(BaseSettings):
     GLM4_EMBEDDING_MODEL: str = "embedding-3"
     GLM4_BASE_URL: str = "https://open.bigmodel.cn/api/paas/v4"
     
+    # GLM-4 HTTP连接池
+    GLM4_HTTP2: bool = False  # 需要安装 h2
+    GLM4_POOL_MAX_CONNECTIONS: int = 50
+    GLM4_POOL_MAX_KEEPALIVE: int = 20
+    GLM4_KEEPALIVE_EXPIRY: float = 30.0
+    GLM4_CONNECT_TIMEOUT: float = 8.0
+    GLM4_TIMEOUT: float = 120.0
+    
+    # LLM调度（并发/限流/优先级）
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_BATCH_MAX_CONCURRENCY: int = 4  # 批量任务最多占用的并发数
+    LLM_MAX_QUEUE: int = 256
+    LLM_DEFAULT_RPS: float = 10.0  # 每个模型每秒请求数
+    LLM_MODEL_RPS: Dict[str, float] = {}  # 按模型覆盖，如 {"embedding-3": 20}
+    LLM_RATE_BURST: float = 10.0
+    
+    # LLM响应缓存（低温度调用默认启用）
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_TEMPERATURE: float = 0.3
+    LLM_CACHE_MAX_ENTRIES: int = 2048
+    LLM_CACHE_TTL: int = 7 * 24 * 3600
+    LLM_CACHE_DB_PATH: str = "./data/cache/llm_cache.sqlite3"
+    
+    # Embedding微批处理
+    EMBEDDING_BATCH_ENABLED: bool = True
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0
+    
+    # Embedding缓存（内存LRU + 磁盘向量文件）
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MEMORY_ENTRIES: int = 10000
+    EMBEDDING_CACHE_DIR: str = "./data/cache/embeddings"
+    EMBEDDING_CACHE_DTYPE: str = "float16"  # float16 / float32
+    
+    # 文档入库Embedding（批量并发）
+    EMBEDDING_INGEST_BATCH_SIZE: int = 64  # embedding-3 单次最多64条
+    EMBEDDING_INGEST_MAX_BATCH_CHARS: int = 16000
+    EMBEDDING_INGEST_CONCURRENCY: int = 4
+    EMBEDDING_INGEST_MAX_RETRIES: int = 3
+    EMBEDDING_INGEST_RETRY_BACKOFF: float = 0.5
+    
+    # 文件上传
+    UPLOAD_MAX_BYTES: int = 50 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 流式写盘的分块大小
+    CONTENT_DEDUP_ENABLED: bool = True  # 按文件 SHA-256 去重：重复文档复用已入库的分块，重复简历返回缓存的解析结果
+    
+    # PDF解析（进程池按页并行）
+    PDF_EXTRACT_WORKERS: int = 0  # 0 表示CPU核数
+    PDF_PAGES_PER_TASK: int = 8  # 每个任务的最大页数
+    PDF_PARALLEL_MIN_PAGES: int = 4  # 少于该页数时在当前进程内提取
+    
+    # 文档异步入库
+    INGESTION_WORKERS: int = 2  # 每个进程的入库并发数
+    INGESTION_MAX_QUEUED: int = 100  # 排队任务上限，超过时上传返回503
+    INGESTION_MAX_ATTEMPTS: int = 3  # 任务中断（进程退出）后的最多重试次数
+    INGESTION_JOB_STALE_SECONDS: int = 300  # running 任务超过该时间无进度更新视为中断
+    INGESTION_HEARTBEAT_INTERVAL: float = 60.0  # 处理中的任务定时刷新 updated_at（须小于 INGESTION_JOB_STALE_SECONDS）
+    INGESTION_POLL_INTERVAL: float = 5.0  # 轮询数据库的间隔（其他进程提交或中断的任务）
+    INGESTION_QUEUE_SIZE: int = 4  # 流式入库各阶段之间的队列长度（Embedding批次数）
+    
     # LlamaParse
     LLAMAPARSE_API_KEY: Optional[str] = None
     
@@ -32,6 +111,16 @@ class Settings(BaseSettings):
     # Retrieval Configuration
     TOP_K_RETRIEVAL: int = 5
     SIMILARITY_THRESHOLD: float = 0.7
+    RETRIEVAL_MODE: str = "vector"  # vector / lexical / hybrid（lexical/hybrid 需在每个 worker 内存中为检索过的集合保留完整的BM25索引）
+    HYBRID_CANDIDATES: int = 20  # 混合检索时每一路的候选数
+    RRF_K: int = 60
+    BM25_K1: float = 1.5
+    BM25_B: float = 0.75
+    LEXICAL_INDEX_MAX_COLLECTIONS: int = 32  # 内存中保留的词法索引数
+    COLLECTION_LOG_MAX_BYTES: int = 16 * 1024 * 1024  # 集合写入日志超过该大小时换新文件（词法索引全量重建一次）
+    RETRIEVAL_CACHE_ENABLED: bool = True
+    RETRIEVAL_CACHE_MAX_ENTRIES: int = 1024
+    RETRIEVAL_CACHE_TTL: int = 600
     
     class Config:
         env_file = ".env"
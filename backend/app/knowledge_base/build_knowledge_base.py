@@ -7,6 +7,7 @@
 import sys
 import json
 import logging
+from dataclasses import asdict
 from pathlib import Path
 from typing import Optional
 
@@ -16,8 +17,10 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from knowledge_base.github_sync import GitHubSyncManager
 from knowledge_base.markdown_parser import MarkdownParser, Question
 from knowledge_base.llm_enhancer import LLMEnhancer
-from knowledge_base.vector_store import VectorStore
-from services.llm_service import GLM4Service
+from knowledge_base.vector_store import VectorStore, VectorStoreManager
+from knowledge_base.question_index import QuestionIndex
+from services.llm_service import get_glm4_service
+from services.llm_scheduler import Priority
 
 logging.basicConfig(
     level=logging.INFO,
@@ -34,7 +37,8 @@ class KnowledgeBaseBuilder:
         self.parser = MarkdownParser()
         self.enhancer = LLMEnhancer()
         self.vector_store = VectorStore()
-        self.llm_service = GLM4Service()
+        self.vector_manager = VectorStoreManager()
+        self.llm_service = get_glm4_service()
         
         # 目录
         self.data_dir = Path("/home/fengxu/mylib/interview-agent/backend/data")
@@ -100,53 +104,51 @@ class KnowledgeBaseBuilder:
         logger.info("=" * 60)
     
     def _vectorize_and_store(self, questions: list):
-        """向量化并存储"""
+        """
+        向量化并存储
         
-        # 删除旧数据
-        logger.info("清理旧向量数据...")
-        self.vector_store.delete_collection()
-        self.vector_store = VectorStore()
+        复制当前版本到新版本集合后按 问题ID + 内容哈希 增量同步，校验通过再切换线上别名
+        """
+        import asyncio
         
-        # 分批处理
-        batch_size = 20
-        total = len(questions)
-        
-        for i in range(0, total, batch_size):
-            batch = questions[i:i+batch_size]
-            
-            # 准备数据
-            ids = []
-            texts = []
-            metadatas = []
-            
-            for q in batch:
-                embed_text = self.enhancer.generate_embedding_text(q)
-                
-                ids.append(q.id)
-                texts.append(embed_text)
-                metadatas.append({
-                    'category': q.category,
-                    'difficulty': q.difficulty,
-                    'tags': ','.join(q.tags[:5]),  # 限制标签数量
-                    'source_repo': q.source_repo,
-                    'question_text': q.text[:100],
-                    'has_code': len(q.code_examples) > 0
-                })
-            
-            # 生成向量
-            logger.info(f"生成向量 {i+1}-{min(i+batch_size, total)}/{total}")
-            try:
-                import asyncio
-                embeddings = asyncio.run(
-                    self.llm_service.generate_embeddings(texts)
-                )
-                
-                # 存储
-                self.vector_store.add_questions(ids, texts, embeddings, metadatas)
-                
-            except Exception as e:
-                logger.error(f"向量化失败: {e}")
-                continue
+        ids = []
+        texts = []
+        metadatas = []
+        
+        for q in questions:
+            ids.append(q.id)
+            texts.append(self.enhancer.generate_embedding_text(q))
+            metadatas.append({
+                'category': q.category,
+                'difficulty': q.difficulty,
+                'tags': ','.join(q.tags[:5]),  # 限制标签数量
+                'source_repo': q.source_repo,
+                'question_text': q.text[:100],
+                'has_code': len(q.code_examples) > 0
+            })
+        
+        def embed(batch_texts):
+            return asyncio.run(
+                self.llm_service.generate_embeddings(batch_texts, priority=Priority.BATCH)
+            )
+        
+        staging = self.vector_manager.create_version(copy_current=True)
+        stats = staging.sync_questions(ids, texts, metadatas, embed, batch_size=20)
+        logger.info(
+            f"向量库同步: 新增/更新 {stats['upserted']}, 删除 {stats['deleted']}, "
+            f"未变化 {stats['unchanged']}, 失败 {stats['failed']}"
+        )
+        if not self.vector_manager.promote(staging, expected_count=len(set(ids))):
+            return
+        
+        # 同步写入mmap面试题索引（QuestionGenerator使用）
+        embeddings = self.vector_store.get_embeddings(ids)
+        indexed = [q for q in questions if q.id in embeddings]
+        if indexed:
+            QuestionIndex.build(
+                [asdict(q) for q in indexed],
+                [embeddings[q.id] for q in indexed]
+            )
     
     def _print_stats(self, questions: list):
         """打印统计信息"""
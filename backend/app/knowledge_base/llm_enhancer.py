@@ -16,7 +16,8 @@ from markdown_parser import Question, CodeExample, parse_markdown_directory
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from services.llm_service import GLM4Service
+from services.llm_service import get_glm4_service
+from services.llm_scheduler import Priority
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -69,7 +70,7 @@ class LLMEnhancer:
     """LLM增强处理器"""
     
     def __init__(self, cache_dir: str = "/home/fengxu/mylib/interview-agent/backend/data/cache"):
-        self.llm = GLM4Service()
+        self.llm = get_glm4_service()
         self.cache_dir = cache_dir
         os.makedirs(cache_dir, exist_ok=True)
         self.cache = self._load_cache()
@@ -107,7 +108,9 @@ class LLMEnhancer:
         prompt = prompt_func(question, **kwargs)
         try:
             # 运行异步函数
-            result = asyncio.run(self.llm.chat_completion(prompt, temperature=0.3))
+            result = asyncio.run(self.llm.chat_completion(
+                prompt, temperature=0.3, priority=Priority.BATCH
+            ))
             self.cache[cache_key] = result
             return result
         except Exception as e:
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+面试题向量索引
+题库规模小且基本静态，不必每次检索都经过ChromaDB：
+- 归一化后的向量存为连续的 .npy 文件，以 mmap 方式加载，多个 uvicorn worker 共享同一份页缓存
+- 元数据为并行数组，标签/分类/难度建立倒排位图（按题目序号），
+  检索先用位图组合出候选集，再只在候选向量上做余弦 top-k
+
+构建（在 backend 目录下）:
+    python -m app.knowledge_base.question_index data/processed/enhanced_questions.json
+"""
+
+import os
+import json
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+VECTORS_FILE = "vectors.npy"
+META_FILE = "meta.json"
+
+
+def embedding_text(question: Dict) -> str:
+    """生成用于向量化的文本（与 LLMEnhancer.generate_embedding_text 一致）"""
+    return "\n".join([
+        f"问题: {question.get('text', '')}",
+        f"答案: {(question.get('answer') or '')[:1000]}",
+        f"分类: {question.get('category', '')}",
+        f"标签: {', '.join(question.get('tags', []))}"
+    ])
+
+
+def question_meta(question: Dict) -> Dict:
+    """索引中保留的元数据字段"""
+    return {
+        'id': question.get('id', ''),
+        'text': question.get('text', ''),
+        'category': question.get('category', ''),
+        'difficulty': int(question.get('difficulty', 3)),
+        'tags': list(question.get('tags', [])),
+        'followup_points': list(question.get('followup_points', [])),
+        'source_repo': question.get('source_repo', '')
+    }
+
+
+class MetadataIndex:
+    """标签/分类/难度倒排索引，每个取值对应一个按题目序号的位图（np.packbits）"""
+
+    def __init__(self, questions: List[Dict]):
+        self.size = len(questions)
+        postings: Dict[str, Dict[object, List[int]]] = {'tag': {}, 'category': {}, 'difficulty': {}}
+        for i, q in enumerate(questions):
+            postings['category'].setdefault(q.get('category', '').lower(), []).append(i)
+            postings['difficulty'].setdefault(int(q.get('difficulty', 3)), []).append(i)
+            for tag in set(t.lower() for t in q.get('tags', [])):
+                postings['tag'].setdefault(tag, []).append(i)
+
+        self.bitsets: Dict[str, Dict] = {
+            field: {value: self._bitset(ids) for value, ids in values.items()}
+            for field, values in postings.items()
+        }
+        self._keyword_cache: Dict[str, np.ndarray] = {}
+
+    def _bitset(self, ids: List[int]) -> np.ndarray:
+        bits = np.zeros(self.size, dtype=bool)
+        bits[ids] = True
+        return np.packbits(bits)
+
+    def all(self) -> np.ndarray:
+        return self._bitset(list(range(self.size)))
+
+    def none(self) -> np.ndarray:
+        return np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def get(self, field: str, value) -> np.ndarray:
+        """某个取值的位图（不存在时为空集）"""
+        if isinstance(value, str):
+            value = value.lower()
+        bitset = self.bitsets[field].get(value)
+        return bitset if bitset is not None else self.none()
+
+    def any_of(self, field: str, values) -> np.ndarray:
+        """多个取值的并集"""
+        result = self.none()
+        for value in values:
+            result = result | self.get(field, value)
+        return result
+
+    def difficulty_range(self, low: Optional[int], high: Optional[int]) -> np.ndarray:
+        return self.any_of('difficulty', [
+            d for d in self.bitsets['difficulty']
+            if (low is None or d >= low) and (high is None or d <= high)
+        ])
+
+    def keyword(self, keyword: str) -> np.ndarray:
+        """分类或标签包含关键词（子串匹配，只扫描词表，按关键词缓存）"""
+        keyword = keyword.lower()
+        result = self._keyword_cache.get(keyword)
+        if result is None:
+            result = self.none()
+            for field in ('category', 'tag'):
+                for value, bitset in self.bitsets[field].items():
+                    if keyword in value:
+                        result = result | bitset
+            self._keyword_cache[keyword] = result
+        return result
+
+    def to_ids(self, bitset: np.ndarray) -> np.ndarray:
+        """位图 -> 题目序号数组"""
+        return np.flatnonzero(np.unpackbits(bitset, count=self.size))
+
+
+class QuestionIndex:
+    """mmap加载的面试题向量索引"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or settings.QUESTION_INDEX_DIR
+        self.vectors: Optional[np.ndarray] = None
+        self.questions: List[Dict] = []
+        self.metadata_index: Optional[MetadataIndex] = None
+        self._loaded_version: Optional[Tuple[int, int]] = None  # 元数据文件的 (inode, mtime_ns)
+        self.reload_if_changed()
+
+    @property
+    def available(self) -> bool:
+        return self.vectors is not None and len(self.questions) > 0
+
+    def reload_if_changed(self) -> bool:
+        """
+        索引文件更新后重新加载（旧的mmap在替换后仍然有效）
+
+        build() 原子替换元数据文件，inode 随之变化，同一时间戳内的多次重建也能发现
+        """
+        meta_path = os.path.join(self.directory, META_FILE)
+        vectors_path = os.path.join(self.directory, VECTORS_FILE)
+        try:
+            st = os.stat(meta_path)
+        except OSError:
+            return False
+        version = (st.st_ino, st.st_mtime_ns)
+        if version == self._loaded_version:
+            return False
+
+        try:
+            vectors = np.load(vectors_path, mmap_mode='r')
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                questions = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"加载面试题索引失败: {e}")
+            return False
+        if vectors.ndim != 2 or vectors.shape[0] != len(questions):
+            # 构建过程中（向量已替换、元数据未替换），下次再加载
+            return False
+
+        self.vectors = vectors
+        self.questions = questions
+        self.metadata_index = MetadataIndex(questions)
+        self._loaded_version = version
+        logger.info(f"加载面试题索引: {len(questions)} 题, dim={vectors.shape[1]}, dtype={vectors.dtype}")
+        return True
+
+    def filter(
+        self,
+        categories: Optional[List[str]] = None,
+        min_difficulty: Optional[int] = None,
+        max_difficulty: Optional[int] = None,
+        tags_all: Optional[List[str]] = None,
+        tags_any: Optional[List[str]] = None,
+        exclude_tags: Optional[List[str]] = None,
+        keyword: Optional[str] = None
+    ) -> np.ndarray:
+        """
+        按元数据组合过滤条件（各条件之间为 AND），返回候选题目序号
+
+        Args:
+            categories: 分类（任一）
+            min_difficulty / max_difficulty: 难度范围
+            tags_all: 必须同时包含的标签
+            tags_any: 至少包含其一的标签
+            exclude_tags: 不能包含的标签
+            keyword: 分类或标签包含的关键词
+        """
+        index = self.metadata_index
+        bitset = index.all()
+        if categories:
+            bitset &= index.any_of('category', categories)
+        if min_difficulty is not None or max_difficulty is not None:
+            bitset &= index.difficulty_range(min_difficulty, max_difficulty)
+        for tag in tags_all or []:
+            bitset &= index.get('tag', tag)
+        if tags_any:
+            bitset &= index.any_of('tag', tags_any)
+        if exclude_tags:
+            bitset &= ~index.any_of('tag', exclude_tags)
+        if keyword:
+            bitset &= index.keyword(keyword)
+        return index.to_ids(bitset)
+
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        **filters
+    ) -> List[Dict]:
+        """
+        余弦相似度 top-k 检索（先按元数据过滤，只在候选向量上计算相似度）
+
+        Args:
+            query_embedding: 查询向量
+            top_k: 返回数量
+            **filters: 过滤条件，见 filter()
+
+        Returns:
+            题目元数据列表（附带 score）
+        """
+        if not self.available:
+            return []
+
+        candidates = self.filter(**filters) if any(v is not None for v in filters.values()) else None
+        if candidates is not None and candidates.size == 0:
+            return []
+
+        query = np.array(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        query = query.astype(self.vectors.dtype)
+        if candidates is None or candidates.size == len(self.questions):
+            candidates = np.arange(len(self.questions))
+            scores = (self.vectors @ query).astype(np.float32)
+        else:
+            scores = (self.vectors[candidates] @ query).astype(np.float32)
+
+        k = min(top_k, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [{**self.questions[candidates[i]], 'score': float(scores[i])} for i in top]
+
+    @staticmethod
+    def build(
+        questions: List[Dict],
+        embeddings: List[List[float]],
+        directory: Optional[str] = None,
+        dtype: Optional[str] = None
+    ) -> "QuestionIndex":
+        """写入索引文件（先写临时文件再原子替换，不影响正在读取的进程）"""
+        directory = directory or settings.QUESTION_INDEX_DIR
+        os.makedirs(directory, exist_ok=True)
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = (vectors / np.where(norms == 0, 1.0, norms)).astype(dtype or settings.QUESTION_INDEX_DTYPE)
+
+        vectors_path = os.path.join(directory, VECTORS_FILE)
+        with open(vectors_path + ".tmp", 'wb') as f:
+            np.save(f, np.ascontiguousarray(vectors))
+        os.replace(vectors_path + ".tmp", vectors_path)
+
+        meta_path = os.path.join(directory, META_FILE)
+        with open(meta_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump([question_meta(q) for q in questions], f, ensure_ascii=False)
+        os.replace(meta_path + ".tmp", meta_path)
+
+        logger.info(f"面试题索引已写入 {directory}: {vectors.shape[0]} 题, dtype={vectors.dtype}")
+        return QuestionIndex(directory)
+
+
+async def build_from_json(json_file: str, directory: Optional[str] = None) -> QuestionIndex:
+    """从增强后的题库JSON构建索引"""
+    from app.services.llm_scheduler import Priority
+    from app.services.llm_service import vector_store
+
+    with open(json_file, 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+    logger.info(f"加载 {len(questions)} 个问题，生成向量...")
+
+    embeddings = await vector_store.embed_documents(
+        [embedding_text(q) for q in questions],
+        priority=Priority.BATCH
+    )
+    return QuestionIndex.build(questions, embeddings, directory)
+
+
+# Global instance
+_question_index: Optional[QuestionIndex] = None
+
+
+def get_question_index() -> QuestionIndex:
+    """获取共享的面试题索引（索引文件更新后自动重新加载）"""
+    global _question_index
+    if _question_index is None:
+        _question_index = QuestionIndex()
+    else:
+        _question_index.reload_if_changed()
+    return _question_index
+
+
+if __name__ == "__main__":
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "data/processed/enhanced_questions.json"
+    index = asyncio.run(build_from_json(source))
+    print(f"索引题目数: {len(index.questions)}")
@@ -6,54 +6,130 @@
 
 import os
 import json
+import hashlib
 import logging
-from typing import List, Dict, Optional
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, List, Dict, Optional
 from pathlib import Path
 
-import chromadb
-from chromadb.config import Settings
+from app.core.config import get_settings
+from app.services.chroma_client import get_chroma_client
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# 配置
-CHROMA_DB_PATH = "/home/fengxu/mylib/interview-agent/backend/data/chroma_db"
-COLLECTION_NAME = "interview_questions"
+# 配置（与应用共用同一个ChromaDB目录和客户端）
+settings = get_settings()
+CHROMA_DB_PATH = settings.CHROMA_DB_PATH
+COLLECTION_NAME = "interview_questions"  # 线上别名，指向当前版本集合
+VERSION_PREFIX = f"{COLLECTION_NAME}_v"
+
+
+def content_hash(text: str, metadata: Dict) -> str:
+    """问题内容哈希（向量化文本 + 元数据），用于增量同步时判断是否变化"""
+    payload = json.dumps(
+        {"text": text, "metadata": {k: v for k, v in metadata.items() if k != "content_hash"}},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CollectionStats:
+    """集合元数据计数器（分类/难度/来源仓库），随写入维护，持久化在ChromaDB目录下"""
+    
+    FIELDS = {'category': 'unknown', 'difficulty': 3, 'source_repo': ''}  # 字段 -> 缺省值
+    
+    _locks: Dict[str, threading.Lock] = {}
+    _locks_guard = threading.Lock()
+    
+    def __init__(self, db_path: str, collection_name: str):
+        self.path = os.path.join(db_path, "collection_stats", f"{collection_name}.json")
+    
+    @contextmanager
+    def locked(self):
+        """读-改-写计数器期间持有的锁（进程内线程锁 + 跨进程文件锁）"""
+        with self._locks_guard:
+            lock = self._locks.setdefault(self.path, threading.Lock())
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with lock, open(f"{self.path}.lock", 'ab') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+    
+    @classmethod
+    def empty(cls) -> Dict:
+        return {'total': 0, **{field: {} for field in cls.FIELDS}}
+    
+    @classmethod
+    def apply(cls, counters: Dict, metadatas: List[Dict], sign: int = 1) -> Dict:
+        """累加（sign=1）或扣减（sign=-1）一批元数据"""
+        for metadata in metadatas:
+            metadata = metadata or {}
+            counters['total'] += sign
+            for field, default in cls.FIELDS.items():
+                key = str(metadata.get(field, default))
+                count = counters[field].get(key, 0) + sign
+                if count > 0:
+                    counters[field][key] = count
+                else:
+                    counters[field].pop(key, None)
+        return counters
+    
+    def load(self) -> Optional[Dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def save(self, counters: Dict):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(counters, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+    
+    def delete(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
 
 
 class VectorStore:
     """向量数据库存储管理器"""
     
-    def __init__(self, db_path: str = CHROMA_DB_PATH):
+    def __init__(self, db_path: str = CHROMA_DB_PATH, collection_name: str = COLLECTION_NAME):
         self.db_path = db_path
-        os.makedirs(db_path, exist_ok=True)
-        
-        # 初始化ChromaDB
-        self.client = chromadb.PersistentClient(
-            path=db_path,
-            settings=Settings(
-                anonymized_telemetry=False
-            )
-        )
+        self.collection_name = collection_name
         
-        # 获取或创建集合
-        self.collection = self._get_or_create_collection()
+        # 进程内共享的ChromaDB客户端
+        self.manager = get_chroma_client(db_path)
+        self.client = self.manager.client
+    
+    @property
+    def collection(self):
+        """集合句柄（由共享客户端缓存，别名切换后自动指向新版本）"""
+        return self._get_or_create_collection()
     
     def _get_or_create_collection(self):
-        """获取或创建集合"""
-        try:
-            # 尝试获取已有集合
-            collection = self.client.get_collection(name=COLLECTION_NAME)
-            logger.info(f"使用已有集合: {COLLECTION_NAME}")
-            return collection
-        except:
-            # 创建新集合
-            collection = self.client.create_collection(
-                name=COLLECTION_NAME,
-                metadata={"description": "后端面试题向量库"}
-            )
-            logger.info(f"创建新集合: {COLLECTION_NAME}")
-            return collection
+        """获取或创建集合（COLLECTION_NAME 为别名时解析到当前版本）"""
+        return self.manager.get_collection(
+            self.collection_name,
+            metadata={"description": "后端面试题向量库"}
+        )
     
     def add_questions(self, 
                      question_ids: List[str],
@@ -76,11 +152,91 @@ class VectorStore:
                 embeddings=embeddings,
                 metadatas=metadatas
             )
+            self._update_stats(added=metadatas)
             logger.info(f"成功添加 {len(question_ids)} 个问题到向量库")
         except Exception as e:
             logger.error(f"添加问题失败: {e}")
             raise
     
+    def sync_questions(self,
+                       question_ids: List[str],
+                       texts: List[str],
+                       metadatas: List[Dict],
+                       embed_fn: Callable[[List[str]], List[List[float]]],
+                       batch_size: int = 50) -> Dict[str, int]:
+        """
+        增量同步问题到向量库（按 问题ID + 内容哈希 对比）
+        
+        未变化的问题跳过；新增/变化的问题重新向量化后 upsert；不在本次列表中的问题删除。
+        同步过程中集合始终可检索。
+        
+        Args:
+            question_ids: 问题ID列表
+            texts: 问题文本列表
+            metadatas: 元数据列表
+            embed_fn: 向量化函数（文本列表 -> 向量列表）
+            batch_size: 每批向量化数量
+            
+        Returns:
+            统计 {'unchanged', 'upserted', 'deleted', 'failed'}
+        """
+        # 同一ID以最后一次出现为准
+        records = {}
+        for qid, text, metadata in zip(question_ids, texts, metadatas):
+            metadata = {**metadata, 'content_hash': content_hash(text, metadata)}
+            records[qid] = (text, metadata)
+        
+        existing = self.collection.get(include=["metadatas"])
+        existing_metadatas = dict(zip(existing['ids'], existing['metadatas']))
+        existing_hashes = {
+            qid: (metadata or {}).get('content_hash')
+            for qid, metadata in existing_metadatas.items()
+        }
+        
+        changed = [qid for qid, (_, metadata) in records.items()
+                   if existing_hashes.get(qid) != metadata['content_hash']]
+        removed = [qid for qid in existing_hashes if qid not in records]
+        stats = {
+            'unchanged': len(records) - len(changed),
+            'upserted': 0,
+            'deleted': len(removed),
+            'failed': 0
+        }
+        logger.info(f"增量同步: {len(changed)} 个新增/变化, {len(removed)} 个删除, {stats['unchanged']} 个未变化")
+        
+        if removed:
+            self.collection.delete(ids=removed)
+            self._update_stats(removed=[existing_metadatas[qid] for qid in removed])
+        
+        for i in range(0, len(changed), batch_size):
+            batch_ids = changed[i:i+batch_size]
+            batch_texts = [records[qid][0] for qid in batch_ids]
+            try:
+                embeddings = embed_fn(batch_texts)
+                self.collection.upsert(
+                    ids=batch_ids,
+                    documents=batch_texts,
+                    embeddings=embeddings,
+                    metadatas=[records[qid][1] for qid in batch_ids]
+                )
+                self._update_stats(
+                    added=[records[qid][1] for qid in batch_ids],
+                    removed=[existing_metadatas[qid] for qid in batch_ids if qid in existing_metadatas]
+                )
+                stats['upserted'] += len(batch_ids)
+                logger.info(f"向量化 {i+1}-{i+len(batch_ids)}/{len(changed)}")
+            except Exception as e:
+                # 未写入哈希，下次同步时会重试
+                stats['failed'] += len(batch_ids)
+                logger.error(f"向量化失败: {e}")
+        
+        return stats
+    
+    def get_embeddings(self, question_ids: List[str]) -> Dict[str, List[float]]:
+        """按ID获取已存储的向量"""
+        results = self.collection.get(ids=question_ids, include=["embeddings"])
+        return dict(zip(results['ids'], results['embeddings']))
+    
     def search_similar(self, 
                       query_embedding: List[float],
                       n_results: int = 5,
@@ -151,32 +307,53 @@ class VectorStore:
     def delete_collection(self):
         """删除整个集合（慎用）"""
         try:
-            self.client.delete_collection(name=COLLECTION_NAME)
-            logger.info(f"删除集合: {COLLECTION_NAME}")
+            self._stats().delete()
+            self.manager.delete_collection(self.collection_name)
+            logger.info(f"删除集合: {self.collection_name}")
         except Exception as e:
             logger.error(f"删除集合失败: {e}")
     
+    def _stats(self) -> CollectionStats:
+        """当前实际集合（别名解析后）的计数器"""
+        return CollectionStats(self.db_path, self.manager.resolve(self.collection_name))
+    
+    def _update_stats(self, added: Optional[List[Dict]] = None, removed: Optional[List[Dict]] = None):
+        """写入/删除后更新计数器（计数器不存在时跳过，读取时再重建）"""
+        stats = self._stats()
+        with stats.locked():
+            counters = stats.load()
+            if counters is None:
+                return
+            CollectionStats.apply(counters, added or [], 1)
+            CollectionStats.apply(counters, removed or [], -1)
+            stats.save(counters)
+    
+    def _rebuild_stats(self) -> Dict:
+        """从元数据重建计数器（只读取元数据，不加载文档和向量）"""
+        stats = self._stats()
+        with stats.locked():
+            metadatas = self.collection.get(include=["metadatas"])['metadatas']
+            counters = CollectionStats.apply(CollectionStats.empty(), metadatas)
+            stats.save(counters)
+        return counters
+    
     def get_stats(self) -> Dict:
-        """获取统计信息"""
+        """获取统计信息（读取维护的计数器，与库内数量不一致时重建）"""
         try:
-            count = self.collection.count()
-            
-            # 获取各分类数量
-            categories = {}
-            all_data = self.collection.get()
-            
-            for metadata in all_data.get('metadatas', []):
-                cat = metadata.get('category', 'unknown')
-                categories[cat] = categories.get(cat, 0) + 1
+            counters = self._stats().load()
+            if counters is None or counters['total'] != self.collection.count():
+                counters = self._rebuild_stats()
             
             return {
-                'total_questions': count,
-                'categories': categories
+                'total_questions': counters['total'],
+                'categories': counters['category'],
+                'difficulties': counters['difficulty'],
+                'source_repos': counters['source_repo']
             }
             
         except Exception as e:
             logger.error(f"获取统计失败: {e}")
-            return {'total_questions': 0, 'categories': {}}
+            return {'total_questions': 0, 'categories': {}, 'difficulties': {}, 'source_repos': {}}
 
 
 class VectorStoreManager:
@@ -185,6 +362,20 @@ class VectorStoreManager:
     def __init__(self):
         self.vector_store = VectorStore()
     
+    @staticmethod
+    def _question_record(q: Dict):
+        """生成问题的 (ID, 嵌入文本, 元数据)"""
+        embed_text = f"问题: {q.get('text', '')}\n答案: {q.get('answer', '')[:500]}\n标签: {', '.join(q.get('tags', []))}"
+        metadata = {
+            'category': q.get('category', 'general'),
+            'difficulty': q.get('difficulty', 3),
+            'tags': ','.join(q.get('tags', [])),
+            'source_repo': q.get('source_repo', ''),
+            'question_text': q.get('text', '')[:200],
+            'has_code': len(q.get('code_examples', [])) > 0
+        }
+        return q.get('id'), embed_text, metadata
+    
     def import_from_json(self, json_file: str, embedding_service):
         """
         从JSON文件导入问题到向量库
@@ -209,20 +400,11 @@ class VectorStoreManager:
             texts = []
             metadatas = []
             
-            for q in batch:
-                # 生成嵌入文本
-                embed_text = f"问题: {q.get('text', '')}\n答案: {q.get('answer', '')[:500]}\n标签: {', '.join(q.get('tags', []))}"
-                
-                ids.append(q.get('id', f"q_{i}"))
+            for j, q in enumerate(batch):
+                qid, embed_text, metadata = self._question_record(q)
+                ids.append(qid or f"q_{i + j}")
                 texts.append(embed_text)
-                metadatas.append({
-                    'category': q.get('category', 'general'),
-                    'difficulty': q.get('difficulty', 3),
-                    'tags': ','.join(q.get('tags', [])),
-                    'source_repo': q.get('source_repo', ''),
-                    'question_text': q.get('text', '')[:200],
-                    'has_code': len(q.get('code_examples', [])) > 0
-                })
+                metadatas.append(metadata)
             
             # 生成向量
             logger.info(f"生成向量 {i+1}-{min(i+batch_size, len(questions))}/{len(questions)}")
@@ -233,26 +415,128 @@ class VectorStoreManager:
         
         logger.info("导入完成")
     
-    def rebuild_collection(self, json_file: str, embedding_service):
-        """重建整个集合"""
-        logger.info("重建向量库集合...")
+    def rebuild_collection(self, json_file: str, embedding_service, full: bool = False) -> bool:
+        """
+        蓝绿重建集合：写入新版本集合，校验通过后切换别名，线上检索不受影响
+        
+        默认复制当前版本后增量同步（只重新向量化新增/变化的问题）；full=True 时从空集合全量导入
+        """
+        with open(json_file, 'r', encoding='utf-8') as f:
+            questions = json.load(f)
+        records = [self._question_record(q) for q in questions]
+        ids = [qid or f"q_{i}" for i, (qid, _, _) in enumerate(records)]
+        
+        staging = self.create_version(copy_current=not full)
+        logger.info(f"{'全量构建' if full else '增量同步'}新版本集合: {staging.collection_name}")
+        stats = staging.sync_questions(
+            ids,
+            [text for _, text, _ in records],
+            [metadata for _, _, metadata in records],
+            embedding_service.generate_embeddings
+        )
+        logger.info(f"同步完成: {stats}")
+        
+        return self.promote(staging, expected_count=len(set(ids)))
+    
+    # ---------- 蓝绿版本管理 ----------
+    
+    def create_version(self, copy_current: bool = False) -> VectorStore:
+        """创建新的版本集合；copy_current=True 时复制当前线上版本的数据（含向量，不调用Embedding）"""
+        version = f"{VERSION_PREFIX}{datetime.now():%Y%m%d%H%M%S%f}"
+        staging = VectorStore(self.vector_store.db_path, collection_name=version)
+        staging._stats().save(CollectionStats.empty())
         
-        # 删除旧集合
-        self.vector_store.delete_collection()
+        if copy_current:
+            data = self.vector_store.collection.get(include=["documents", "metadatas", "embeddings"])
+            batch_size = 1000
+            for i in range(0, len(data['ids']), batch_size):
+                staging.add_questions(
+                    data['ids'][i:i+batch_size],
+                    data['documents'][i:i+batch_size],
+                    data['embeddings'][i:i+batch_size],
+                    data['metadatas'][i:i+batch_size]
+                )
+            logger.info(f"复制当前版本 {len(data['ids'])} 条到 {version}")
+        return staging
+    
+    def list_versions(self) -> List[str]:
+        """所有版本集合（从旧到新，未版本化的旧集合排在最前）"""
+        names = [c.name for c in self.vector_store.client.list_collections()]
+        versions = sorted(name for name in names if name.startswith(VERSION_PREFIX))
+        if COLLECTION_NAME in names:
+            versions.insert(0, COLLECTION_NAME)
+        return versions
+    
+    def current_version(self) -> str:
+        """当前线上版本"""
+        return self.vector_store.manager.resolve(COLLECTION_NAME)
+    
+    def validate(self, store: VectorStore, expected_count: int, samples: int = 5) -> bool:
+        """校验新版本：数量一致，且抽样问题能通过自身向量检索到自己"""
+        count = store.get_question_count()
+        if count == 0 or count != expected_count:
+            logger.error(f"版本校验失败: {store.collection_name} 数量 {count}，期望 {expected_count}")
+            return False
         
-        # 重新初始化
-        self.vector_store = VectorStore()
+        sample = store.collection.get(limit=samples, include=["embeddings"])
+        for qid, embedding in zip(sample['ids'], sample['embeddings']):
+            results = store.search_similar(embedding, n_results=3)
+            if qid not in [r['id'] for r in results]:
+                logger.error(f"版本校验失败: {store.collection_name} 抽样检索未命中 {qid}")
+                return False
+        return True
+    
+    def promote(self, store: VectorStore, expected_count: int) -> bool:
+        """校验通过后原子切换别名到新版本，并清理旧版本；校验失败则删除新版本"""
+        if not self.validate(store, expected_count):
+            store.delete_collection()
+            logger.error(f"新版本未上线，保持当前版本: {self.current_version()}")
+            return False
+        
+        self.vector_store.manager.set_alias(COLLECTION_NAME, store.collection_name)
+        logger.info(f"已切换到新版本: {store.collection_name}")
+        self.gc_versions()
+        return True
+    
+    def rollback(self) -> Optional[str]:
+        """回滚到上一个版本，返回回滚后的版本名"""
+        versions = self.list_versions()
+        current = self.current_version()
+        if current not in versions or versions.index(current) == 0:
+            logger.error("没有可回滚的旧版本")
+            return None
         
-        # 导入数据
-        self.import_from_json(json_file, embedding_service)
+        previous = versions[versions.index(current) - 1]
+        self.vector_store.manager.set_alias(COLLECTION_NAME, previous)
+        logger.info(f"已回滚到版本: {previous}")
+        return previous
+    
+    def gc_versions(self, keep: Optional[int] = None):
+        """删除旧版本，保留当前版本及之前 keep 个版本用于回滚（比当前新的版本可能正在构建，不删除）"""
+        keep = settings.COLLECTION_VERSIONS_KEEP if keep is None else keep
+        versions = self.list_versions()
+        current = self.current_version()
+        if current not in versions:
+            return
         
-        logger.info("重建完成")
+        older = versions[:versions.index(current)]
+        for name in older[:max(len(older) - keep, 0)]:
+            self.vector_store.manager.invalidate(name)
+            self.vector_store.client.delete_collection(name=name)
+            CollectionStats(self.vector_store.db_path, name).delete()
+            logger.info(f"清理旧版本: {name}")
 
 
 # 便捷函数
+_vector_store: Optional[VectorStore] = None
+
+
 def get_vector_store() -> VectorStore:
-    """获取向量库实例"""
-    return VectorStore()
+    """获取共享的向量库实例"""
+    global _vector_store
+    if _vector_store is None:
+        _vector_store = VectorStore()
+    return _vector_store
 
 
 if __name__ == "__main__":
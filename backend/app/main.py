@@ -3,8 +3,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.core.config import get_settings
-from app.api.routes import interview
-from app.models.database import Base, engine
+from app.api.routes import interview, knowledge_base, metrics
+from app.models.database import Base, engine, migrate_schema
+from app.services.llm_transport import close_glm4_transport
+from app.services.ingestion_queue import ingestion_queue
+from app.services.llm_service import glm4_service
+from app.services.pdf_extractor import get_pdf_extractor
 
 settings = get_settings()
 
@@ -17,12 +21,20 @@ async def lifespan(app: FastAPI):
     
     # Create database tables
     Base.metadata.create_all(bind=engine)
+    migrate_schema(engine)
     print("✅ Database tables created")
     
+    # 文档异步入库
+    await ingestion_queue.start()
+    
     yield
     
     # Shutdown
     print("👋 Shutting down...")
+    await ingestion_queue.stop()
+    get_pdf_extractor().shutdown()
+    await glm4_service.close()
+    await close_glm4_transport()
 
 
 app = FastAPI(
@@ -43,6 +55,8 @@ app.add_middleware(
 
 # 注册路由
 app.include_router(interview.router, prefix="/api/v1", tags=["interview"])
+app.include_router(knowledge_base.router, prefix="/api/v1", tags=["knowledge-base"])
+app.include_router(metrics.router, prefix="/api/v1", tags=["metrics"])
 
 
 @app.get("/")
@@ -1,10 +1,12 @@
-from sqlalchemy import create_engine, Column, String, DateTime, Text, Integer, Float, JSON
+import logging
+from sqlalchemy import create_engine, inspect, text, Column, String, DateTime, Text, Integer, Float, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 from app.core.config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 # Create engine
 engine = create_engine(settings.DATABASE_URL)
@@ -21,12 +23,54 @@ class Document(Base):
     description = Column(Text, nullable=True)
     file_type = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
+    content_id = Column(String, nullable=True, index=True)  # 向量库中分块所属的 document_id（内容相同的文档共用，为空时即本文档id）
     status = Column(String, default="processing")  # processing, completed, failed
     chunk_count = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
 
+class IngestionJob(Base):
+    """文档异步入库任务（持久化，服务重启后继续处理）"""
+    __tablename__ = "ingestion_jobs"
+    
+    id = Column(String, primary_key=True)
+    document_id = Column(String, nullable=False, index=True)
+    file_path = Column(String, nullable=False)
+    file_type = Column(String, nullable=False)
+    source = Column(String, nullable=True)  # 原始文件名
+    content_hash = Column(String, nullable=True, index=True)  # 文件 SHA-256
+    file_size = Column(Integer, default=0)
+    status = Column(String, default="queued", index=True)  # queued, running, completed, failed
+    stage = Column(String, default="queued")  # queued, parsing, embedding, indexing, done（流式入库时各阶段重叠，记录最早未完成的阶段）
+    pages_total = Column(Integer, default=0)
+    pages_parsed = Column(Integer, default=0)
+    chunks_total = Column(Integer, default=0)
+    chunks_embedded = Column(Integer, default=0)
+    chunks_indexed = Column(Integer, default=0)  # 已写入向量库（可检索）的分块数
+    attempts = Column(Integer, default=0)
+    worker = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class ContentRecord(Base):
+    """按文件内容哈希登记的处理结果（重复上传时直接复用）"""
+    __tablename__ = "content_registry"
+    
+    content_hash = Column(String, primary_key=True)  # 文件 SHA-256
+    kind = Column(String, primary_key=True)  # document, resume
+    content_id = Column(String, nullable=True, index=True)  # document：分块所属的 document_id
+    result = Column(JSON, nullable=True)  # resume：结构化解析结果
+    file_path = Column(String, nullable=True)
+    file_size = Column(Integer, default=0)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.now)
+    last_used_at = Column(DateTime, default=datetime.now)
+
+
 class InterviewSession(Base):
     __tablename__ = "interview_sessions"
     
@@ -69,6 +113,31 @@ class Answer(Base):
 
 
 # Dependency
+# 已有表上新增的列：create_all 只创建缺失的表，不会修改已存在的表，启动时按需补齐
+# (表, 列, 列定义, 是否建索引)
+ADDED_COLUMNS = [
+    ("documents", "content_id", "VARCHAR", True),
+    ("ingestion_jobs", "chunks_indexed", "INTEGER DEFAULT 0", False),
+]
+
+
+def migrate_schema(bind=engine):
+    """补齐已有表上缺少的列和索引（幂等，在 create_all 之后调用）"""
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+    # 多个 worker 同时启动时 PostgreSQL 靠 IF NOT EXISTS 避免重复添加报错
+    if_not_exists = "IF NOT EXISTS " if bind.dialect.name == "postgresql" else ""
+    with bind.begin() as conn:
+        for table, column, ddl, indexed in ADDED_COLUMNS:
+            if table not in tables:
+                continue
+            if column not in {c['name'] for c in inspector.get_columns(table)}:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {if_not_exists}{column} {ddl}"))
+                logger.info(f"数据库迁移: {table}.{column}")
+            if indexed:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_{column} ON {table} ({column})"))
+
+
 def get_db():
     db = SessionLocal()
     try:
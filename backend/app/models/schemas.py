@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Literal
+from typing import Dict, List, Optional, Literal
 from datetime import datetime
 from enum import Enum
 
@@ -29,11 +29,30 @@ class DocumentResponse(BaseModel):
     status: str
     created_at: datetime
     chunk_count: int = 0
+    job_id: Optional[str] = None  # 异步入库任务ID
+
+
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    document_id: str
+    status: str  # queued, running, completed, failed
+    stage: str  # queued, parsing, embedding, indexing, done
+    pages_parsed: int = 0
+    pages_total: int = 0
+    chunks_embedded: int = 0
+    chunks_indexed: int = 0
+    chunks_total: int = 0
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 
 class StartInterviewRequest(BaseModel):
     mode: InterviewMode = Field(default=InterviewMode.STRUCTURED, description="面试模式")
     knowledge_base_ids: List[str] = Field(default=[], description="使用的知识库ID列表")
+    knowledge_base_weights: Dict[str, float] = Field(default={}, description="各知识库的检索权重（默认1.0）")
     candidate_info: Optional[str] = Field(None, description="候选人背景信息（开放式面试用）")
     duration_minutes: int = Field(default=30, ge=10, le=120, description="面试时长（分钟）")
 
@@ -0,0 +1,154 @@
+"""
+ChromaDB 客户端
+进程内每个数据目录只创建一个客户端，并用LRU缓存集合句柄，
+避免每次检索/写入都先做一次 get_or_create_collection 元数据往返
+
+CHROMA_MODE=http 时改为连接共享的 chromadb 服务（docker-compose 中的 chromadb 容器），
+多个 uvicorn worker 共用同一份内存索引，也不再有多个进程同时写同一个数据目录；
+进程内使用 CHROMA_HTTP_POOL_SIZE 个客户端轮询，并发检索不排队在同一个连接上
+
+支持集合别名（存放在数据目录下的 collection_aliases.json），
+用于蓝绿构建：新版本集合写好并校验后原子切换别名
+"""
+
+import os
+import json
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import chromadb
+from chromadb.config import Settings as ChromaSettings
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+ALIASES_FILE = "collection_aliases.json"
+
+
+class ChromaClientManager:
+    """共享的ChromaDB客户端与集合句柄缓存"""
+
+    def __init__(self, path: str, max_collections: int = None, mode: str = None):
+        self.path = path
+        self.max_collections = max_collections or settings.CHROMA_COLLECTION_CACHE_SIZE
+        self.mode = mode or settings.CHROMA_MODE
+        if self.mode not in ("embedded", "http"):
+            raise ValueError(f"未知的 CHROMA_MODE: {self.mode}")
+
+        self._clients: List = []
+        self._slots = itertools.cycle(range(settings.CHROMA_HTTP_POOL_SIZE if self.mode == "http" else 1))
+        self._collections: "OrderedDict[Tuple[int, str], object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.aliases_path = os.path.join(path, ALIASES_FILE)
+        self._aliases: Dict[str, str] = {}
+        self._aliases_mtime: Optional[int] = None
+
+    def _create_client(self):
+        chroma_settings = ChromaSettings(anonymized_telemetry=False)
+        if self.mode == "http":
+            return chromadb.HttpClient(
+                host=settings.CHROMA_HOST,
+                port=settings.CHROMA_PORT,
+                settings=chroma_settings
+            )
+        os.makedirs(self.path, exist_ok=True)
+        return chromadb.PersistentClient(path=self.path, settings=chroma_settings)
+
+    def _get_client(self, slot: int):
+        if slot >= len(self._clients):
+            with self._lock:
+                while slot >= len(self._clients):
+                    self._clients.append(self._create_client())
+        return self._clients[slot]
+
+    @property
+    def client(self):
+        return self._get_client(0)
+
+    def _load_aliases(self) -> Dict[str, str]:
+        """别名文件变化时重新读取（其他进程切换别名后立即生效）"""
+        try:
+            mtime = os.stat(self.aliases_path).st_mtime_ns
+        except OSError:
+            return self._aliases
+        if mtime != self._aliases_mtime:
+            with open(self.aliases_path, 'r', encoding='utf-8') as f:
+                self._aliases = json.load(f)
+            self._aliases_mtime = mtime
+        return self._aliases
+
+    def resolve(self, name: str) -> str:
+        """解析别名，返回实际集合名（无别名时返回原名）"""
+        return self._load_aliases().get(name, name)
+
+    def set_alias(self, alias: str, target: Optional[str]):
+        """原子地把别名指向目标集合（target 为 None 时删除别名）"""
+        with self._lock:
+            aliases = dict(self._load_aliases())
+            if target is None:
+                aliases.pop(alias, None)
+            else:
+                aliases[alias] = target
+            os.makedirs(self.path, exist_ok=True)
+            tmp_path = f"{self.aliases_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(aliases, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.aliases_path)
+            self._aliases = aliases
+            self._aliases_mtime = os.stat(self.aliases_path).st_mtime_ns
+
+    def get_collection(self, name: str, metadata: Optional[dict] = None):
+        """获取集合句柄（不存在则创建，别名先解析为实际集合），命中缓存时不访问数据库"""
+        name = self.resolve(name)
+        with self._lock:
+            key = (next(self._slots), name)
+            collection = self._collections.get(key)
+            if collection is not None:
+                self._collections.move_to_end(key)
+                return collection
+
+        collection = self._get_client(key[0]).get_or_create_collection(name=name, metadata=metadata)
+
+        with self._lock:
+            self._collections[key] = collection
+            self._collections.move_to_end(key)
+            while len(self._collections) > self.max_collections:
+                self._collections.popitem(last=False)
+        return collection
+
+    def delete_collection(self, name: str):
+        """删除集合（别名则删除其指向的集合并移除别名）并使缓存的句柄失效"""
+        target = self.resolve(name)
+        if target != name:
+            self.set_alias(name, None)
+        self.invalidate(target)
+        self.client.delete_collection(name=target)
+
+    def invalidate(self, name: Optional[str] = None):
+        """使指定集合（或全部）的缓存句柄失效"""
+        with self._lock:
+            if name is None:
+                self._collections.clear()
+            else:
+                for key in [key for key in self._collections if key[1] == name]:
+                    del self._collections[key]
+
+
+# Global instances
+_managers: Dict[str, ChromaClientManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_chroma_client(path: Optional[str] = None) -> ChromaClientManager:
+    """获取共享的ChromaDB客户端（默认使用 CHROMA_DB_PATH；http 模式下该目录只存放别名等本地状态）"""
+    path = os.path.abspath(path or settings.CHROMA_DB_PATH)
+    with _managers_lock:
+        manager = _managers.get(path)
+        if manager is None:
+            manager = ChromaClientManager(path)
+            _managers[path] = manager
+        return manager
@@ -0,0 +1,114 @@
+"""
+集合写入日志
+每个集合一个追加写的日志文件 <CHROMA_DB_PATH>/collection_versions/<集合名>.log，
+每行 "+\t<id>"（写入）或 "-\t<id>"（删除），多个 worker 共享
+
+日志位置 (inode, 文件大小) 即集合的写版本：进程内的派生数据（词法索引）记录已同步到的位置，
+位置未变时无需访问向量库，变化时只读取新增的日志行增量同步；
+日志超过 COLLECTION_LOG_MAX_BYTES 时换新文件，旧位置失效，读者全量重建
+"""
+
+import os
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+from app.core.config import get_settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+settings = get_settings()
+
+LogPosition = Tuple[int, int]  # (inode, 偏移)
+
+
+class CollectionLog:
+    """集合写入日志"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = None):
+        self.directory = directory or os.path.join(settings.CHROMA_DB_PATH, "collection_versions")
+        self.max_bytes = max_bytes or settings.COLLECTION_LOG_MAX_BYTES
+
+    def _path(self, collection: str) -> str:
+        return os.path.join(self.directory, f"{collection}.log")
+
+    @contextmanager
+    def _file_lock(self, collection: str):
+        """跨进程写锁（单独的锁文件，换新日志文件时仍有效）"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{collection}.lock"), 'ab') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def position(self, collection: str) -> LogPosition:
+        """日志当前位置（从未写入过为 (0, 0)）"""
+        try:
+            st = os.stat(self._path(collection))
+        except OSError:
+            return (0, 0)
+        return (st.st_ino, st.st_size)
+
+    def append(
+        self,
+        collection: str,
+        added: List[str] = (),
+        removed: List[str] = ()
+    ) -> Tuple[LogPosition, LogPosition]:
+        """记录一次写入（在向量库写入成功之后调用），返回写入前后的日志位置"""
+        lines = [f"+\t{doc_id}\n" for doc_id in added] + [f"-\t{doc_id}\n" for doc_id in removed]
+        path = self._path(collection)
+        with self._file_lock(collection):
+            before = self.position(collection)
+            if before[1] > self.max_bytes:
+                tmp_path = f"{path}.tmp"
+                open(tmp_path, 'wb').close()
+                os.replace(tmp_path, path)
+                before = self.position(collection)
+            with open(path, 'ab') as f:
+                f.write("".join(lines).encode('utf-8'))
+            after = self.position(collection)
+        return before, after
+
+    def read(self, collection: str, position: LogPosition) -> Optional[Tuple[LogPosition, List[Tuple[str, str]]]]:
+        """
+        读取 position 之后的日志，返回 (新位置, [(操作, id)])
+
+        日志已换新文件或被删除时返回 None（需要全量重建）
+        """
+        try:
+            with open(self._path(collection), 'rb') as f:
+                st = os.fstat(f.fileno())
+                if position[0] == 0:  # 同步时日志尚未创建
+                    position = (st.st_ino, 0)
+                if st.st_ino != position[0] or st.st_size < position[1]:
+                    return None
+                f.seek(position[1])
+                data = f.read()
+        except FileNotFoundError:
+            return (position, []) if position[0] == 0 else None
+        except OSError:
+            return None
+        usable = data.rfind(b"\n") + 1
+        entries = [
+            (line[0], line[2:])
+            for line in data[:usable].decode('utf-8').splitlines() if line
+        ]
+        return (position[0], position[1] + usable), entries
+
+    def drop(self, collection: str):
+        """集合删除后删除日志"""
+        try:
+            os.remove(self._path(collection))
+        except OSError:
+            pass
+
+
+# Global instance
+collection_log = CollectionLog()
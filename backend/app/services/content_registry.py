@@ -0,0 +1,127 @@
+"""
+内容寻址登记表
+以上传文件的 SHA-256（save_upload 写盘时计算）为键，登记已处理内容的结果：
+- document：分块所属的 content_id，重复上传的文档直接关联已有分块和向量，不再解析和Embedding
+- resume：结构化解析结果，重复解析直接返回，不再解析文件和调用LLM
+
+文档分块按 content_id 存放在向量库，内容相同的文档共用；最后一个引用它的文档删除时才删除分块
+
+(content_hash, kind) 为主键：并发登记同一内容时只有先提交的成功，其余返回已有记录
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import get_settings
+from app.models.database import ContentRecord, Document
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class ContentRegistry:
+    """文件内容哈希 -> 处理结果"""
+
+    def lookup(self, db, kind: str, content_hash: Optional[str]) -> Optional[ContentRecord]:
+        """查找已登记的内容（命中时更新使用次数）"""
+        if not settings.CONTENT_DEDUP_ENABLED or not content_hash:
+            return None
+        record = db.query(ContentRecord).filter(
+            ContentRecord.content_hash == content_hash,
+            ContentRecord.kind == kind
+        ).first()
+        if record is None:
+            return None
+
+        record.hit_count = (record.hit_count or 0) + 1
+        record.last_used_at = datetime.now()
+        db.commit()
+        return record
+
+    def register(
+        self,
+        db,
+        kind: str,
+        content_hash: Optional[str],
+        content_id: Optional[str] = None,
+        result: Optional[Dict] = None,
+        file_path: Optional[str] = None,
+        file_size: int = 0
+    ) -> Optional[ContentRecord]:
+        """
+        登记内容的处理结果，与调用方已 add 到会话中的记录在同一事务中提交
+
+        返回生效的登记：已被其他请求先登记时回滚本次事务（调用方的记录一并撤销）并返回已有记录，
+        调用方按 content_id / result 是否为自己的判断是否需要改为复用
+        """
+        record = ContentRecord(
+            content_hash=content_hash,
+            kind=kind,
+            content_id=content_id,
+            result=result,
+            file_path=file_path,
+            file_size=file_size,
+            created_at=datetime.now(),
+            last_used_at=datetime.now()
+        )
+        if not settings.CONTENT_DEDUP_ENABLED or not content_hash:
+            db.commit()
+            return record
+
+        db.add(record)
+        try:
+            db.commit()
+            return record
+        except IntegrityError:
+            db.rollback()
+        return db.query(ContentRecord).filter(
+            ContentRecord.content_hash == content_hash,
+            ContentRecord.kind == kind
+        ).first()
+
+    def forget(self, db, content_id: str):
+        """删除文档内容的登记（入库失败或分块已删除），之后的同内容上传重新处理"""
+        db.query(ContentRecord).filter(
+            ContentRecord.kind == "document",
+            ContentRecord.content_id == content_id
+        ).delete(synchronize_session=False)
+        db.commit()
+
+    @staticmethod
+    def documents_for(db, content_id: str) -> List[Document]:
+        """引用同一份分块的所有文档"""
+        return db.query(Document).filter(
+            or_(Document.content_id == content_id, Document.id == content_id)
+        ).all()
+
+    @staticmethod
+    def resolve(
+        db,
+        document_ids: List[str],
+        weights: Optional[Dict[str, float]] = None
+    ) -> Tuple[List[str], Dict[str, float]]:
+        """
+        文档id -> 向量库中的 content_id（检索按 content_id 过滤）
+
+        多个文档共用分块时权重取最大值
+        """
+        content_ids = {
+            doc.id: doc.content_id or doc.id
+            for doc in db.query(Document).filter(Document.id.in_(document_ids)).all()
+        } if document_ids else {}
+
+        resolved = [content_ids.get(d, d) for d in document_ids]
+        resolved_weights: Dict[str, float] = {}
+        if weights:
+            for document_id, content_id in zip(document_ids, resolved):
+                weight = weights.get(document_id, 1.0)
+                resolved_weights[content_id] = max(weight, resolved_weights.get(content_id, weight))
+        return list(dict.fromkeys(resolved)), resolved_weights
+
+
+# Global instance
+content_registry = ContentRegistry()
@@ -1,6 +1,7 @@
 import os
 import uuid
-from typing import List, Optional
+import hashlib
+from typing import AsyncIterator, Callable, List, Optional, Tuple
 from datetime import datetime
 import aiofiles
 
@@ -12,10 +13,15 @@ except ImportError:
 
 from app.core.config import get_settings
 from app.models.schemas import DocumentType
+from app.services.pdf_extractor import get_pdf_extractor
 
 settings = get_settings()
 
 
+class UploadTooLargeError(Exception):
+    """上传文件超过 UPLOAD_MAX_BYTES"""
+
+
 class DocumentParser:
     """文档解析服务"""
     
@@ -48,7 +54,19 @@ class DocumentParser:
         return type_map.get(ext, DocumentType.TXT)
     
     async def save_upload(self, file) -> tuple:
-        """保存上传的文件"""
+        """
+        保存上传的文件
+        
+        按 UPLOAD_CHUNK_SIZE 分块流式写盘（内存占用与文件大小无关），同一遍计算 SHA-256；
+        超过 UPLOAD_MAX_BYTES 时删除已写入的部分并抛出 UploadTooLargeError
+        
+        Returns:
+            (file_id, file_path, file_type, original_name, content_hash)
+        """
+        max_bytes = settings.UPLOAD_MAX_BYTES
+        if getattr(file, 'size', None) and file.size > max_bytes:
+            raise UploadTooLargeError(f"文件大小超过限制（最大 {max_bytes // 1024 // 1024}MB）")
+        
         file_id = str(uuid.uuid4())
         original_name = file.filename
         file_type = self.get_document_type(original_name)
@@ -58,14 +76,37 @@ class DocumentParser:
         file_path = os.path.join(self.upload_dir, safe_name)
         
         # Save file
-        content = await file.read()
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(content)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(file_path, 'wb') as f:
+                while True:
+                    chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise UploadTooLargeError(f"文件大小超过限制（最大 {max_bytes // 1024 // 1024}MB）")
+                    digest.update(chunk)
+                    await f.write(chunk)
+        except BaseException:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
         
-        return file_id, file_path, file_type, original_name
+        return file_id, file_path, file_type, original_name, digest.hexdigest()
     
-    async def parse_document(self, file_path: str, file_type: DocumentType) -> str:
-        """解析文档内容"""
+    async def parse_document(
+        self,
+        file_path: str,
+        file_type: DocumentType,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> str:
+        """
+        解析文档内容
+        
+        progress: 进度回调 (已解析页数, 总页数)，目前只有基础PDF解析会逐页回调
+        """
         if file_type == DocumentType.PDF and self.llama_parser:
             # Use LlamaParse for PDF
             try:
@@ -73,15 +114,44 @@ class DocumentParser:
                 return "\n\n".join([doc.text for doc in documents])
             except Exception as e:
                 print(f"LlamaParse failed: {e}, falling back to basic parser")
-                return await self._basic_parse(file_path, file_type)
+                return await self._basic_parse(file_path, file_type, progress)
+        else:
+            return await self._basic_parse(file_path, file_type, progress)
+    
+    async def iter_document(
+        self,
+        file_path: str,
+        file_type: DocumentType
+    ) -> AsyncIterator[Tuple[str, int, int]]:
+        """
+        流式读取文档内容，逐段返回 (文本, 已解析页数, 总页数)
+        
+        基础PDF解析逐页返回，文本文件按 UPLOAD_CHUNK_SIZE 分段读取；
+        LlamaParse 和 Word 文档只能整体解析，一次返回（页数记为 1/1）
+        """
+        if file_type == DocumentType.PDF and not self.llama_parser:
+            async for index, page_count, text in get_pdf_extractor().aiter_pages(file_path):
+                yield text + "\n\n", index + 1, page_count
+        elif file_type in [DocumentType.MARKDOWN, DocumentType.TXT]:
+            async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
+                while True:
+                    text = await f.read(settings.UPLOAD_CHUNK_SIZE)
+                    if not text:
+                        break
+                    yield text, 0, 0
         else:
-            return await self._basic_parse(file_path, file_type)
+            yield await self.parse_document(file_path, file_type), 1, 1
     
-    async def _basic_parse(self, file_path: str, file_type: DocumentType) -> str:
+    async def _basic_parse(
+        self,
+        file_path: str,
+        file_type: DocumentType,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> str:
         """基础文档解析"""
         try:
             if file_type == DocumentType.PDF:
-                return await self._parse_pdf(file_path)
+                return await self._parse_pdf(file_path, progress)
             elif file_type == DocumentType.DOCX:
                 return await self._parse_docx(file_path)
             elif file_type in [DocumentType.MARKDOWN, DocumentType.TXT]:
@@ -91,18 +161,18 @@ class DocumentParser:
         except Exception as e:
             raise Exception(f"文档解析失败: {str(e)}")
     
-    async def _parse_pdf(self, file_path: str) -> str:
-        """解析PDF（基础版，使用PyPDF2或pdfplumber）"""
-        try:
-            import pdfplumber
-            text = ""
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    text += page.extract_text() or ""
-                    text += "\n\n"
-            return text
-        except ImportError:
-            raise Exception("请安装pdfplumber: pip install pdfplumber")
+    async def _parse_pdf(
+        self,
+        file_path: str,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> str:
+        """解析PDF（进程池按页并行，pdfplumber 为主、PyPDF2 回退）"""
+        pages = []
+        async for index, page_count, text in get_pdf_extractor().aiter_pages(file_path):
+            pages.append(text + "\n\n")
+            if progress:
+                progress(index + 1, page_count)
+        return "".join(pages)
     
     async def _parse_docx(self, file_path: str) -> str:
         """解析Word文档"""
@@ -133,47 +203,55 @@ class DocumentParser:
         3. 如果句子还太长，强制按字符数分割
         4. 保持上下文连贯性
         """
-        chunks = []
-        max_api_length = 250  # GLM-4 embedding API 安全限制
-        
-        def split_long_text(text: str, max_length: int) -> List[str]:
-            """将长文本强制分割成小块"""
-            if len(text) <= max_length:
-                return [text]
-            
-            result = []
-            # 尝试按句子分割
-            sentences = text.replace('。', '\n').replace('！', '\n').replace('？', '\n').replace('.', '\n').replace('!', '\n').replace('?', '\n').split('\n')
-            
-            current = ""
-            for sentence in sentences:
-                sentence = sentence.strip()
-                if not sentence:
-                    continue
-                    
-                if len(current) + len(sentence) + 1 <= max_length:
-                    if current:
-                        current += " "
-                    current += sentence
-                else:
-                    if current:
-                        result.append(current)
-                    # 如果单句太长，强制分割
-                    if len(sentence) > max_length:
-                        for i in range(0, len(sentence), max_length):
-                            result.append(sentence[i:i+max_length])
-                    else:
-                        current = sentence
-            
-            if current:
-                result.append(current)
-            
-            return result if result else [text[:max_length]]
-        
-        # Split by paragraphs first
-        paragraphs = text.split('\n\n')
+        chunker = TextChunker(overlap=overlap)
+        return chunker.feed(text) + chunker.finish()
+
+
+class TextChunker:
+    """
+    流式文本分块（分块规则见 DocumentParser.chunk_text）
+    
+    文本可以分多次 feed（如逐页），每次返回已确定的分块；只缓存未结束的段落和当前块，
+    结果与一次性对整个文本分块相同
+    """
+    
+    MAX_LENGTH = 250  # GLM-4 embedding API 安全限制
+    MAX_BUFFER = 64 * 1024  # 单个段落超过该长度时不再等待段落结束，直接分块
+    
+    def __init__(self, overlap: int = 30):
+        self.overlap = overlap
+        self._buffer = ""  # 未结束的段落
+        self._current = ""  # 当前块
+    
+    def feed(self, text: str) -> List[dict]:
+        """追加文本，返回新产生的分块"""
+        self._buffer += text
+        paragraphs = self._buffer.split('\n\n')
+        self._buffer = paragraphs.pop()
+        if len(self._buffer) > self.MAX_BUFFER:
+            paragraphs.append(self._buffer)
+            self._buffer = ""
+        return self._add_paragraphs(paragraphs)
+    
+    def finish(self) -> List[dict]:
+        """文本结束，返回剩余的分块"""
+        chunks = self._add_paragraphs([self._buffer])
+        self._buffer = ""
         
-        current_chunk = ""
+        # 保存最后一个块
+        if self._current:
+            chunks.append({
+                'text': self._current.strip()[:self.MAX_LENGTH],  # 确保不超出限制
+                'size': min(len(self._current), self.MAX_LENGTH)
+            })
+            self._current = ""
+        return chunks
+    
+    def _add_paragraphs(self, paragraphs: List[str]) -> List[dict]:
+        chunks = []
+        max_api_length = self.MAX_LENGTH
+        overlap = self.overlap
+        current_chunk = self._current
         
         for paragraph in paragraphs:
             paragraph = paragraph.strip()
@@ -191,7 +269,7 @@ class DocumentParser:
                     current_chunk = ""
                 
                 # 分割长段落
-                sub_paragraphs = split_long_text(paragraph, max_api_length)
+                sub_paragraphs = self.split_long_text(paragraph, max_api_length)
                 for sub in sub_paragraphs:
                     chunks.append({
                         'text': sub.strip(),
@@ -215,14 +293,43 @@ class DocumentParser:
             else:
                 current_chunk = new_chunk
         
-        # 保存最后一个块
-        if current_chunk:
-            chunks.append({
-                'text': current_chunk.strip()[:max_api_length],  # 确保不超出限制
-                'size': min(len(current_chunk), max_api_length)
-            })
-        
+        self._current = current_chunk
         return chunks
+    
+    @staticmethod
+    def split_long_text(text: str, max_length: int) -> List[str]:
+        """将长文本强制分割成小块"""
+        if len(text) <= max_length:
+            return [text]
+        
+        result = []
+        # 尝试按句子分割
+        sentences = text.replace('。', '\n').replace('！', '\n').replace('？', '\n').replace('.', '\n').replace('!', '\n').replace('?', '\n').split('\n')
+        
+        current = ""
+        for sentence in sentences:
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+                
+            if len(current) + len(sentence) + 1 <= max_length:
+                if current:
+                    current += " "
+                current += sentence
+            else:
+                if current:
+                    result.append(current)
+                # 如果单句太长，强制分割
+                if len(sentence) > max_length:
+                    for i in range(0, len(sentence), max_length):
+                        result.append(sentence[i:i+max_length])
+                else:
+                    current = sentence
+        
+        if current:
+            result.append(current)
+        
+        return result if result else [text[:max_length]]
 
 
 # Global instance
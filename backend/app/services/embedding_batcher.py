@@ -0,0 +1,105 @@
+"""
+Embedding 微批处理
+在几毫秒的窗口内收集并发的单条文本向量化请求，合并为一次批量调用后再分发结果
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class EmbeddingBatcher:
+    """跨请求的Embedding微批处理器"""
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+        max_batch_size: int = None,
+        max_wait_ms: float = None
+    ):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size or settings.EMBEDDING_BATCH_MAX_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.EMBEDDING_BATCH_MAX_WAIT_MS) / 1000
+
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()  # 发送中的批次（保留引用，避免任务被回收）
+        self.stats = {
+            'requests': 0,
+            'batches': 0,
+            'max_batch_size': 0,
+            'total_wait': 0.0
+        }
+
+    async def embed(self, text: str) -> List[float]:
+        """提交单条文本，等待所在批次完成后返回向量"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.monotonic()))
+        self.stats['requests'] += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """取出当前批次并异步发送"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+        now = time.monotonic()
+        self.stats['batches'] += 1
+        self.stats['max_batch_size'] = max(self.stats['max_batch_size'], len(batch))
+        self.stats['total_wait'] += sum(now - enqueued for _, _, enqueued in batch)
+
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future, float]]):
+        # 同一批次内的重复文本只发送一次
+        unique_texts = list(dict.fromkeys(text for text, _, _ in batch))
+        try:
+            vectors = await self.embed_batch(unique_texts)
+            by_text = dict(zip(unique_texts, vectors))
+            for text, future, _ in batch:
+                if not future.done():
+                    future.set_result(by_text[text])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def close(self):
+        """发送剩余请求并等待所有批次完成（应用退出时调用）"""
+        while self._pending:
+            self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict:
+        """获取批大小与等待时间统计"""
+        requests = self.stats['requests']
+        batches = self.stats['batches']
+        return {
+            'requests': requests,
+            'batches': batches,
+            'avg_batch_size': round(requests / batches, 2) if batches else 0.0,
+            'max_batch_size': self.stats['max_batch_size'],
+            'avg_wait_ms': round(self.stats['total_wait'] / requests * 1000, 2) if requests else 0.0,
+            'pending': len(self._pending)
+        }
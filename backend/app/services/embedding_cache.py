@@ -0,0 +1,273 @@
+"""
+Embedding 缓存
+两级缓存，key = sha256(model, text)：
+- 内存LRU：查询向量（检索query、评估上下文等），存为 float32 数组
+- 磁盘：文档向量，按模型存为紧凑的 float16/float32 追加文件 + 哈希索引，多worker共享；
+  文档向量不进入内存LRU，磁盘读写在线程中执行，不阻塞事件循环
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import get_settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def embedding_digest(model: str, text: str) -> bytes:
+    """(模型, 文本) 的哈希"""
+    return hashlib.sha256(f"{model}\0{text}".encode('utf-8')).digest()
+
+
+class DiskVectorStore:
+    """单个模型的磁盘向量文件（追加写 + 哈希索引）"""
+
+    RECORD = struct.Struct("<32sQ")  # digest, row
+
+    def __init__(self, directory: str, model: str, dtype: str = "float16"):
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, re.sub(r'[^\w.-]', '_', model))
+        self.vec_path = base + ".vec"
+        self.idx_path = base + ".idx"
+        self.meta_path = base + ".json"
+
+        self.dim: Optional[int] = None
+        self.dtype = np.dtype(dtype)
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self.dim = meta['dim']
+            self.dtype = np.dtype(meta['dtype'])
+
+        self.index: Dict[bytes, int] = {}
+        self._idx_offset = 0
+        self._lock = threading.Lock()  # 多个线程同时读写时保护 index / _idx_offset
+        self._vec_fd = os.open(self.vec_path, os.O_RDONLY | os.O_CREAT, 0o644)
+        open(self.idx_path, 'ab').close()
+        self.refresh()
+
+    @property
+    def row_bytes(self) -> int:
+        return self.dim * self.dtype.itemsize
+
+    def refresh(self):
+        """读取其他进程追加的索引记录"""
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        with open(self.idx_path, 'rb') as f:
+            f.seek(self._idx_offset)
+            data = f.read()
+        usable = len(data) - len(data) % self.RECORD.size
+        for digest, row in self.RECORD.iter_unpack(data[:usable]):
+            self.index[digest] = row
+        self._idx_offset += usable
+
+    def get(self, digest: bytes) -> Optional[np.ndarray]:
+        row = self.index.get(digest)
+        if row is None or self.dim is None:
+            return None
+        data = os.pread(self._vec_fd, self.row_bytes, row * self.row_bytes)
+        if len(data) < self.row_bytes:
+            return None
+        return np.frombuffer(data, dtype=self.dtype).astype(np.float32)
+
+    def get_many(self, digests: List[bytes]) -> List[Optional[np.ndarray]]:
+        """批量读取（阻塞，在线程中调用）"""
+        if any(d not in self.index for d in digests):
+            self.refresh()
+        return [self.get(d) for d in digests]
+
+    def put_many(self, items: Dict[bytes, List[float]]) -> int:
+        """追加写入向量（已存在的跳过，阻塞，在线程中调用），返回新写入的条数"""
+        if not items:
+            return 0
+        with self._lock:
+            return self._put_many(items)
+
+    def _put_many(self, items: Dict[bytes, List[float]]) -> int:
+        if self.dim is None:
+            self.dim = len(next(iter(items.values())))
+            with open(self.meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'dim': self.dim, 'dtype': self.dtype.name}, f)
+
+        with open(self.idx_path, 'ab') as idx_file:
+            if fcntl is not None:
+                fcntl.flock(idx_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                new_items = [
+                    (digest, vector) for digest, vector in items.items()
+                    if digest not in self.index and len(vector) == self.dim
+                ]
+                if not new_items:
+                    return 0
+
+                with open(self.vec_path, 'r+b') as vec_file:
+                    size = vec_file.seek(0, os.SEEK_END)
+                    first_row = size // self.row_bytes
+                    # 丢弃异常中断留下的半行
+                    vec_file.truncate(first_row * self.row_bytes)
+                    vec_file.seek(first_row * self.row_bytes)
+                    matrix = np.asarray([v for _, v in new_items], dtype=self.dtype)
+                    vec_file.write(matrix.tobytes())
+
+                # 先写向量再写索引，保证索引指向的行已落盘
+                records = b"".join(
+                    self.RECORD.pack(digest, first_row + i)
+                    for i, (digest, _) in enumerate(new_items)
+                )
+                idx_file.write(records)
+                idx_file.flush()
+                for i, (digest, _) in enumerate(new_items):
+                    self.index[digest] = first_row + i
+                self._idx_offset += len(records)
+                return len(new_items)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(idx_file, fcntl.LOCK_UN)
+
+
+class EmbeddingCache:
+    """两级Embedding缓存（内存层只在事件循环线程中访问）"""
+
+    def __init__(
+        self,
+        memory_entries: int = None,
+        directory: Optional[str] = None,
+        dtype: str = None
+    ):
+        self.memory_entries = memory_entries or settings.EMBEDDING_CACHE_MEMORY_ENTRIES
+        self.directory = directory if directory is not None else settings.EMBEDDING_CACHE_DIR
+        self.dtype = dtype or settings.EMBEDDING_CACHE_DTYPE
+
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._disk: Dict[str, DiskVectorStore] = {}
+        self._disk_lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'disk_writes': 0}
+
+    def _disk_store(self, model: str) -> Optional[DiskVectorStore]:
+        with self._disk_lock:
+            if not self.directory:
+                return None
+            store = self._disk.get(model)
+            if store is None:
+                try:
+                    store = DiskVectorStore(self.directory, model, self.dtype)
+                except OSError as e:
+                    logger.warning(f"Embedding磁盘缓存不可用: {e}")
+                    self.directory = None
+                    return None
+                self._disk[model] = store
+            return store
+
+    def _disk_get_many(self, model: str, digests: List[bytes]) -> List[Optional[np.ndarray]]:
+        """读取磁盘层（阻塞，在线程中执行）"""
+        store = self._disk_store(model)
+        if store is None:
+            return [None] * len(digests)
+        return store.get_many(digests)
+
+    def _disk_put_many(self, model: str, items: Dict[bytes, List[float]]) -> int:
+        """写入磁盘层（阻塞，在线程中执行）"""
+        store = self._disk_store(model)
+        if store is None:
+            return 0
+        try:
+            return store.put_many(items)
+        except OSError as e:
+            logger.warning(f"写入Embedding磁盘缓存失败: {e}")
+            return 0
+
+    async def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """批量查询，未命中的位置为None"""
+        digests = [embedding_digest(model, t) for t in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+
+        disk_lookup = []
+        for i, digest in enumerate(digests):
+            vector = self._memory.get(digest)
+            if vector is not None:
+                self._memory.move_to_end(digest)
+                self.stats['memory_hits'] += 1
+                results[i] = vector.tolist()
+            else:
+                disk_lookup.append(i)
+
+        if disk_lookup and self.directory:
+            vectors = await asyncio.to_thread(self._disk_get_many, model, [digests[i] for i in disk_lookup])
+            for i, vector in zip(disk_lookup, vectors):
+                if vector is not None:
+                    self.stats['disk_hits'] += 1
+                    results[i] = vector.tolist()
+
+        self.stats['misses'] += sum(1 for r in results if r is None)
+        return results
+
+    async def get(self, model: str, text: str) -> Optional[List[float]]:
+        return (await self.get_many(model, [text]))[0]
+
+    async def put_many(self, model: str, texts: List[str], vectors: List[List[float]], persist: bool = False):
+        """
+        写入缓存
+
+        persist: True 时只写入磁盘层（文档向量），否则只保留在内存LRU（查询向量）
+        """
+        digests = [embedding_digest(model, text) for text in texts]
+        if not persist:
+            for digest, vector in zip(digests, vectors):
+                self._remember(digest, vector)
+            return
+
+        if self.directory:
+            written = await asyncio.to_thread(self._disk_put_many, model, dict(zip(digests, vectors)))
+            self.stats['disk_writes'] += written
+
+    async def put(self, model: str, text: str, vector: List[float], persist: bool = False):
+        await self.put_many(model, [text], [vector], persist)
+
+    def _remember(self, digest: bytes, vector: List[float]):
+        self._memory[digest] = np.asarray(vector, dtype=np.float32)
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        """获取命中统计"""
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        lookups = hits + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'disk_entries': {model: len(store.index) for model, store in self._disk.items()}
+        }
+
+
+# Global instance
+_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """获取共享的Embedding缓存"""
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache()
+    return _cache
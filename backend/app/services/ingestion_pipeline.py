@@ -0,0 +1,158 @@
+"""
+流式文档入库流水线
+解析 → 分块 → Embedding → 写入向量库 四个阶段同时运行，阶段之间用有界队列连接：
+逐页解析出的文本立即分块，攒够一个Embedding批次就送去生成向量，生成后立即写入向量库，
+前面的分块在最后一页解析完之前就可以检索；队列满时上游阶段等待，
+内存占用只取决于队列长度和批次大小，与文档大小无关
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from app.core.config import get_settings
+from app.models.schemas import DocumentType
+from app.services.document_service import document_parser, TextChunker
+from app.services.llm_scheduler import Priority
+from app.services.llm_service import vector_store
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_DONE = object()  # 队列结束标记
+
+
+class IngestionPipeline:
+    """单个文档的流式入库"""
+
+    def __init__(
+        self,
+        document_id: str,
+        file_path: str,
+        file_type: DocumentType,
+        source: str,
+        collection_name: Optional[str] = None,
+        priority: Priority = Priority.RESUME,
+        on_progress: Optional[Callable[..., None]] = None
+    ):
+        self.document_id = document_id
+        self.file_path = file_path
+        self.file_type = file_type
+        self.source = source
+        self.collection_name = collection_name or settings.DOCUMENT_COLLECTION
+        self.priority = priority
+        self.on_progress = on_progress
+        self.created_at = datetime.now().isoformat()
+        self.stats = {'pages_parsed': 0, 'pages_total': 0, 'chunks_total': 0, 'chunks_embedded': 0, 'chunks_indexed': 0}
+
+    def _report(self, **fields):
+        self.stats.update(fields)
+        if self.on_progress:
+            self.on_progress(**fields)
+
+    async def run(self) -> int:
+        """执行入库，返回分块数；任一阶段失败时取消其他阶段并抛出异常"""
+        size = settings.INGESTION_QUEUE_SIZE
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        index_queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        embedders = max(1, settings.EMBEDDING_INGEST_CONCURRENCY)
+
+        async def embed_all():
+            await asyncio.gather(*(self._embed(embed_queue, index_queue) for _ in range(embedders)))
+            self._report(stage="indexing")
+            await index_queue.put(_DONE)
+
+        tasks = [
+            asyncio.create_task(self._produce(embed_queue, embedders)),
+            asyncio.create_task(embed_all()),
+            asyncio.create_task(self._index(index_queue))
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return self.stats['chunks_total']
+
+    async def _produce(self, embed_queue: asyncio.Queue, embedders: int):
+        """解析 + 分块：按 EMBEDDING_INGEST_BATCH_SIZE / EMBEDDING_INGEST_MAX_BATCH_CHARS 攒批次"""
+        chunker = TextChunker()
+        pending: List[str] = []
+        pending_chars = 0
+        next_index = 0
+
+        async def emit(chunks: List[dict], final: bool = False):
+            nonlocal pending, pending_chars, next_index
+            for chunk in chunks:
+                text = chunk['text']
+                if pending and (len(pending) >= settings.EMBEDDING_INGEST_BATCH_SIZE
+                                or pending_chars + len(text) > settings.EMBEDDING_INGEST_MAX_BATCH_CHARS):
+                    await embed_queue.put((next_index, pending))
+                    next_index += len(pending)
+                    pending, pending_chars = [], 0
+                pending.append(text)
+                pending_chars += len(text)
+                self._report(chunks_total=self.stats['chunks_total'] + 1)
+            if final and pending:
+                await embed_queue.put((next_index, pending))
+                pending, pending_chars = [], 0
+
+        self._report(stage="parsing")
+        async for text, pages_parsed, pages_total in document_parser.iter_document(self.file_path, self.file_type):
+            if pages_total:
+                self._report(pages_parsed=pages_parsed, pages_total=pages_total)
+            await emit(chunker.feed(text))
+        await emit(chunker.finish(), final=True)
+
+        self._report(stage="embedding")
+        for _ in range(embedders):
+            await embed_queue.put(_DONE)
+
+    async def _embed(self, embed_queue: asyncio.Queue, index_queue: asyncio.Queue):
+        """Embedding：多个协程并发消费批次"""
+        while True:
+            item = await embed_queue.get()
+            if item is _DONE:
+                return
+            start, texts = item
+            vectors = await vector_store.embed_batch(
+                texts, self.priority, label=f"[{start}:{start + len(texts)}]"
+            )
+            self._report(chunks_embedded=self.stats['chunks_embedded'] + len(texts))
+            await index_queue.put((start, texts, vectors))
+
+    async def _index(self, index_queue: asyncio.Queue):
+        """写入向量库：每个批次写入后即可检索"""
+        while True:
+            item = await index_queue.get()
+            if item is _DONE:
+                return
+            start, texts, vectors = item
+            indexes = range(start, start + len(texts))
+            await vector_store.add_embeddings(
+                self.collection_name,
+                ids=[f"{self.document_id}_{i}" for i in indexes],
+                embeddings=vectors,
+                documents=texts,
+                metadatas=[{
+                    'source': self.source,
+                    'document_id': self.document_id,
+                    'chunk_index': i,
+                    'created_at': self.created_at
+                } for i in indexes]
+            )
+            self._report(chunks_indexed=self.stats['chunks_indexed'] + len(texts))
+
+
+async def ingest_document(
+    document_id: str,
+    file_path: str,
+    file_type: DocumentType,
+    source: str,
+    on_progress: Optional[Callable[..., None]] = None
+) -> int:
+    """流式入库一个文档，返回分块数"""
+    pipeline = IngestionPipeline(document_id, file_path, file_type, source, on_progress=on_progress)
+    return await pipeline.run()
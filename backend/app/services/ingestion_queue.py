@@ -0,0 +1,350 @@
+"""
+文档异步入库队列
+上传接口只保存文件并写入任务记录（ingestion_jobs 表），立即返回 202；
+每个进程启动 INGESTION_WORKERS 个后台协程从数据库认领任务，通过流式流水线
+（ingestion_pipeline）执行解析 → 分块 → Embedding → 写入向量库，进度写回任务记录供状态接口查询
+
+任务以数据库为准：进程重启后排队中的任务继续处理；running 任务的进程已退出
+或长时间无进度更新时重新入队，中断超过 INGESTION_MAX_ATTEMPTS 次标记失败
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.core.config import get_settings
+from app.models.database import SessionLocal, IngestionJob
+from app.models.schemas import DocumentType
+from app.services.content_registry import content_registry
+from app.services.ingestion_pipeline import ingest_document
+from app.services.llm_service import vector_store
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+PROGRESS_WRITE_INTERVAL = 0.5  # 进度写库的最小间隔（秒），阶段切换时立即写入
+
+
+class JobProgress:
+    """任务进度记录（节流写库，写库在线程中执行，不阻塞事件循环）"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.fields = {}
+        self._last_write = 0.0
+        self._pending: Optional[asyncio.Task] = None
+
+    def update(self, **fields):
+        """记录进度（流水线回调中调用）；到达写库间隔或阶段切换时在后台写库，上一次写库未完成时跳过"""
+        self.fields.update(fields)
+        now = time.monotonic()
+        if 'stage' not in fields and now - self._last_write < PROGRESS_WRITE_INTERVAL:
+            return
+        if self._pending is not None and not self._pending.done():
+            return
+        self._last_write = now
+        self._pending = asyncio.create_task(asyncio.to_thread(self.flush, dict(self.fields)))
+
+    async def save(self, **fields):
+        """立即写库（任务结束时），等待之前的后台写入完成"""
+        self.fields.update(fields)
+        if self._pending is not None:
+            await asyncio.gather(self._pending, return_exceptions=True)
+        await asyncio.to_thread(self.flush, dict(self.fields))
+
+    def flush(self, fields: dict):
+        if not fields:
+            return
+        db = SessionLocal()
+        try:
+            db.query(IngestionJob).filter(IngestionJob.id == self.job_id).update(
+                {**fields, 'updated_at': datetime.now()}, synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            logger.error(f"写入任务进度失败: {self.job_id}: {e}")
+        finally:
+            db.close()
+
+
+class IngestionQueue:
+    """基于数据库的文档入库任务队列"""
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or settings.INGESTION_WORKERS
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, int] = {}  # 本进程正在处理的任务 -> 协程序号
+        self._claim_lock = threading.Lock()  # 本进程内认领与中断检查串行执行
+        self.stats = {'completed': 0, 'failed': 0, 'requeued': 0}
+
+    def has_capacity(self, db) -> bool:
+        """排队任务数是否未达上限"""
+        queued = db.query(IngestionJob).filter(IngestionJob.status == "queued").count()
+        return queued < settings.INGESTION_MAX_QUEUED
+
+    def submit(
+        self,
+        db,
+        document_id: str,
+        file_path: str,
+        file_type: str,
+        source: str,
+        content_hash: Optional[str] = None
+    ) -> IngestionJob:
+        """写入任务记录并唤醒后台协程"""
+        job = IngestionJob(
+            id=str(uuid.uuid4()),
+            document_id=document_id,
+            file_path=file_path,
+            file_type=file_type,
+            source=source,
+            content_hash=content_hash,
+            file_size=os.path.getsize(file_path)
+        )
+        db.add(job)
+        db.commit()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def start(self):
+        """启动后台协程（应用启动时调用）"""
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"文档入库队列已启动: {self.workers} 个协程, worker={self.worker_id}")
+
+    async def stop(self):
+        """停止后台协程，未完成的任务在下次启动时重新处理"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, index: int):
+        while True:
+            try:
+                job_id = await asyncio.to_thread(self._claim, index)
+            except Exception as e:
+                logger.error(f"认领入库任务失败: {e}")
+                job_id = None
+
+            if job_id is not None:
+                heartbeat = asyncio.create_task(self._heartbeat(job_id))
+                try:
+                    await self._run(job_id)
+                except Exception as e:
+                    # 协程不能退出，否则本进程永久少一个入库并发
+                    logger.exception(f"入库任务 {job_id} 执行异常: {e}")
+                    try:
+                        await asyncio.to_thread(self._mark_failed, job_id, str(e))
+                    except Exception as mark_error:
+                        logger.error(f"标记入库任务失败出错: {job_id}: {mark_error}")
+                finally:
+                    heartbeat.cancel()
+                    self._release(job_id, index)
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.INGESTION_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _heartbeat(self, job_id: str):
+        """处理期间定时刷新 updated_at：某个阶段长时间没有进度（整份解析、低优先级Embedding排队）时不被当作中断"""
+        while True:
+            await asyncio.sleep(settings.INGESTION_HEARTBEAT_INTERVAL)
+            try:
+                await asyncio.to_thread(self._touch, job_id)
+            except Exception as e:
+                logger.warning(f"刷新入库任务心跳失败: {job_id}: {e}")
+
+    def _touch(self, job_id: str):
+        db = SessionLocal()
+        try:
+            db.query(IngestionJob).filter(
+                IngestionJob.id == job_id,
+                IngestionJob.status == "running",
+                IngestionJob.worker == self.worker_id
+            ).update({'updated_at': datetime.now()}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _mark_failed(self, job_id: str, error: str):
+        """_run 异常退出时把任务标记为失败（否则会被当作中断反复重试）"""
+        db = SessionLocal()
+        try:
+            job = db.query(IngestionJob).filter(
+                IngestionJob.id == job_id,
+                IngestionJob.status == "running",
+                IngestionJob.worker == self.worker_id
+            ).first()
+            if job is None:
+                return
+            job.status = "failed"
+            job.error = error
+            job.finished_at = datetime.now()
+            self._set_document_status(db, job.document_id, "failed")
+            db.commit()
+            content_registry.forget(db, job.document_id)
+        finally:
+            db.close()
+
+    def _release(self, job_id: str, index: int):
+        """释放本协程认领的任务"""
+        if self._running.get(job_id) == index:
+            del self._running[job_id]
+
+    def _claim(self, index: int) -> Optional[str]:
+        """
+        认领最早的排队任务
+
+        多进程之间靠条件更新保证只有一个认领成功；本进程内的协程持锁串行认领，
+        认领成功后才登记到 _running，中断检查不会看到已认领但未登记的任务
+        """
+        with self._claim_lock:
+            db = SessionLocal()
+            try:
+                self._recover_interrupted(db)
+                while True:
+                    candidate = db.query(IngestionJob.id).filter(
+                        IngestionJob.status == "queued"
+                    ).order_by(IngestionJob.created_at).first()
+                    if candidate is None:
+                        return None
+
+                    claimed = db.query(IngestionJob).filter(
+                        IngestionJob.id == candidate.id,
+                        IngestionJob.status == "queued"
+                    ).update({
+                        'status': "running",
+                        'worker': self.worker_id,
+                        'attempts': IngestionJob.attempts + 1,
+                        'updated_at': datetime.now()
+                    }, synchronize_session=False)
+                    db.commit()
+                    if claimed:
+                        self._running[candidate.id] = index
+                        return candidate.id
+            finally:
+                db.close()
+
+    def _recover_interrupted(self, db):
+        """running 任务的进程已退出（本机）或超时无进度时重新入队（本进程正在处理的任务除外）"""
+        stale_before = datetime.now() - timedelta(seconds=settings.INGESTION_JOB_STALE_SECONDS)
+        for job in db.query(IngestionJob).filter(IngestionJob.status == "running").all():
+            if job.worker == self.worker_id and job.id in self._running:
+                continue
+            if job.updated_at >= stale_before and not self._is_interrupted(job):
+                continue
+            if job.attempts >= settings.INGESTION_MAX_ATTEMPTS:
+                job.status = "failed"
+                job.error = f"处理中断 {job.attempts} 次，已放弃"
+                job.finished_at = datetime.now()
+                self._set_document_status(db, job.document_id, "failed")
+                content_registry.forget(db, job.document_id)
+            else:
+                job.status = "queued"
+                self.stats['requeued'] += 1
+            logger.warning(f"入库任务 {job.id} 中断（worker={job.worker}），{job.status}")
+        db.commit()
+
+    def _is_interrupted(self, job: IngestionJob) -> bool:
+        """任务由本机已退出的进程（或本进程上次运行，如容器重启后PID相同）认领"""
+        if job.worker == self.worker_id:
+            return job.id not in self._running
+        host, _, pid = (job.worker or "").rpartition(":")
+        if host != socket.gethostname() or not pid.isdigit():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            return False
+        return False
+
+    @staticmethod
+    def _set_document_status(db, document_id: str, status: str, chunk_count: Optional[int] = None):
+        """更新共用这份分块的所有文档（重复上传的文档关联到同一个入库任务）"""
+        for doc in content_registry.documents_for(db, document_id):
+            doc.status = status
+            if chunk_count is not None:
+                doc.chunk_count = chunk_count
+            doc.updated_at = datetime.now()
+
+    @staticmethod
+    def _load_job(job_id: str) -> Optional[tuple]:
+        db = SessionLocal()
+        try:
+            job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+            if job is None:
+                return None
+            return job.document_id, job.file_path, job.file_type, job.source
+        finally:
+            db.close()
+
+    def _finish(self, document_id: str, status: str, chunk_count: Optional[int] = None) -> bool:
+        """更新文档状态，返回引用这份分块的文档是否都已删除"""
+        db = SessionLocal()
+        try:
+            if not content_registry.documents_for(db, document_id):
+                content_registry.forget(db, document_id)
+                return True
+            self._set_document_status(db, document_id, status, chunk_count)
+            db.commit()
+            if status == "failed":
+                content_registry.forget(db, document_id)  # 同内容再次上传时重新处理
+            return False
+        finally:
+            db.close()
+
+    async def _run(self, job_id: str):
+        """执行入库任务"""
+        job = await asyncio.to_thread(self._load_job, job_id)
+        if job is None:
+            logger.warning(f"入库任务 {job_id} 不存在（已被删除）")
+            return
+        document_id, file_path, file_type, source = job
+
+        progress = JobProgress(job_id)
+        try:
+            chunk_count = await ingest_document(
+                document_id,
+                file_path,
+                DocumentType(file_type),
+                source,
+                on_progress=progress.update
+            )
+
+            if await asyncio.to_thread(self._finish, document_id, "completed", chunk_count):
+                # 处理期间文档已被删除
+                await vector_store.delete_documents(settings.DOCUMENT_COLLECTION, {"document_id": document_id})
+
+            await progress.save(status="completed", stage="done", finished_at=datetime.now())
+            self.stats['completed'] += 1
+            logger.info(f"文档入库完成: {document_id}, {chunk_count} 个分块")
+
+        except Exception as e:
+            logger.error(f"文档入库失败: {document_id}: {e}")
+            # 流式入库已写入的分块不应继续被检索到
+            try:
+                await vector_store.delete_documents(settings.DOCUMENT_COLLECTION, {"document_id": document_id})
+            except Exception as cleanup_error:
+                logger.error(f"清理失败任务的分块失败: {document_id}: {cleanup_error}")
+            await progress.save(status="failed", error=str(e), finished_at=datetime.now())
+            await asyncio.to_thread(self._finish, document_id, "failed")
+            self.stats['failed'] += 1
+
+
+# Global instance
+ingestion_queue = IngestionQueue()
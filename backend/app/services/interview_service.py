@@ -1,6 +1,6 @@
 import uuid
 import json
-from typing import List, Optional, Dict
+from typing import AsyncIterator, List, Optional, Dict, Tuple
 from datetime import datetime
 from enum import Enum
 
@@ -22,7 +22,8 @@ class InterviewEngine:
         mode: InterviewMode,
         knowledge_base_ids: List[str],
         candidate_info: Optional[str] = None,
-        duration_minutes: int = 30
+        duration_minutes: int = 30,
+        knowledge_base_weights: Optional[Dict[str, float]] = None
     ) -> dict:
         """开始面试会话"""
         session_id = str(uuid.uuid4())
@@ -31,6 +32,7 @@ class InterviewEngine:
             'id': session_id,
             'mode': mode,
             'knowledge_base_ids': knowledge_base_ids,
+            'knowledge_base_weights': knowledge_base_weights or {},
             'candidate_info': candidate_info,
             'duration_minutes': duration_minutes,
             'status': 'active',
@@ -44,7 +46,8 @@ class InterviewEngine:
         if mode == InterviewMode.STRUCTURED:
             # Generate structured questions based on knowledge base
             session_data['questions'] = await self._generate_structured_questions(
-                knowledge_base_ids
+                knowledge_base_ids,
+                weights=knowledge_base_weights
             )
             session_data['total_questions'] = len(session_data['questions'])
         else:
@@ -64,22 +67,21 @@ class InterviewEngine:
     async def _generate_structured_questions(
         self,
         knowledge_base_ids: List[str],
-        num_questions: int = 10
+        num_questions: int = 10,
+        weights: Optional[Dict[str, float]] = None
     ) -> List[dict]:
         """基于知识库生成结构化问题"""
         
-        # Retrieve sample content from knowledge base
-        sample_content = []
-        for kb_id in knowledge_base_ids:
-            results = await vector_store.search(
-                collection_name=kb_id,
-                query="重要概念 核心知识 关键技术",
-                top_k=3
-            )
-            for result in results:
-                sample_content.append(result['document'])
+        # Retrieve sample content from all knowledge bases at once
+        results = await vector_store.search_documents(
+            document_ids=knowledge_base_ids,
+            query="重要概念 核心知识 关键技术",
+            top_k=3,
+            weights=weights
+        )
+        sample_content = [result['document'] for result in results]
         
-        context = "\n\n".join(sample_content[:3])  # Use top 3 chunks
+        context = "\n\n".join(sample_content)  # Use top 3 chunks
         
         system_prompt = """你是一位专业的面试出题专家。请基于提供的知识库内容，设计面试问题。
 要求：
@@ -182,6 +184,44 @@ class InterviewEngine:
     
     async def _generate_followup_question(self, session: dict) -> QuestionResponse:
         """生成开放式追问问题"""
+        messages, context = await self._build_followup_messages(session)
+        
+        response = await glm4_service.chat_completion(messages, temperature=0.8)
+        
+        return self._make_followup_question(response, context)
+    
+    async def stream_next_question(self, session_id: str) -> AsyncIterator[dict]:
+        """
+        流式获取下一个问题
+        
+        开放式模式逐段产出 {"type": "delta", "content": ...}，
+        最后产出 {"type": "question", "question": QuestionResponse}；
+        结构化模式直接产出完整问题。
+        """
+        session = self.sessions.get(session_id)
+        if not session or session['status'] != 'active':
+            return
+        
+        if session['mode'] == InterviewMode.STRUCTURED:
+            question = await self.get_next_question(session_id)
+            if question:
+                yield {'type': 'question', 'question': question}
+            return
+        
+        messages, context = await self._build_followup_messages(session)
+        
+        chunks = []
+        async for delta in glm4_service.stream_chat_completion(messages, temperature=0.8):
+            chunks.append(delta)
+            yield {'type': 'delta', 'content': delta}
+        
+        yield {
+            'type': 'question',
+            'question': self._make_followup_question("".join(chunks), context)
+        }
+    
+    async def _build_followup_messages(self, session: dict) -> Tuple[List[dict], str]:
+        """构建追问问题的提示词，返回 (messages, 检索上下文)"""
         history = session.get('history', [])
         last_exchange = history[-1] if history else None
         
@@ -189,10 +229,11 @@ class InterviewEngine:
         context = ""
         if session['knowledge_base_ids']:
             query = last_exchange['answer'] if last_exchange else session.get('candidate_info', '')
-            results = await vector_store.search(
-                collection_name=session['knowledge_base_ids'][0],
+            results = await vector_store.search_documents(
+                document_ids=session['knowledge_base_ids'],
                 query=query,
-                top_k=2
+                top_k=2,
+                weights=session.get('knowledge_base_weights')
             )
             context = "\n".join([r['document'] for r in results])
         
@@ -215,12 +256,13 @@ class InterviewEngine:
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
         ]
-        
-        response = await glm4_service.chat_completion(messages, temperature=0.8)
-        
+        return messages, context
+    
+    def _make_followup_question(self, text: str, context: str) -> QuestionResponse:
+        """将生成的追问文本包装为问题"""
         return QuestionResponse(
             id=f"q_{uuid.uuid4().hex[:8]}",
-            question=response.strip(),
+            question=text.strip(),
             question_type="followup",
             difficulty=3,
             context=context if context else None
@@ -257,10 +299,11 @@ class InterviewEngine:
         # Retrieve relevant context
         context = ""
         if session['knowledge_base_ids']:
-            results = await vector_store.search(
-                collection_name=session['knowledge_base_ids'][0],
+            results = await vector_store.search_documents(
+                document_ids=session['knowledge_base_ids'],
                 query=answer,
-                top_k=2
+                top_k=2,
+                weights=session.get('knowledge_base_weights')
             )
             context = "\n".join([r['document'] for r in results])
         
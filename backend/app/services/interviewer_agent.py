@@ -19,10 +19,11 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from services.llm_service import GLM4Service
+from services.llm_service import get_glm4_service
 from services.resume_analyzer import ResumeData
 from knowledge_base.style_config_loader import get_style_config
 from knowledge_base.vector_store import get_vector_store
+from knowledge_base.question_index import get_question_index
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -153,10 +154,15 @@ class QuestionGenerator:
     """问题生成器"""
     
     def __init__(self, vector_store=None):
-        self.llm = GLM4Service()
+        self.llm = get_glm4_service()
         self.vector_store = vector_store or get_vector_store()
         self.style_config = get_style_config()
     
+    @property
+    def question_index(self):
+        """共享的面试题索引（每次访问时检查 build_knowledge_base 是否已重建索引文件）"""
+        return get_question_index()
+    
     async def generate_questions_for_phase(
         self,
         phase: InterviewPhase,
@@ -198,42 +204,27 @@ class QuestionGenerator:
         questions = []
         
         # 从知识库检索相关问题
+        min_difficulty, max_difficulty = self._difficulty_range(level)
         for area in focus_areas[:3]:  # 取前3个重点领域
             try:
-                # 简单检索（暂时不使用向量检索）
-                # 从增强后的JSON文件中加载问题
-                questions_file = Path("/home/fengxu/mylib/interview-agent/backend/data/processed/enhanced_questions.json")
-                if questions_file.exists():
-                    with open(questions_file, 'r', encoding='utf-8') as f:
-                        all_questions = json.load(f)
-                    
-                    # 筛选相关问题
-                    area_questions = [
-                        q for q in all_questions 
-                        if area.lower() in q.get('category', '').lower() 
-                        or any(area.lower() in tag.lower() for tag in q.get('tags', []))
-                    ]
-                    
-                    # 根据难度筛选
-                    if level == "初级":
-                        area_questions = [q for q in area_questions if q.get('difficulty', 3) <= 2]
-                    elif level == "中级":
-                        area_questions = [q for q in area_questions if 2 <= q.get('difficulty', 3) <= 4]
-                    else:  # 高级
-                        area_questions = [q for q in area_questions if q.get('difficulty', 3) >= 3]
-                    
-                    # 随机选择
-                    import random
-                    selected = random.sample(area_questions, min(2, len(area_questions)))
-                    
-                    for q in selected:
-                        questions.append(Question(
-                            id=q.get('id', ''),
-                            text=q.get('text', ''),
-                            category=q.get('category', ''),
-                            difficulty=q.get('difficulty', 3),
-                            followup_questions=q.get('followup_points', [])
-                        ))
+                if self.question_index.available:
+                    area_questions = await self._search_question_index(area, min_difficulty, max_difficulty)
+                else:
+                    # 索引未构建时回退到扫描JSON文件
+                    area_questions = self._scan_question_file(area, min_difficulty, max_difficulty)
+                
+                # 随机选择
+                import random
+                selected = random.sample(area_questions, min(2, len(area_questions)))
+                
+                for q in selected:
+                    questions.append(Question(
+                        id=q.get('id', ''),
+                        text=q.get('text', ''),
+                        category=q.get('category', ''),
+                        difficulty=q.get('difficulty', 3),
+                        followup_questions=q.get('followup_points', [])
+                    ))
                         
             except Exception as e:
                 logger.error(f"生成技术问题失败: {e}")
@@ -241,6 +232,58 @@ class QuestionGenerator:
         
         return questions[:count]
     
+    @staticmethod
+    def _difficulty_range(level: str) -> Tuple[int, int]:
+        """根据候选人级别确定难度范围"""
+        if level == "初级":
+            return 1, 2
+        elif level == "中级":
+            return 2, 4
+        else:  # 高级
+            return 3, 5
+    
+    async def _search_question_index(
+        self,
+        area: str,
+        min_difficulty: int,
+        max_difficulty: int,
+        top_k: int = 6
+    ) -> List[Dict]:
+        """从面试题向量索引中检索与领域最相关的问题"""
+        filters = {'min_difficulty': min_difficulty, 'max_difficulty': max_difficulty}
+        question_index = self.question_index
+        candidates = question_index.filter(keyword=area, **filters)
+        if 0 < candidates.size <= top_k:
+            # 候选集不超过 top_k 时无需计算相似度
+            return [question_index.questions[i] for i in candidates]
+
+        area_embedding = await self.llm.generate_embedding(area)
+        if candidates.size:
+            return question_index.search(area_embedding, top_k=top_k, keyword=area, **filters)
+        # 分类/标签中没有该关键词时按语义相似度检索
+        return question_index.search(area_embedding, top_k=top_k, **filters)
+    
+    def _scan_question_file(self, area: str, min_difficulty: int, max_difficulty: int) -> List[Dict]:
+        """扫描增强后的JSON文件筛选问题"""
+        questions_file = Path("/home/fengxu/mylib/interview-agent/backend/data/processed/enhanced_questions.json")
+        if not questions_file.exists():
+            return []
+        with open(questions_file, 'r', encoding='utf-8') as f:
+            all_questions = json.load(f)
+        
+        # 筛选相关问题
+        area_questions = [
+            q for q in all_questions 
+            if area.lower() in q.get('category', '').lower() 
+            or any(area.lower() in tag.lower() for tag in q.get('tags', []))
+        ]
+        
+        # 根据难度筛选
+        return [
+            q for q in area_questions
+            if min_difficulty <= q.get('difficulty', 3) <= max_difficulty
+        ]
+    
     async def _generate_project_questions(
         self,
         resume_data: ResumeData,
@@ -325,7 +368,7 @@ class AnswerEvaluator:
     """回答评估器"""
     
     def __init__(self):
-        self.llm = GLM4Service()
+        self.llm = get_glm4_service()
     
     async def evaluate(
         self,
@@ -490,7 +533,7 @@ class InterviewerAgent:
     """面试官Agent主类"""
     
     def __init__(self):
-        self.llm = GLM4Service()
+        self.llm = get_glm4_service()
         self.timer = InterviewTimer()
         self.question_generator = QuestionGenerator()
         self.answer_evaluator = AnswerEvaluator()
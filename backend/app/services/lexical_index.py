@@ -0,0 +1,172 @@
+"""
+词法索引
+面向中文技术文本的 BM25 倒排索引（中文按字二元组切分，英文/数字按词），
+以及向量/词法结果的 RRF（Reciprocal Rank Fusion）融合
+"""
+
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+[+#]*|[一-鿿]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """切分词项：英文/数字整词（小写），中文连续片段切为字二元组"""
+    tokens = []
+    for match in _TOKEN_RE.finditer((text or "").lower()):
+        word = match.group()
+        if '一' <= word[0] <= '鿿':
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def match_where(metadata: Optional[dict], where: Optional[dict]) -> bool:
+    """按 Chroma where 语法过滤元数据（支持 $and/$or 及常用比较运算符）"""
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(match_where(metadata, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(match_where(metadata, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = metadata.get(key)
+            for op, expected in cond.items():
+                if not _compare(op, value, expected):
+                    return False
+        elif metadata.get(key) != cond:
+            return False
+    return True
+
+
+def _compare(op: str, value: Any, expected: Any) -> bool:
+    if op == "$eq":
+        return value == expected
+    if op == "$ne":
+        return value != expected
+    if op == "$in":
+        return value in expected
+    if op == "$nin":
+        return value not in expected
+    if value is None:
+        return False
+    if op == "$gt":
+        return value > expected
+    if op == "$gte":
+        return value >= expected
+    if op == "$lt":
+        return value < expected
+    if op == "$lte":
+        return value <= expected
+    raise ValueError(f"不支持的过滤运算符: {op}")
+
+
+class BM25Index:
+    """单个集合的BM25倒排索引（线程安全：检索和增量更新都在线程中执行）"""
+
+    def __init__(self, k1: float = None, b: float = None):
+        self.k1 = k1 if k1 is not None else settings.BM25_K1
+        self.b = b if b is not None else settings.BM25_B
+
+        self.docs: Dict[str, Tuple[str, dict, int]] = {}  # id -> (文本, 元数据, 词项数)
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)  # 词项 -> {id: 词频}
+        self.total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, ids: List[str], documents: List[str], metadatas: Optional[List[dict]] = None):
+        """添加（或覆盖）文档"""
+        metadatas = metadatas or [None] * len(ids)
+        tokenized = [Counter(tokenize(document)) for document in documents]
+        with self._lock:
+            self.remove([doc_id for doc_id in ids if doc_id in self.docs])
+            for doc_id, document, metadata, counts in zip(ids, documents, metadatas, tokenized):
+                length = sum(counts.values())
+                self.docs[doc_id] = (document, metadata or {}, length)
+                self.total_length += length
+                for term, tf in counts.items():
+                    self.postings[term][doc_id] = tf
+
+    def remove(self, ids: List[str]):
+        """删除文档"""
+        with self._lock:
+            for doc_id in ids:
+                entry = self.docs.pop(doc_id, None)
+                if entry is None:
+                    continue
+                self.total_length -= entry[2]
+                for term in set(tokenize(entry[0])):
+                    postings = self.postings.get(term)
+                    if postings is not None:
+                        postings.pop(doc_id, None)
+                        if not postings:
+                            del self.postings[term]
+
+    def search(self, query: str, top_k: int, where: Optional[dict] = None) -> List[dict]:
+        """BM25检索，返回与向量检索相同格式的结果"""
+        with self._lock:
+            return self._search(query, top_k, where)
+
+    def _search(self, query: str, top_k: int, where: Optional[dict]) -> List[dict]:
+        if not self.docs:
+            return []
+        total = len(self.docs)
+        avg_length = self.total_length / total or 1.0
+
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                length = self.docs[doc_id][2]
+                norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        candidates = (
+            (doc_id, score) for doc_id, score in scores.items()
+            if match_where(self.docs[doc_id][1], where)
+        )
+        return [
+            {
+                'id': doc_id,
+                'document': self.docs[doc_id][0],
+                'metadata': self.docs[doc_id][1],
+                'distance': None,
+                'score': score
+            }
+            for doc_id, score in heapq.nlargest(top_k, candidates, key=lambda item: item[1])
+        ]
+
+
+def reciprocal_rank_fusion(result_lists: List[List[dict]], top_k: int, k: int = None) -> List[dict]:
+    """RRF融合多路检索结果：score = Σ 1 / (k + rank)"""
+    k = k or settings.RRF_K
+    fused: Dict[str, dict] = {}
+    scores: Dict[str, float] = defaultdict(float)
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            scores[result['id']] += 1.0 / (k + rank)
+            fused.setdefault(result['id'], result)
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    return [{**fused[doc_id], 'score': score} for doc_id, score in ranked]
@@ -0,0 +1,159 @@
+"""
+LLM响应缓存
+两级内容寻址缓存：内存LRU（带TTL） + SQLite磁盘层
+key = sha256(model, messages, 参数)
+
+内存层在事件循环中同步检查，磁盘层的读写在线程中执行，不阻塞事件循环
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(model: str, messages: Any, **params) -> str:
+    """根据模型、消息和参数生成内容哈希"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """两级LLM响应缓存"""
+
+    def __init__(
+        self,
+        max_entries: int = None,
+        ttl: int = None,
+        db_path: Optional[str] = None
+    ):
+        self.max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+        self.ttl = ttl or settings.LLM_CACHE_TTL
+        self.db_path = db_path if db_path is not None else settings.LLM_CACHE_DB_PATH
+
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()  # 连接在多个线程间共用，串行访问
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0}
+
+        if self.db_path:
+            self._open_db()
+
+    def _open_db(self):
+        """打开磁盘层（失败时仅使用内存层）"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+        except sqlite3.Error as e:
+            logger.warning(f"LLM磁盘缓存不可用，仅使用内存缓存: {e}")
+            self._db = None
+
+    async def get(self, key: str) -> Optional[str]:
+        """读取缓存（内存 -> 磁盘）"""
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at >= now:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return value
+            del self._memory[key]
+
+        if self._db is not None:
+            row = await asyncio.to_thread(self._disk_get, key)
+            if row and row[1] >= now:
+                self._remember(key, row[0], row[1])
+                self.stats['disk_hits'] += 1
+                return row[0]
+
+        self.stats['misses'] += 1
+        return None
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None):
+        """写入缓存（内存 + 磁盘）"""
+        expires_at = time.time() + (ttl or self.ttl)
+        self._remember(key, value, expires_at)
+        self.stats['writes'] += 1
+
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, value, expires_at)
+
+    def _disk_get(self, key: str) -> Optional[Tuple[str, float]]:
+        """读取磁盘层（阻塞，在线程中执行）"""
+        try:
+            with self._db_lock:
+                return self._db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+
+    def _disk_set(self, key: str, value: str, expires_at: float):
+        """写入磁盘层（阻塞，在线程中执行）"""
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"写入LLM磁盘缓存失败: {e}")
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """清空缓存"""
+        self._memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM llm_cache")
+
+    def get_stats(self) -> Dict:
+        """获取命中统计"""
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        lookups = hits + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'disk_enabled': self._db is not None
+        }
+
+
+# Global instance
+_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """获取共享的LLM响应缓存"""
+    global _cache
+    if _cache is None:
+        _cache = LLMResponseCache()
+    return _cache
@@ -0,0 +1,220 @@
+"""
+LLM并发调度器
+进程内统一管控GLM-4调用：按模型令牌桶限流、有界等待队列、优先级调度
+（在线面试评估 > 简历解析 > 知识库批量增强）
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Dict, List, Optional
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class Priority(IntEnum):
+    """调用优先级（数值越小越优先）"""
+    INTERACTIVE = 0   # 在线面试：评估、追问、对话
+    RESUME = 1        # 简历解析
+    BATCH = 2         # 知识库构建/批量增强
+
+
+class LLMQueueFullError(Exception):
+    """等待队列已满"""
+
+
+class TokenBucket:
+    """令牌桶限流器（预约式，无需加锁）"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def reserve(self) -> float:
+        """预约一个令牌，返回需要等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class _PriorityStats:
+    """单个优先级的统计"""
+
+    def __init__(self):
+        self.requests = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        self.requests += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+class LLMScheduler:
+    """LLM调用调度器"""
+
+    def __init__(
+        self,
+        max_concurrency: int = None,
+        max_queue: int = None,
+        batch_max_concurrency: int = None,
+        model_rps: Dict[str, float] = None,
+        default_rps: float = None,
+        burst: float = None
+    ):
+        self.max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY
+        self.max_queue = max_queue or settings.LLM_MAX_QUEUE
+        self.priority_limits = {
+            Priority.BATCH: batch_max_concurrency or settings.LLM_BATCH_MAX_CONCURRENCY
+        }
+        self.model_rps = model_rps if model_rps is not None else settings.LLM_MODEL_RPS
+        self.default_rps = default_rps if default_rps is not None else settings.LLM_DEFAULT_RPS
+        self.burst = burst or settings.LLM_RATE_BURST
+
+        self._active: Dict[Priority, int] = {p: 0 for p in Priority}
+        self._waiters: List[tuple] = []  # (priority, seq, future)
+        self._seq = itertools.count()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._stats: Dict[Priority, _PriorityStats] = {p: _PriorityStats() for p in Priority}
+        self._rate_wait: Dict[str, float] = {}
+
+    @property
+    def active(self) -> int:
+        return sum(self._active.values())
+
+    def _can_run(self, priority: Priority) -> bool:
+        if self.active >= self.max_concurrency:
+            return False
+        limit = self.priority_limits.get(priority)
+        return limit is None or self._active[priority] < limit
+
+    def _bucket(self, model: str) -> TokenBucket:
+        bucket = self._buckets.get(model)
+        if bucket is None:
+            rate = self.model_rps.get(model, self.default_rps)
+            bucket = TokenBucket(rate, self.burst)
+            self._buckets[model] = bucket
+        return bucket
+
+    async def _acquire(self, priority: Priority):
+        """获取并发槽位（按优先级排队）"""
+        if len(self._waiters) >= self.max_queue:
+            self._stats[priority].rejected += 1
+            raise LLMQueueFullError(f"LLM请求队列已满（{self.max_queue}）")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._wake()
+        if future.done():
+            return
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已分配槽位但调用方被取消，归还槽位
+                self._release(priority)
+            else:
+                self._waiters = [w for w in self._waiters if w[2] is not future]
+                heapq.heapify(self._waiters)
+            raise
+
+    def _release(self, priority: Priority):
+        """释放槽位并唤醒可运行的最高优先级等待者"""
+        self._active[priority] -= 1
+        self._wake()
+
+    def _wake(self):
+        for waiter in sorted(self._waiters):
+            if self.active >= self.max_concurrency:
+                break
+            waiter_priority, _, future = waiter
+            if future.done():
+                self._waiters.remove(waiter)
+                continue
+            if not self._can_run(waiter_priority):
+                continue
+            self._waiters.remove(waiter)
+            self._active[waiter_priority] += 1
+            future.set_result(None)
+        heapq.heapify(self._waiters)
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: Priority = Priority.INTERACTIVE):
+        """
+        占用一次LLM调用配额
+
+        用法:
+            async with scheduler.slot(model, Priority.BATCH):
+                ...
+        """
+        start = time.monotonic()
+        await self._acquire(priority)
+        try:
+            delay = self._bucket(model).reserve()
+            if delay > 0:
+                self._rate_wait[model] = self._rate_wait.get(model, 0.0) + delay
+                await asyncio.sleep(delay)
+            self._stats[priority].record(time.monotonic() - start)
+            yield
+        finally:
+            self._release(priority)
+
+    def get_stats(self) -> Dict:
+        """获取队列深度与等待时间统计"""
+        queued = {p.name.lower(): 0 for p in Priority}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                queued[Priority(priority).name.lower()] += 1
+
+        priorities = {}
+        for priority, stats in self._stats.items():
+            priorities[priority.name.lower()] = {
+                'active': self._active[priority],
+                'queued': queued[priority.name.lower()],
+                'requests': stats.requests,
+                'rejected': stats.rejected,
+                'avg_wait_ms': round(stats.total_wait / stats.requests * 1000, 2) if stats.requests else 0.0,
+                'max_wait_ms': round(stats.max_wait * 1000, 2)
+            }
+
+        return {
+            'max_concurrency': self.max_concurrency,
+            'active': self.active,
+            'queue_depth': sum(queued.values()),
+            'max_queue': self.max_queue,
+            'priorities': priorities,
+            'rate_limits': {
+                model: {
+                    'rps': bucket.rate,
+                    'tokens': round(bucket.tokens, 2),
+                    'total_rate_wait_ms': round(self._rate_wait.get(model, 0.0) * 1000, 2)
+                }
+                for model, bucket in self._buckets.items()
+            }
+        }
+
+
+# Global instance
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """获取共享的LLM调度器"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler()
+    return _scheduler
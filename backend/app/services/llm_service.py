@@ -1,23 +1,41 @@
 import os
 import uuid
+import asyncio
+import logging
 import aiofiles
-from typing import List, Optional
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 
-from zhipuai import ZhipuAI
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-
 from app.core.config import get_settings
+from app.services.llm_transport import get_glm4_transport
+from app.services.llm_scheduler import Priority, get_llm_scheduler
+from app.services.llm_cache import get_llm_cache, make_cache_key
+from app.services.singleflight import get_singleflight
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import get_embedding_cache
+from app.services.chroma_client import get_chroma_client
+from app.services.lexical_index import BM25Index, reciprocal_rank_fusion
+from app.services.collection_log import LogPosition, collection_log
+from app.services.retrieval_cache import get_retrieval_cache
+from app.services.vector_compression import (
+    PLACEHOLDER_EMBEDDING, CompressedVectorIndex, get_compressed_index
+)
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 
 class GLM4Service:
     """GLM-4 API服务封装"""
     
     def __init__(self):
-        self.client = ZhipuAI(api_key=settings.GLM4_API_KEY)
+        self.transport = get_glm4_transport()
+        self.scheduler = get_llm_scheduler()
+        self.cache = get_llm_cache() if settings.LLM_CACHE_ENABLED else None
+        self.singleflight = get_singleflight()
+        self.embedding_batchers: Dict[Priority, EmbeddingBatcher] = {}
+        self.embedding_cache = get_embedding_cache() if settings.EMBEDDING_CACHE_ENABLED else None
         self.model = settings.GLM4_MODEL
         self.embedding_model = settings.GLM4_EMBEDDING_MODEL
     
@@ -26,51 +44,212 @@ class GLM4Service:
         messages: List[dict],
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
-        stream: bool = False
+        stream: bool = False,
+        timeout: Optional[float] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        cache: Optional[bool] = None
     ) -> str:
-        """调用GLM-4进行对话"""
+        """
+        调用GLM-4进行对话
+        
+        cache: None 时仅缓存低温度（<= LLM_CACHE_MAX_TEMPERATURE）调用，True/False 强制开启/关闭
+        并发的相同请求只会发起一次上游调用
+        """
+        temperature = temperature or settings.TEMPERATURE
+        max_tokens = max_tokens or settings.MAX_TOKENS
+        request_key = make_cache_key(
+            self.model, messages, temperature=temperature, max_tokens=max_tokens
+        )
+        
+        if cache is None:
+            cache = temperature <= settings.LLM_CACHE_MAX_TEMPERATURE
+        use_cache = cache and self.cache is not None
+        if use_cache:
+            cached = await self.cache.get(request_key)
+            if cached is not None:
+                return cached
+        
+        content = await self.singleflight.do(
+            request_key,
+            lambda: self._request_chat(messages, temperature, max_tokens, stream, timeout, priority)
+        )
+        
+        if use_cache:
+            await self.cache.set(request_key, content)
+        return content
+    
+    async def _request_chat(
+        self,
+        messages: List[dict],
+        temperature: float,
+        max_tokens: int,
+        stream: bool,
+        timeout: Optional[float],
+        priority: Priority
+    ) -> str:
+        """向上游发起一次对话请求"""
+        if stream:
+            chunks = []
+            async for delta in self.stream_chat_completion(
+                messages, temperature, max_tokens, timeout, priority
+            ):
+                chunks.append(delta)
+            return "".join(chunks)
+        
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature or settings.TEMPERATURE,
-                max_tokens=max_tokens or settings.MAX_TOKENS,
-                stream=stream
-            )
-            
-            if stream:
-                # Handle streaming response
-                full_response = ""
-                for chunk in response:
-                    if chunk.choices[0].delta.content:
-                        full_response += chunk.choices[0].delta.content
-                return full_response
-            else:
-                return response.choices[0].message.content
+            async with self.scheduler.slot(self.model, priority):
+                response = await self.transport.post(
+                    "/chat/completions",
+                    {
+                        "model": self.model,
+                        "messages": messages,
+                        "temperature": temperature,
+                        "max_tokens": max_tokens,
+                        "stream": False
+                    },
+                    timeout=timeout
+                )
+            return response["choices"][0]["message"]["content"]
+        except Exception as e:
+            raise Exception(f"GLM-4 API调用失败: {str(e)}")
+    
+    async def stream_chat_completion(
+        self,
+        messages: List[dict],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        priority: Priority = Priority.INTERACTIVE
+    ) -> AsyncIterator[str]:
+        """流式调用GLM-4，逐段产出增量文本"""
+        try:
+            async with self.scheduler.slot(self.model, priority):
+                async for chunk in self.transport.stream(
+                    "/chat/completions",
+                    {
+                        "model": self.model,
+                        "messages": messages,
+                        "temperature": temperature or settings.TEMPERATURE,
+                        "max_tokens": max_tokens or settings.MAX_TOKENS,
+                        "stream": True
+                    },
+                    timeout=timeout
+                ):
+                    choices = chunk.get("choices") or []
+                    if choices:
+                        delta = choices[0].get("delta", {}).get("content")
+                        if delta:
+                            yield delta
         except Exception as e:
             raise Exception(f"GLM-4 API调用失败: {str(e)}")
     
-    async def generate_embedding(self, text: str) -> List[float]:
-        """生成文本向量"""
+    async def generate_embedding(
+        self,
+        text: str,
+        timeout: Optional[float] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        persist: bool = False
+    ) -> List[float]:
+        """
+        生成文本向量
+        
+        persist: 是否写入磁盘缓存（文档向量），默认只缓存在内存（查询向量）
+        """
+        if self.embedding_cache is not None:
+            cached = await self.embedding_cache.get(self.embedding_model, text)
+            if cached is not None:
+                return cached
+        
         try:
-            response = self.client.embeddings.create(
-                model=self.embedding_model,
-                input=text
+            vector = await self.singleflight.do(
+                make_cache_key(self.embedding_model, text),
+                lambda: self._embed_one(text, timeout, priority)
             )
-            return response.data[0].embedding
         except Exception as e:
             raise Exception(f"Embedding生成失败: {str(e)}")
+        
+        if self.embedding_cache is not None:
+            await self.embedding_cache.put(self.embedding_model, text, vector, persist=persist)
+        return vector
 
-    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """批量生成文本向量"""
-        try:
-            response = self.client.embeddings.create(
-                model=self.embedding_model,
-                input=texts
+    async def generate_embeddings(
+        self,
+        texts: List[str],
+        timeout: Optional[float] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        persist: bool = True
+    ) -> List[List[float]]:
+        """
+        批量生成文本向量（只对缓存未命中的文本调用API）
+        
+        persist: 是否写入磁盘缓存，批量调用多为文档向量，默认写入
+        """
+        if self.embedding_cache is None:
+            results = [None] * len(texts)
+        else:
+            results = await self.embedding_cache.get_many(self.embedding_model, texts)
+        
+        missing = list(dict.fromkeys(t for t, r in zip(texts, results) if r is None))
+        if missing:
+            try:
+                vectors = await self.singleflight.do(
+                    make_cache_key(self.embedding_model, missing),
+                    lambda: self._request_embeddings(missing, timeout, priority)
+                )
+            except Exception as e:
+                raise Exception(f"批量Embedding生成失败: {str(e)}")
+            
+            if self.embedding_cache is not None:
+                await self.embedding_cache.put_many(self.embedding_model, missing, vectors, persist=persist)
+            by_text = dict(zip(missing, vectors))
+            results = [r if r is not None else by_text[t] for t, r in zip(texts, results)]
+        
+        return results
+    
+    async def _embed_one(self, text: str, timeout: Optional[float], priority: Priority) -> List[float]:
+        """单条向量化：默认进入微批处理，指定超时时直接请求"""
+        if settings.EMBEDDING_BATCH_ENABLED and timeout is None:
+            return await self._get_embedding_batcher(priority).embed(text)
+        embeddings = await self._request_embeddings(text, timeout, priority)
+        return embeddings[0]
+    
+    def _get_embedding_batcher(self, priority: Priority) -> EmbeddingBatcher:
+        """按优先级获取微批处理器（批次内共享同一调度优先级）"""
+        batcher = self.embedding_batchers.get(priority)
+        if batcher is None:
+            batcher = EmbeddingBatcher(
+                lambda texts: self._request_embeddings(texts, None, priority)
             )
-            return [item.embedding for item in response.data]
-        except Exception as e:
-            raise Exception(f"批量Embedding生成失败: {str(e)}")
+            self.embedding_batchers[priority] = batcher
+        return batcher
+    
+    async def close(self):
+        """等待微批处理中的Embedding请求完成（应用退出时在关闭传输之前调用）"""
+        for batcher in self.embedding_batchers.values():
+            await batcher.close()
+    
+    def get_embedding_batch_stats(self) -> Dict:
+        """获取Embedding微批处理统计"""
+        return {
+            priority.name.lower(): batcher.get_stats()
+            for priority, batcher in self.embedding_batchers.items()
+        }
+
+    async def _request_embeddings(
+        self,
+        texts,
+        timeout: Optional[float],
+        priority: Priority
+    ) -> List[List[float]]:
+        """向上游发起一次Embedding请求（input 可为单条文本或列表）"""
+        async with self.scheduler.slot(self.embedding_model, priority):
+            response = await self.transport.post(
+                "/embeddings",
+                {"model": self.embedding_model, "input": texts},
+                timeout=timeout
+            )
+        data = sorted(response["data"], key=lambda item: item.get("index", 0))
+        return [item["embedding"] for item in data]
     
     async def evaluate_answer(
         self,
@@ -142,83 +321,569 @@ class VectorStoreService:
     """向量数据库服务"""
     
     def __init__(self):
-        self.client = chromadb.PersistentClient(
-            path=settings.CHROMA_DB_PATH,
-            settings=ChromaSettings(
-                anonymized_telemetry=False
-            )
-        )
-        self.glm4_service = GLM4Service()
+        self.chroma = get_chroma_client()
+        self.glm4_service = get_glm4_service()
+        # 集合名 -> (实际集合名, 已同步到的写入日志位置, 词法索引)
+        self.lexical_indexes: "OrderedDict[str, Tuple[str, LogPosition, BM25Index]]" = OrderedDict()
+        self.collection_log = collection_log
+        self._lexical_locks: Dict[str, asyncio.Lock] = {}  # 串行化同一集合词法索引的同步/更新
+        self.retrieval_cache = get_retrieval_cache() if settings.RETRIEVAL_CACHE_ENABLED else None
+    
+    @property
+    def client(self):
+        return self.chroma.client
     
     async def create_collection(self, name: str):
-        """创建集合"""
-        return self.client.get_or_create_collection(name=name)
+        """创建集合（句柄已缓存时不访问数据库）"""
+        return self.chroma.get_collection(name)
     
     async def add_documents(
         self,
         collection_name: str,
         documents: List[str],
         metadatas: List[dict],
-        ids: Optional[List[str]] = None
+        ids: Optional[List[str]] = None,
+        priority: Priority = Priority.RESUME,
+        progress: Optional[Callable[[int], None]] = None
     ):
-        """添加文档到向量库"""
-        collection = await self.create_collection(collection_name)
+        """
+        添加文档到向量库
+        
+        progress: 每个Embedding批次完成后回调该批次的条数
+        """
+        if not documents:
+            await self.create_collection(collection_name)
+            return []
         
         # Generate embeddings
-        embeddings = []
-        for doc in documents:
-            embedding = await self.glm4_service.generate_embedding(doc)
-            embeddings.append(embedding)
+        embeddings = await self.embed_documents(documents, priority=priority, progress=progress)
         
         # Generate IDs if not provided
         if ids is None:
             ids = [str(uuid.uuid4()) for _ in documents]
         
-        collection.add(
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
+        return await self.add_embeddings(collection_name, ids, embeddings, documents, metadatas)
+    
+    async def add_embeddings(
+        self,
+        collection_name: str,
+        ids: List[str],
+        embeddings: List[List[float]],
+        documents: List[str],
+        metadatas: List[dict]
+    ) -> List[str]:
+        """写入已生成向量的文档（流式入库逐批调用，写入后即可检索）"""
+        collection = await self.create_collection(collection_name)
+        
+        # 启用压缩层时向量只写入压缩索引，Chroma 存占位向量
+        compressed_index = self._compressed_index(collection_name)
+        if compressed_index is not None:
+            await asyncio.to_thread(compressed_index.add, ids, embeddings)
+            embeddings = [PLACEHOLDER_EMBEDDING] * len(ids)
+        
+        await asyncio.to_thread(self.upsert_batch, collection, ids, embeddings, documents, metadatas)
+        
+        physical_name, before, after = await self._record_write(
+            collection_name, added=ids, document_ids=[(m or {}).get('document_id') for m in metadatas]
         )
+        await self._update_lexical_index(collection_name, physical_name, before, after, ids, documents, metadatas)
         
         return ids
     
+    @staticmethod
+    def upsert_batch(
+        collection,
+        ids: List[str],
+        embeddings: List[List[float]],
+        documents: List[str],
+        metadatas: List[dict]
+    ):
+        """按 CHROMA_WRITE_BATCH_SIZE 分批写入（http 模式下每批一次RPC）"""
+        size = settings.CHROMA_WRITE_BATCH_SIZE
+        for start in range(0, len(ids), size):
+            collection.upsert(
+                ids=ids[start:start + size],
+                embeddings=embeddings[start:start + size],
+                documents=documents[start:start + size],
+                metadatas=metadatas[start:start + size]
+            )
+    
+    async def embed_documents(
+        self,
+        documents: List[str],
+        priority: Priority = Priority.RESUME,
+        progress: Optional[Callable[[int], None]] = None
+    ) -> List[List[float]]:
+        """分批并发生成文档向量，失败的批次单独重试"""
+        semaphore = asyncio.Semaphore(settings.EMBEDDING_INGEST_CONCURRENCY)
+        
+        async def embed_batch(start: int, end: int) -> List[List[float]]:
+            async with semaphore:
+                vectors = await self.embed_batch(documents[start:end], priority, label=f"[{start}:{end}]")
+                if progress:
+                    progress(end - start)
+                return vectors
+        
+        results = await asyncio.gather(
+            *(embed_batch(start, end) for start, end in self._split_batches(documents))
+        )
+        return [vector for batch in results for vector in batch]
+    
+    async def embed_batch(
+        self,
+        documents: List[str],
+        priority: Priority = Priority.RESUME,
+        label: str = ""
+    ) -> List[List[float]]:
+        """生成一个批次的向量，失败时按 EMBEDDING_INGEST_RETRY_BACKOFF 指数退避重试"""
+        max_retries = settings.EMBEDDING_INGEST_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            try:
+                return await self.glm4_service.generate_embeddings(documents, priority=priority, persist=True)
+            except Exception as e:
+                if attempt == max_retries:
+                    raise
+                delay = settings.EMBEDDING_INGEST_RETRY_BACKOFF * (2 ** attempt)
+                logger.warning(f"Embedding批次{label}失败，{delay:.1f}秒后重试: {e}")
+                await asyncio.sleep(delay)
+    
+    @staticmethod
+    def _split_batches(documents: List[str]) -> List[tuple]:
+        """按条数和总字符数切分批次，不超过API单次输入限制"""
+        max_size = settings.EMBEDDING_INGEST_BATCH_SIZE
+        max_chars = settings.EMBEDDING_INGEST_MAX_BATCH_CHARS
+        batches = []
+        start, chars = 0, 0
+        for i, doc in enumerate(documents):
+            if i > start and (i - start >= max_size or chars + len(doc) > max_chars):
+                batches.append((start, i))
+                start, chars = i, 0
+            chars += len(doc)
+        if start < len(documents):
+            batches.append((start, len(documents)))
+        return batches
+    
     async def search(
         self,
         collection_name: str,
         query: str,
         top_k: int = None,
+        filter_dict: Optional[dict] = None,
+        mode: Optional[str] = None
+    ) -> List[dict]:
+        """
+        搜索相关文档
+        
+        mode: vector（向量）/ lexical（BM25，不调用Embedding）/ hybrid（两路RRF融合），默认 RETRIEVAL_MODE
+        """
+        return await self.search_many([collection_name], query, top_k, filter_dict, mode=mode)
+    
+    async def search_many(
+        self,
+        collection_names: List[str],
+        query: str,
+        top_k: int = None,
+        filter_dict: Optional[dict] = None,
+        weights: Optional[Dict[str, float]] = None,
+        mode: Optional[str] = None,
+        document_ids: Optional[List[str]] = None
+    ) -> List[dict]:
+        """
+        在多个集合中并发检索，合并为全局top-k
+        
+        查询向量只生成一次；weights 为各集合权重（默认1.0，<=0 表示跳过该集合），
+        向量模式按 distance / weight 排序，lexical/hybrid 按 score * weight 排序；
+        document_ids 为 filter_dict 限定的文档，检索缓存只按这些文档的写版本校验
+        """
+        top_k = top_k or settings.TOP_K_RETRIEVAL
+        mode = mode or settings.RETRIEVAL_MODE
+        if mode not in ("vector", "lexical", "hybrid"):
+            raise ValueError(f"未知的检索模式: {mode}")
+        
+        weights = weights or {}
+        names = [name for name in dict.fromkeys(collection_names) if weights.get(name, 1.0) > 0]
+        if not names:
+            return []
+        candidates = top_k if mode == "vector" else max(top_k, settings.HYBRID_CANDIDATES)
+        
+        # 检索结果缓存（按实际集合或所限定文档的写版本校验）
+        cache_key = None
+        if self.retrieval_cache is not None:
+            physical_names = [self.chroma.resolve(name) for name in names]
+            scopes = physical_names if document_ids is None else [
+                self.retrieval_cache.scope(name, document_id)
+                for name in physical_names for document_id in document_ids
+            ]
+            cache_key = self.retrieval_cache.make_key(
+                physical_names, query,
+                top_k=top_k,
+                filter=filter_dict,
+                weights=[weights.get(name, 1.0) for name in names],
+                mode=mode
+            )
+            cached = self.retrieval_cache.get(cache_key, scopes)
+            if cached is not None:
+                return cached
+            versions = tuple(self.retrieval_cache.version(scope) for scope in scopes)
+        
+        async def vector_search():
+            if mode == "lexical":
+                return [[] for _ in names]
+            query_embedding = await self.glm4_service.generate_embedding(query)
+            return await asyncio.gather(*(
+                asyncio.to_thread(self._vector_search, name, query_embedding, candidates, filter_dict)
+                for name in names
+            ))
+        
+        async def lexical_search():
+            if mode == "vector":
+                return [[] for _ in names]
+            return await asyncio.gather(*(
+                self._lexical_search(name, query, candidates, filter_dict) for name in names
+            ))
+        
+        # 两路检索、各集合之间都并发执行
+        vector_lists, lexical_lists = await asyncio.gather(vector_search(), lexical_search())
+        
+        merged = []
+        for name, vector_results, lexical_results in zip(names, vector_lists, lexical_lists):
+            weight = weights.get(name, 1.0)
+            if mode == "vector":
+                results = vector_results
+            elif mode == "lexical":
+                results = lexical_results
+            else:
+                results = reciprocal_rank_fusion([vector_results, lexical_results], top_k)
+            
+            for result in results:
+                merged.append((self._rank_key(result, weight, mode), {**result, 'collection': name}))
+        
+        merged.sort(key=lambda item: item[0])
+        results = [result for _, result in merged[:top_k]]
+        
+        if cache_key is not None:
+            self.retrieval_cache.set(cache_key, results, versions)
+        return results
+    
+    async def search_batch(
+        self,
+        collection_name: str,
+        queries: List[str],
+        top_k: int = None,
         filter_dict: Optional[dict] = None
+    ) -> List[List[dict]]:
+        """
+        同一集合的多个查询批量向量检索
+        
+        查询向量一次批量生成，检索合并为一次 collection.query（http 模式下一次RPC）
+        """
+        if not queries:
+            return []
+        top_k = top_k or settings.TOP_K_RETRIEVAL
+        query_embeddings = await self.glm4_service.generate_embeddings(queries, persist=False)
+        return await asyncio.to_thread(
+            self._vector_search_batch, collection_name, query_embeddings, top_k, filter_dict
+        )
+    
+    async def search_documents(
+        self,
+        document_ids: List[str],
+        query: str,
+        top_k: int = None,
+        weights: Optional[Dict[str, float]] = None,
+        mode: Optional[str] = None
     ) -> List[dict]:
-        """搜索相似文档"""
-        collection = await self.create_collection(collection_name)
+        """
+        在文档库集合中按 document_id 过滤检索（一次查询覆盖所有文档）
+        
+        weights 为各文档的权重，排序规则同 search_many
+        """
+        top_k = top_k or settings.TOP_K_RETRIEVAL
+        mode = mode or settings.RETRIEVAL_MODE
+        weights = weights or {}
+        document_ids = [d for d in dict.fromkeys(document_ids) if weights.get(d, 1.0) > 0]
+        if not document_ids:
+            return []
         
-        # Generate query embedding
-        query_embedding = await self.glm4_service.generate_embedding(query)
+        if len(document_ids) == 1:
+            filter_dict = {"document_id": document_ids[0]}
+        else:
+            filter_dict = {"document_id": {"$in": document_ids}}
+        
+        # 有权重时多取候选再重排
+        candidates = max(top_k, settings.HYBRID_CANDIDATES) if weights else top_k
+        results = await self.search_many(
+            [settings.DOCUMENT_COLLECTION], query, candidates, filter_dict, mode=mode, document_ids=document_ids
+        )
+        if not weights:
+            return results[:top_k]
+        
+        results.sort(key=lambda r: self._rank_key(r, weights.get(r['metadata'].get('document_id'), 1.0), mode))
+        return results[:top_k]
+    
+    @staticmethod
+    def _rank_key(result: dict, weight: float, mode: str) -> float:
+        """加权排序键（越小越靠前）"""
+        if mode == "vector":
+            return result['distance'] / weight
+        return -result['score'] * weight
+    
+    def _vector_search(
+        self,
+        collection_name: str,
+        query_embedding: List[float],
+        top_k: int,
+        filter_dict: Optional[dict]
+    ) -> List[dict]:
+        """向量相似度检索（同步，可在线程中并发执行）"""
+        return self._vector_search_batch(collection_name, [query_embedding], top_k, filter_dict)[0]
+    
+    def _vector_search_batch(
+        self,
+        collection_name: str,
+        query_embeddings: List[List[float]],
+        top_k: int,
+        filter_dict: Optional[dict]
+    ) -> List[List[dict]]:
+        """多个查询向量一次检索，返回每个查询的结果"""
+        collection = self.chroma.get_collection(collection_name)
+        compressed_index = self._compressed_index(collection_name)
+        if compressed_index is not None:
+            return self._compressed_search(collection, compressed_index, query_embeddings, top_k, filter_dict)
         
         # Search
         results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k or settings.TOP_K_RETRIEVAL,
+            query_embeddings=query_embeddings,
+            n_results=top_k,
             where=filter_dict
         )
         
-        # Format results
-        formatted_results = []
-        for i in range(len(results['ids'][0])):
-            formatted_results.append({
-                'id': results['ids'][0][i],
-                'document': results['documents'][0][i],
-                'metadata': results['metadatas'][0][i],
-                'distance': results['distances'][0][i]
-            })
+        # Format results（多查询时服务端可能多返回已删除向量的邻居，截断到 top_k）
+        return [
+            [
+                {
+                    'id': results['ids'][q][i],
+                    'document': results['documents'][q][i],
+                    'metadata': results['metadatas'][q][i],
+                    'distance': results['distances'][q][i]
+                }
+                for i in range(min(top_k, len(results['ids'][q])))
+            ]
+            for q in range(len(query_embeddings))
+        ]
+    
+    @staticmethod
+    def _compressed_search(
+        collection,
+        index: CompressedVectorIndex,
+        query_embeddings: List[List[float]],
+        top_k: int,
+        filter_dict: Optional[dict]
+    ) -> List[List[dict]]:
+        """压缩层检索：元数据过滤在 Chroma 中求候选 id，向量在压缩索引中粗排+精排"""
+        allowed_ids = collection.get(where=filter_dict, include=[])['ids'] if filter_dict else None
+        hits = [index.search(embedding, top_k, allowed_ids) for embedding in query_embeddings]
+        hit_ids = list(dict.fromkeys(doc_id for query_hits in hits for doc_id, _ in query_hits))
+        if not hit_ids:
+            return [[] for _ in query_embeddings]
         
-        return formatted_results
+        data = collection.get(ids=hit_ids, include=["documents", "metadatas"])
+        records = {
+            doc_id: (document, metadata)
+            for doc_id, document, metadata in zip(data['ids'], data['documents'], data['metadatas'])
+        }
+        # 归一化向量的平方L2距离，与 Chroma 默认的 l2 距离一致
+        return [
+            [
+                {
+                    'id': doc_id,
+                    'document': records[doc_id][0],
+                    'metadata': records[doc_id][1],
+                    'distance': 2.0 - 2.0 * score
+                }
+                for doc_id, score in query_hits if doc_id in records
+            ]
+            for query_hits in hits
+        ]
+    
+    def _compressed_index(self, collection_name: str) -> Optional[CompressedVectorIndex]:
+        """集合启用压缩层时返回其压缩索引"""
+        if not settings.VECTOR_COMPRESSION or collection_name != settings.DOCUMENT_COLLECTION:
+            return None
+        return get_compressed_index(self.chroma.resolve(collection_name))
+    
+    async def _lexical_search(
+        self,
+        collection_name: str,
+        query: str,
+        top_k: int,
+        filter_dict: Optional[dict]
+    ) -> List[dict]:
+        """BM25词法检索（在线程中执行）"""
+        index = await self._get_lexical_index(collection_name)
+        return await asyncio.to_thread(index.search, query, top_k, filter_dict)
+    
+    def _lexical_lock(self, collection_name: str) -> asyncio.Lock:
+        return self._lexical_locks.setdefault(collection_name, asyncio.Lock())
+    
+    async def _get_lexical_index(self, collection_name: str) -> BM25Index:
+        """
+        获取集合的词法索引
+        
+        按集合写入日志的位置判断是否有其他进程写入：位置未变时直接返回（不访问向量库），
+        变化时只拉取日志中新增的分块增量更新；首次使用或日志换新文件时在线程中全量重建
+        """
+        physical_name = self.chroma.resolve(collection_name)
+        async with self._lexical_lock(collection_name):
+            entry = self.lexical_indexes.get(collection_name)
+            if entry is not None and entry[0] == physical_name:
+                position = entry[1]
+                if position != self.collection_log.position(physical_name):
+                    changes = await asyncio.to_thread(
+                        self._sync_lexical_index, collection_name, physical_name, position, entry[2]
+                    )
+                    entry = None if changes is None else (physical_name, changes, entry[2])
+            else:
+                entry = None
+            
+            if entry is None:
+                entry = await asyncio.to_thread(self._build_lexical_index, collection_name, physical_name)
+            self.lexical_indexes[collection_name] = entry
+        
+        self.lexical_indexes.move_to_end(collection_name)
+        while len(self.lexical_indexes) > settings.LEXICAL_INDEX_MAX_COLLECTIONS:
+            self.lexical_indexes.popitem(last=False)
+        return entry[2]
+    
+    def _build_lexical_index(self, collection_name: str, physical_name: str) -> Tuple[str, LogPosition, BM25Index]:
+        """全量构建词法索引（同步，在线程中执行）"""
+        # 先取日志位置：读取期间的写入在下次检索时按日志重放（重复写入/删除是幂等的）
+        position = self.collection_log.position(physical_name)
+        data = self.chroma.get_collection(collection_name).get(include=["documents", "metadatas"])
+        index = BM25Index()
+        index.add(data['ids'], data['documents'], data['metadatas'])
+        return physical_name, position, index
+    
+    def _sync_lexical_index(
+        self,
+        collection_name: str,
+        physical_name: str,
+        position: LogPosition,
+        index: BM25Index
+    ) -> Optional[LogPosition]:
+        """按写入日志增量更新词法索引（同步，在线程中执行），返回新位置；日志已换新文件时返回 None"""
+        changes = self._fetch_lexical_changes(collection_name, physical_name, position)
+        if changes is None:
+            return None
+        new_position, removed, data = changes
+        index.remove(removed)
+        index.add(data['ids'], data['documents'], data['metadatas'])
+        return new_position
+    
+    def _fetch_lexical_changes(self, collection_name: str, physical_name: str, position: LogPosition):
+        """
+        读取写入日志 position 之后的变更，返回 (新位置, 删除的id, 新增分块)
+        
+        日志已换新文件时返回 None
+        """
+        changes = self.collection_log.read(physical_name, position)
+        if changes is None:
+            return None
+        new_position, entries = changes
+        latest = {doc_id: op for op, doc_id in entries}
+        added = [doc_id for doc_id, op in latest.items() if op == "+"]
+        removed = [doc_id for doc_id, op in latest.items() if op == "-"]
+        data = {'ids': [], 'documents': [], 'metadatas': []}
+        if added:
+            # 之后又被删除的分块不在结果中
+            data = self.chroma.get_collection(collection_name).get(ids=added, include=["documents", "metadatas"])
+        return new_position, removed, data
+    
+    async def _update_lexical_index(
+        self,
+        collection_name: str,
+        physical_name: str,
+        before: LogPosition,
+        after: LogPosition,
+        ids: List[str],
+        documents: Optional[List[str]] = None,
+        metadatas: Optional[List[dict]] = None
+    ):
+        """
+        本进程写入后增量更新已加载的词法索引（documents 为 None 表示删除）
+        
+        索引未同步到本次写入之前的位置（其他进程也有写入）时不更新，下次检索时按日志同步
+        """
+        async with self._lexical_lock(collection_name):
+            entry = self.lexical_indexes.get(collection_name)
+            if entry is None or entry[:2] != (physical_name, before):
+                return
+            index = entry[2]
+            if documents is None:
+                await asyncio.to_thread(index.remove, ids)
+            else:
+                await asyncio.to_thread(index.add, ids, documents, metadatas)
+            self.lexical_indexes[collection_name] = (physical_name, after, index)
+    
+    async def _record_write(
+        self,
+        collection_name: str,
+        added: List[str] = (),
+        removed: List[str] = (),
+        document_ids: List[Optional[str]] = ()
+    ) -> Tuple[str, LogPosition, LogPosition]:
+        """
+        记录集合的写入：追加写入日志，使集合及涉及文档（document_ids）的检索缓存失效
+        
+        返回 (实际集合名, 写入前日志位置, 写入后日志位置)
+        """
+        physical_name = self.chroma.resolve(collection_name)
+        
+        def record():
+            positions = self.collection_log.append(physical_name, added, removed)
+            if self.retrieval_cache is not None:
+                self.retrieval_cache.bump(physical_name)
+                for document_id in set(document_ids) - {None}:
+                    self.retrieval_cache.bump(self.retrieval_cache.scope(physical_name, document_id))
+            return positions
+        
+        before, after = await asyncio.to_thread(record)
+        return physical_name, before, after
+    
+    def _delete_where(self, collection_name: str, where: dict) -> Tuple[List[str], List[Optional[str]]]:
+        """按元数据条件删除（同步，在线程中执行），返回删除的id及其 document_id"""
+        collection = self.chroma.get_collection(collection_name)
+        data = collection.get(where=where, include=["metadatas"])
+        ids = data['ids']
+        if ids:
+            collection.delete(ids=ids)
+            compressed_index = self._compressed_index(collection_name)
+            if compressed_index is not None:
+                compressed_index.remove(ids)
+        return ids, [(m or {}).get('document_id') for m in data['metadatas']]
+    
+    async def delete_documents(self, collection_name: str, where: dict) -> int:
+        """按元数据条件删除集合内的文档，返回删除的条数"""
+        ids, document_ids = await asyncio.to_thread(self._delete_where, collection_name, where)
+        if ids:
+            physical_name, before, after = await self._record_write(
+                collection_name, removed=ids, document_ids=document_ids
+            )
+            await self._update_lexical_index(collection_name, physical_name, before, after, ids)
+        return len(ids)
     
     async def delete_collection(self, name: str):
         """删除集合"""
+        self.lexical_indexes.pop(name, None)
         try:
-            self.client.delete_collection(name=name)
+            physical_name = self.chroma.resolve(name)
+            compressed_index = self._compressed_index(name)
+            self.chroma.delete_collection(name)
+            if compressed_index is not None:
+                compressed_index.drop()
+            self.collection_log.drop(physical_name)
+            if self.retrieval_cache is not None:
+                self.retrieval_cache.drop(physical_name)
             return True
         except:
             return False
@@ -226,4 +891,11 @@ class VectorStoreService:
 
 # Global instances
 glm4_service = GLM4Service()
+
+
+def get_glm4_service() -> GLM4Service:
+    """获取共享的GLM-4服务实例"""
+    return glm4_service
+
+
 vector_store = VectorStoreService()
@@ -0,0 +1,179 @@
+"""
+GLM-4 异步HTTP传输层
+基于 httpx.AsyncClient 的连接池（keep-alive / 可选HTTP/2），替代同步的 ZhipuAI SDK 调用
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+import jwt
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+API_TOKEN_TTL_SECONDS = 3 * 60  # 鉴权令牌有效期
+API_TOKEN_REFRESH_MARGIN = 30  # 过期前提前重新签名的秒数
+
+
+class GLM4Transport:
+    """GLM-4 API异步传输（进程内共享连接池）"""
+
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = None,
+        max_connections: int = None,
+        max_keepalive: int = None,
+        timeout: float = None
+    ):
+        self.api_key = api_key if api_key is not None else settings.GLM4_API_KEY
+        self.base_url = (base_url or settings.GLM4_BASE_URL).rstrip('/')
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.GLM4_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive or settings.GLM4_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.GLM4_KEEPALIVE_EXPIRY
+        )
+        self.timeout = httpx.Timeout(
+            timeout or settings.GLM4_TIMEOUT,
+            connect=settings.GLM4_CONNECT_TIMEOUT
+        )
+        self.http2 = settings.GLM4_HTTP2 and HTTP2_AVAILABLE
+        if settings.GLM4_HTTP2 and not HTTP2_AVAILABLE:
+            logger.warning("未安装h2，GLM-4传输回退到HTTP/1.1 keep-alive")
+
+        # 连接池绑定事件循环：脚本中多次 asyncio.run() 时按循环重建
+        self._clients: Dict[int, httpx.AsyncClient] = {}
+        self._token: Optional[Tuple[str, str, float]] = None  # (api_key, 令牌, 重新签名时间)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """获取当前事件循环对应的连接池客户端"""
+        loop_id = id(asyncio.get_running_loop())
+        client = self._clients.get(loop_id)
+        if client is None or client.is_closed:
+            # 其他（已结束的）事件循环上的客户端无法复用，直接丢弃
+            self._clients = {}
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=self.http2,
+                limits=self.limits,
+                timeout=self.timeout
+            )
+            self._clients[loop_id] = client
+        return client
+
+    def _headers(self) -> dict:
+        """鉴权请求头"""
+        return {
+            "Authorization": self._auth_token(),
+            "Content-Type": "application/json"
+        }
+
+    def _auth_token(self) -> str:
+        """
+        JWT鉴权令牌：api_key 形如 "<id>.<secret>"，按智谱API的格式用 secret 做 HS256 签名，
+        有效期内复用，临近过期时重新签名
+        """
+        now = time.time()
+        if self._token is not None and self._token[0] == self.api_key and now < self._token[2]:
+            return self._token[1]
+
+        try:
+            key_id, secret = self.api_key.split(".")
+        except (AttributeError, ValueError):
+            raise Exception("invalid api_key")
+        timestamp = int(now * 1000)
+        token = jwt.encode(
+            {
+                "api_key": key_id,
+                "exp": timestamp + API_TOKEN_TTL_SECONDS * 1000,
+                "timestamp": timestamp
+            },
+            secret,
+            algorithm="HS256",
+            headers={"alg": "HS256", "sign_type": "SIGN"}
+        )
+        self._token = (self.api_key, token, now + API_TOKEN_TTL_SECONDS - API_TOKEN_REFRESH_MARGIN)
+        return token
+
+    @staticmethod
+    def _raise_for_status(response: httpx.Response, body: str = None):
+        if response.status_code >= 400:
+            text = body if body is not None else response.text
+            raise Exception(f"Error code: {response.status_code}, with error text {text[:500]}")
+
+    async def post(self, path: str, payload: dict, timeout: Optional[float] = None) -> dict:
+        """发送POST请求并返回JSON"""
+        client = self._get_client()
+        response = await client.post(
+            path,
+            json=payload,
+            headers=self._headers(),
+            timeout=timeout if timeout is not None else self.timeout
+        )
+        self._raise_for_status(response)
+        return response.json()
+
+    async def stream(
+        self,
+        path: str,
+        payload: dict,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[dict]:
+        """发送POST请求并逐条产出SSE数据块（data: {...}）"""
+        client = self._get_client()
+        async with client.stream(
+            "POST",
+            path,
+            json=payload,
+            headers=self._headers(),
+            timeout=timeout if timeout is not None else self.timeout
+        ) as response:
+            if response.status_code >= 400:
+                body = (await response.aread()).decode('utf-8', errors='replace')
+                self._raise_for_status(response, body)
+            
+            async for line in response.aiter_lines():
+                line = line.strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                yield json.loads(data)
+
+    async def aclose(self):
+        """关闭所有连接"""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            if not client.is_closed:
+                await client.aclose()
+
+
+# Global instance
+_transport: Optional[GLM4Transport] = None
+
+
+def get_glm4_transport() -> GLM4Transport:
+    """获取共享的GLM-4传输实例"""
+    global _transport
+    if _transport is None:
+        _transport = GLM4Transport()
+    return _transport
+
+
+async def close_glm4_transport():
+    """关闭共享传输（应用退出时调用）"""
+    if _transport is not None:
+        await _transport.aclose()
@@ -0,0 +1,176 @@
+"""
+PDF文本提取
+PDF解析是纯CPU计算（线程受GIL限制），按页范围切分到进程池并行提取，结果按页序返回，
+也支持逐页流式读取；每页先用首选引擎提取，失败或为空时回退到另一个引擎（pdfplumber / PyPDF2）
+
+文档上传、简历解析、PDF题库导入共用
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import AsyncIterator, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ENGINES = ("pdfplumber", "pypdf2")
+
+
+def _open_engine(engine: str, file_path: str):
+    """打开PDF，返回 (页列表, 关闭函数)；引擎未安装时返回 None"""
+    try:
+        if engine == "pdfplumber":
+            import pdfplumber
+            pdf = pdfplumber.open(file_path)
+            return pdf.pages, pdf.close
+        import PyPDF2
+        f = open(file_path, 'rb')
+        return PyPDF2.PdfReader(f).pages, f.close
+    except ImportError:
+        return None
+
+
+def extract_page_range(file_path: str, start: int, end: int, engines: Sequence[str] = ENGINES) -> List[str]:
+    """
+    提取 [start, end) 页的文本（在进程池中执行）
+
+    每页按 engines 顺序尝试，前一个引擎出错或提取结果为空时使用下一个
+    """
+    opened = {}
+    try:
+        texts = []
+        for index in range(start, end):
+            text = ""
+            for engine in engines:
+                if engine not in opened:
+                    opened[engine] = _open_engine(engine, file_path)
+                if opened[engine] is None:
+                    continue
+                try:
+                    text = opened[engine][0][index].extract_text() or ""
+                except Exception as e:
+                    logger.warning(f"{os.path.basename(file_path)} 第 {index + 1} 页 {engine} 提取失败: {e}")
+                    continue
+                if text.strip():
+                    break
+            texts.append(text)
+        return texts
+    finally:
+        for engine in opened.values():
+            if engine is not None:
+                engine[1]()
+
+
+def count_pages(file_path: str, engines: Sequence[str] = ENGINES) -> int:
+    """PDF页数"""
+    for engine in reversed(engines):  # PyPDF2 只读交叉引用表，比 pdfplumber 快
+        opened = _open_engine(engine, file_path)
+        if opened is not None:
+            try:
+                return len(opened[0])
+            finally:
+                opened[1]()
+    raise Exception("请安装pdfplumber或PyPDF2: pip install pdfplumber PyPDF2")
+
+
+class PDFExtractor:
+    """进程池并行的PDF文本提取"""
+
+    def __init__(self, workers: int = None, pages_per_task: int = None):
+        self.workers = workers or settings.PDF_EXTRACT_WORKERS or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task or settings.PDF_PAGES_PER_TASK
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    # spawn：不继承父进程的线程/事件循环/数据库连接
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._pool
+
+    def _ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        # 页数较少时按进程数均分，避免只有一个进程在干活
+        size = max(1, min(self.pages_per_task, -(-page_count // self.workers)))
+        return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+    def _plan(self, file_path: str, engines: Sequence[str]) -> Tuple[int, Optional[List[Tuple[int, int]]]]:
+        """返回 (总页数, 页范围)；小文件页范围为 None，在当前进程内提取，省去进程间传输"""
+        page_count = count_pages(file_path, engines)
+        if self.workers <= 1 or page_count < settings.PDF_PARALLEL_MIN_PAGES:
+            return page_count, None
+        return page_count, self._ranges(page_count)
+
+    def _futures(self, file_path: str, engines: Sequence[str], ranges: List[Tuple[int, int]]) -> Iterator[Future]:
+        """按页序返回各页范围的 Future，最多 workers * 2 个范围同时在处理（限制已提取未消费的文本量）"""
+        window = deque()
+        for start, end in ranges:
+            window.append(self.pool.submit(extract_page_range, file_path, start, end, tuple(engines)))
+            if len(window) >= self.workers * 2:
+                yield window.popleft()
+        while window:
+            yield window.popleft()
+
+    def iter_pages(self, file_path: str, engines: Sequence[str] = ENGINES) -> Iterator[Tuple[int, int, str]]:
+        """按页序逐页返回 (页号, 总页数, 文本)，前面的页范围完成即可返回，不等待整个文件"""
+        page_count, ranges = self._plan(file_path, engines)
+        if ranges is None:
+            batches = iter([extract_page_range(file_path, 0, page_count, engines)])
+        else:
+            batches = (future.result() for future in self._futures(file_path, engines, ranges))
+
+        index = 0
+        for texts in batches:
+            for text in texts:
+                yield index, page_count, text
+                index += 1
+
+    def extract_pages(self, file_path: str, engines: Sequence[str] = ENGINES) -> List[str]:
+        """提取所有页的文本（按页序）"""
+        return [text for _, _, text in self.iter_pages(file_path, engines)]
+
+    async def aiter_pages(self, file_path: str, engines: Sequence[str] = ENGINES) -> AsyncIterator[Tuple[int, int, str]]:
+        """iter_pages 的异步版本，不阻塞事件循环"""
+        page_count, ranges = await asyncio.to_thread(self._plan, file_path, engines)
+        if ranges is None:
+            batches = [await asyncio.to_thread(extract_page_range, file_path, 0, page_count, engines)]
+        else:
+            batches = self._futures(file_path, engines, ranges)
+
+        index = 0
+        for batch in batches:
+            texts = batch if ranges is None else await asyncio.wrap_future(batch)
+            for text in texts:
+                yield index, page_count, text
+                index += 1
+
+    def shutdown(self):
+        """关闭进程池"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+# Global instance
+_extractor: Optional[PDFExtractor] = None
+
+
+def get_pdf_extractor() -> PDFExtractor:
+    """获取共享的PDF提取器"""
+    global _extractor
+    if _extractor is None:
+        _extractor = PDFExtractor()
+    return _extractor
@@ -14,7 +14,6 @@ from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field, asdict
 from datetime import datetime
 
-import PyPDF2
 from docx import Document
 
 logging.basicConfig(level=logging.INFO)
@@ -24,7 +23,9 @@ logger = logging.getLogger(__name__)
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from services.llm_service import GLM4Service
+from services.llm_service import get_glm4_service
+from services.llm_scheduler import Priority
+from app.services.pdf_extractor import get_pdf_extractor
 
 
 @dataclass
@@ -71,14 +72,10 @@ class ResumeParser:
         pass
     
     def parse_pdf(self, file_path: str) -> str:
-        """解析PDF文件"""
+        """解析PDF文件（进程池按页并行，PyPDF2 为主、pdfplumber 回退）"""
         try:
-            text = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-            return text
+            pages = get_pdf_extractor().extract_pages(file_path, engines=("pypdf2", "pdfplumber"))
+            return "".join(text + "\n" for text in pages)
         except Exception as e:
             logger.error(f"PDF解析失败: {e}")
             return ""
@@ -120,7 +117,7 @@ class LLMResumeAnalyzer:
     """LLM简历分析器"""
     
     def __init__(self):
-        self.llm = GLM4Service()
+        self.llm = get_glm4_service()
         self.cache = {}
         self.cache_dir = Path("/home/fengxu/mylib/interview-agent/backend/data/cache")
         self.cache_dir.mkdir(parents=True, exist_ok=True)
@@ -246,7 +243,8 @@ class LLMResumeAnalyzer:
         try:
             response = await self.llm.chat_completion(
                 [{"role": "user", "content": prompt}],
-                temperature=0.1
+                temperature=0.1,
+                priority=Priority.RESUME
             )
             
             # 清理响应文本，提取JSON部分
@@ -309,7 +307,8 @@ class LLMResumeAnalyzer:
         try:
             response = await self.llm.chat_completion(
                 [{"role": "user", "content": prompt}],
-                temperature=0.2
+                temperature=0.2,
+                priority=Priority.RESUME
             )
             
             # 清理响应文本
@@ -390,7 +389,8 @@ class LLMResumeAnalyzer:
         try:
             response = await self.llm.chat_completion(
                 [{"role": "user", "content": prompt}],
-                temperature=0.3
+                temperature=0.3,
+                priority=Priority.RESUME
             )
             
             # 清理响应文本
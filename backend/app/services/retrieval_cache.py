@@ -0,0 +1,128 @@
+"""
+检索结果缓存
+key = sha256(集合, 查询, top_k, 过滤条件, 检索模式, 权重)，
+每条缓存记录写入时所依赖范围的写版本，有写入/删除后版本变化，旧结果不再返回
+
+范围为整个集合，或集合内的一个文档（scope(集合, document_id)）：
+按 document_id 过滤的检索只依赖这些文档的版本，上传其他文档不会使其失效
+
+写版本为 <CHROMA_DB_PATH>/collection_versions/<范围> 文件的 mtime，
+多个 worker 共享，任一进程写入后其他进程立即可见
+"""
+
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services.llm_cache import make_cache_key
+
+settings = get_settings()
+
+
+class RetrievalCache:
+    """带集合写版本的检索结果缓存"""
+
+    def __init__(self, max_entries: int = None, ttl: int = None, versions_dir: Optional[str] = None):
+        self.max_entries = max_entries or settings.RETRIEVAL_CACHE_MAX_ENTRIES
+        self.ttl = ttl or settings.RETRIEVAL_CACHE_TTL
+        self.versions_dir = versions_dir or os.path.join(settings.CHROMA_DB_PATH, "collection_versions")
+
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, ...], float, List[dict]]]" = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0, 'invalidations': 0}
+
+    @staticmethod
+    def scope(collection: str, document_id: Optional[str] = None) -> str:
+        """写版本的范围：整个集合，或集合内的一个文档"""
+        if document_id is None:
+            return collection
+        return f"{collection}@{document_id}"
+
+    def _path(self, scope: str) -> str:
+        return os.path.join(self.versions_dir, re.sub(r'[^\w.@-]', '_', scope))
+
+    @staticmethod
+    def make_key(collections: List[str], query: str, **params) -> str:
+        return make_cache_key("retrieval", query, collections=collections, **params)
+
+    def version(self, scope: str) -> int:
+        """范围的当前写版本（从未写入过为0）"""
+        try:
+            return os.stat(self._path(scope)).st_mtime_ns
+        except OSError:
+            return 0
+
+    def bump(self, scope: str):
+        """范围内有写入/删除时调用，使依赖它的缓存结果失效"""
+        os.makedirs(self.versions_dir, exist_ok=True)
+        path = self._path(scope)
+        previous = self.version(scope)
+        now = time.time_ns()
+        with open(path, 'w') as f:
+            f.write(str(now))
+        # 文件系统时间戳精度有限，保证新版本严格大于旧版本
+        os.utime(path, ns=(now, max(now, previous + 1)))
+        self.stats['invalidations'] += 1
+
+    def drop(self, collection: str):
+        """集合删除后使集合及其所有文档范围的缓存结果失效"""
+        self.bump(collection)
+        prefix = os.path.basename(self._path(self.scope(collection, "")))
+        try:
+            names = os.listdir(self.versions_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith(prefix):
+                try:
+                    os.remove(os.path.join(self.versions_dir, name))
+                except OSError:
+                    pass
+
+    def get(self, key: str, scopes: List[str]) -> Optional[List[dict]]:
+        """读取缓存，范围的版本变化或过期时视为未命中"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+
+        versions, expires_at, results = entry
+        if expires_at < time.time() or versions != tuple(self.version(scope) for scope in scopes):
+            del self._entries[key]
+            self.stats['stale'] += 1
+            self.stats['misses'] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return [dict(r) for r in results]
+
+    def set(self, key: str, results: List[dict], versions: Tuple[int, ...]):
+        """写入缓存（versions 为检索开始前读取的各范围版本）"""
+        self._entries[key] = (versions, time.time() + self.ttl, [dict(r) for r in results])
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        """获取命中统计"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else 0.0,
+            'entries': len(self._entries)
+        }
+
+
+# Global instance
+_cache: Optional[RetrievalCache] = None
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    """获取共享的检索结果缓存"""
+    global _cache
+    if _cache is None:
+        _cache = RetrievalCache()
+    return _cache
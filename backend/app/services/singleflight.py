@@ -0,0 +1,58 @@
+"""
+Single-flight 请求合并
+相同key的并发请求只执行一次上游调用，其余调用方共享结果
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """并发相同请求合并器"""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.stats = {'leaders': 0, 'coalesced': 0}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        执行func；若相同key的调用正在进行，则等待其结果
+
+        上游调用在独立任务中运行，发起者被取消不会影响其他等待者。
+        """
+        loop = asyncio.get_running_loop()
+        task = self._calls.get(key)
+        if task is not None and not task.done() and task.get_loop() is loop:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(task)
+
+        task = loop.create_task(func())
+        self._calls[key] = task
+        self.stats['leaders'] += 1
+        task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 所有等待者都被取消时，避免 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict:
+        """获取合并统计"""
+        return {**self.stats, 'in_flight': len(self._calls)}
+
+
+# Global instance
+_singleflight: Optional[SingleFlight] = None
+
+
+def get_singleflight() -> SingleFlight:
+    """获取共享的请求合并器"""
+    global _singleflight
+    if _singleflight is None:
+        _singleflight = SingleFlight()
+    return _singleflight
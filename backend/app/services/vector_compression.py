@@ -0,0 +1,605 @@
+"""
+压缩向量层
+大规模文档库（百万级分块）不再把全精度向量放进 Chroma 的 HNSW 索引：
+- 内存中只保留压缩码：int8 标量量化（1字节/维）或 PQ 乘积量化（PQ_SUBSPACES 字节/向量）
+- 归一化后的原始 float32 向量追加写在磁盘上，检索时 mmap 读取粗排候选做精确重排
+- Chroma 仍保存文本和元数据（向量为占位值），元数据过滤先在 Chroma 中求出候选 id
+
+把已有集合迁移到压缩层（在 backend 目录下，需先设置 VECTOR_COMPRESSION）:
+    python -m app.services.vector_compression documents
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 压缩集合在 Chroma 中存放的占位向量
+PLACEHOLDER_EMBEDDING = [0.0]
+
+SCORE_BLOCK_ROWS = 4096  # 粗排分块大小，限制临时内存
+
+
+def normalize(vectors) -> np.ndarray:
+    """按行L2归一化为 float32"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def _kmeans(x: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Lloyd k-means，返回 (k, dim) 的质心"""
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _nearest(x, centroids)
+        counts = np.bincount(assignment, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, x)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # 空簇重新取随机样本
+        empty = np.flatnonzero(~filled)
+        centroids[empty] = x[rng.integers(len(x), size=empty.size)]
+    return centroids
+
+
+def _nearest(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    distances = (centroids ** 2).sum(axis=1)[None, :] - 2 * x @ centroids.T
+    return distances.argmin(axis=1)
+
+
+class ScalarQuantizer:
+    """int8 标量量化：每维按训练样本的最大绝对值缩放到 [-127, 127]"""
+
+    method = "int8"
+    code_dtype = np.int8
+
+    def __init__(self, scale: Optional[np.ndarray] = None):
+        self.scale = scale
+
+    @property
+    def trained(self) -> bool:
+        return self.scale is not None
+
+    def code_size(self, dim: int) -> int:
+        return dim
+
+    def train(self, vectors: np.ndarray):
+        self.scale = np.maximum(np.abs(vectors).max(axis=0), 1e-6).astype(np.float32) / 127
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors / self.scale), -127, 127).astype(np.int8)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """近似内积"""
+        return codes.astype(np.float32) @ (query * self.scale)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {'scale': self.scale}
+
+    @classmethod
+    def from_state(cls, state) -> "ScalarQuantizer":
+        return cls(state['scale'])
+
+
+class ProductQuantizer:
+    """PQ 乘积量化：向量切成 m 段，每段用 k-means 码本编码为 1 字节，检索时查表求近似内积"""
+
+    method = "pq"
+    code_dtype = np.uint8
+
+    def __init__(self, subspaces: int = None, centroids: Optional[np.ndarray] = None):
+        self.subspaces = subspaces or settings.PQ_SUBSPACES
+        self.centroids = centroids  # (m, k, dim / m)
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def code_size(self, dim: int) -> int:
+        return self.subspaces
+
+    def train(self, vectors: np.ndarray, iterations: int = 20, seed: int = 0):
+        dim = vectors.shape[1]
+        # 子空间数需整除维度
+        while dim % self.subspaces:
+            self.subspaces -= 1
+        sub = dim // self.subspaces
+        k = min(256, len(vectors))
+        rng = np.random.default_rng(seed)
+        self.centroids = np.stack([
+            _kmeans(vectors[:, j * sub:(j + 1) * sub], k, iterations, rng)
+            for j in range(self.subspaces)
+        ]).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        sub = self.centroids.shape[2]
+        codes = np.empty((len(vectors), self.subspaces), dtype=np.uint8)
+        for j in range(self.subspaces):
+            codes[:, j] = _nearest(vectors[:, j * sub:(j + 1) * sub], self.centroids[j])
+        return codes
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """近似内积（ADC：每段查表后求和）"""
+        table = np.einsum('mks,ms->mk', self.centroids, query.reshape(self.subspaces, -1))
+        offsets = np.arange(self.subspaces) * table.shape[1]
+        return table.ravel()[codes + offsets].sum(axis=1, dtype=np.float32)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {'centroids': self.centroids}
+
+    @classmethod
+    def from_state(cls, state) -> "ProductQuantizer":
+        centroids = state['centroids']
+        return cls(centroids.shape[0], centroids)
+
+
+QUANTIZERS = {cls.method: cls for cls in (ScalarQuantizer, ProductQuantizer)}
+
+
+class CompressedVectorIndex:
+    """
+    单个集合的压缩向量索引（追加写文件，多worker共享）
+
+    meta.json      量化方式、维度、当前代次（原子替换）
+    <代次目录>/
+      quantizer.npz  量化参数
+      codes.bin      压缩码（常驻内存）
+      vectors.f32    归一化的原始向量（检索时 mmap 精排）
+      ids.txt        行号 -> id
+      deleted.txt    已删除的行（id\t行号）
+
+    重训写入新的代次目录后替换 meta.json，其他进程要么读旧代次要么读新代次，
+    不会读到一半新一半旧的文件；旧代次保留到下一次重训，供正在检索的线程读完
+    """
+
+    DATA_FILES = ("quantizer.npz", "codes.bin", "vectors.f32", "ids.txt", "deleted.txt")
+
+    def __init__(self, directory: str, method: str = None):
+        self.directory = directory
+        self.method = method or settings.VECTOR_COMPRESSION
+        if self.method not in QUANTIZERS:
+            raise ValueError(f"未知的向量压缩方式: {self.method}")
+        os.makedirs(directory, exist_ok=True)
+
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.write_lock_path = os.path.join(directory, "write.lock")
+        self.retrain_lock_path = os.path.join(directory, "retrain.lock")
+        self._lock = threading.Lock()  # 本进程内的写入
+        self._state_lock = threading.RLock()  # 内存状态的更新与读取快照
+        self._retrain_thread: Optional[threading.Thread] = None
+        self._reset()
+        self.refresh()
+
+    def _reset(self, generation: int = 0):
+        self.generation = generation
+        self.dim: Optional[int] = None
+        self.trained_on = 0  # 训练量化器用的样本数
+        self.quantizer = QUANTIZERS[self.method]()
+        self._meta_mtime: Optional[int] = None
+        self.ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self.live = np.zeros(0, dtype=bool)
+        self.codes: Optional[np.ndarray] = None
+        self._ids_offset = 0
+        self._deleted_offset = 0
+
+    def _generation_dir(self, generation: int) -> str:
+        # 第0代直接放在索引目录下
+        return self.directory if generation == 0 else os.path.join(self.directory, f"gen-{generation}")
+
+    def _path(self, name: str, generation: Optional[int] = None) -> str:
+        return os.path.join(self._generation_dir(self.generation if generation is None else generation), name)
+
+    def __len__(self) -> int:
+        return int(self.live.sum())
+
+    @property
+    def code_size(self) -> int:
+        return self.quantizer.code_size(self.dim)
+
+    def refresh(self):
+        """
+        读取其他进程追加的数据（量化参数变化时全部重新加载）
+
+        ids / row_of / live / codes 写时复制：新对象构建完成后再替换，
+        检索线程持有的快照不会被修改
+        """
+        with self._state_lock:
+            try:
+                mtime = os.stat(self.meta_path).st_mtime_ns
+            except OSError:
+                return
+            if mtime != self._meta_mtime:
+                with open(self.meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                self._reset(meta.get('generation', 0))
+                self.method, self.dim, self.trained_on = meta['method'], meta['dim'], meta['trained_on']
+                with np.load(self._path("quantizer.npz")) as state:
+                    self.quantizer = QUANTIZERS[self.method].from_state(state)
+                self.codes = np.zeros((0, self.code_size), dtype=self.quantizer.code_dtype)
+                self._meta_mtime = mtime
+
+            # 先读删除记录再读 id：删除记录引用的行一定已写入 ids.txt
+            deleted = self._read_lines(self._path("deleted.txt"), '_deleted_offset')
+            new_ids = self._read_lines(self._path("ids.txt"), '_ids_offset')
+            if not new_ids and not deleted:
+                return
+
+            ids, row_of, live, codes = self.ids, dict(self.row_of), self.live.copy(), self.codes
+            if new_ids:
+                first_row = len(ids)
+                new_codes = np.fromfile(
+                    self._path("codes.bin"),
+                    dtype=self.quantizer.code_dtype,
+                    count=len(new_ids) * self.code_size,
+                    offset=first_row * self.code_size * np.dtype(self.quantizer.code_dtype).itemsize
+                ).reshape(len(new_ids), self.code_size)
+                codes = np.concatenate([codes, new_codes])
+                live = np.concatenate([live, np.ones(len(new_ids), dtype=bool)])
+                for i, doc_id in enumerate(new_ids):
+                    # 同一 id 重新写入时旧行作废
+                    previous = row_of.get(doc_id)
+                    if previous is not None:
+                        live[previous] = False
+                    row_of[doc_id] = first_row + i
+                ids = ids + new_ids
+
+            for line in deleted:
+                # "id\t行号"：只作废该行（id 之后重新写入的新行不受影响）
+                doc_id, _, row = line.partition("\t")
+                if not row:
+                    row = row_of.get(doc_id)
+                row = int(row) if row is not None else None
+                if row is not None and row < len(live):
+                    live[row] = False
+                    if row_of.get(doc_id) == row:
+                        del row_of[doc_id]
+
+            self.ids, self.row_of, self.live, self.codes = ids, row_of, live, codes
+
+    def _snapshot(self) -> tuple:
+        """刷新并返回一致的内存状态（检索期间其他线程的写入不影响快照）"""
+        with self._state_lock:
+            self.refresh()
+            return self.generation, self.quantizer, self.dim, self.ids, self.row_of, self.live, self.codes
+
+    def _read_lines(self, path: str, offset_attr: str) -> List[str]:
+        """读取文件新追加的完整行"""
+        if not os.path.exists(path):
+            return []
+        with open(path, 'rb') as f:
+            f.seek(getattr(self, offset_attr))
+            data = f.read()
+        usable = data.rfind(b"\n") + 1
+        setattr(self, offset_attr, getattr(self, offset_attr) + usable)
+        return data[:usable].decode('utf-8').splitlines()
+
+    @contextmanager
+    def _file_lock(self, path: str):
+        """跨进程文件锁"""
+        with open(path, 'ab') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield f
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked(self):
+        """跨进程写锁，持锁期间先读取其他进程的写入"""
+        with self._lock, self._file_lock(self.write_lock_path):
+            self.refresh()
+            yield
+
+    def _save_quantizer(self, quantizer, dim: int, trained_on: int, generation: int):
+        """写入量化参数，替换 meta.json 后切换到该代次"""
+        os.makedirs(self._generation_dir(generation), exist_ok=True)
+        tmp_path = self._path("quantizer.npz", generation) + ".tmp.npz"
+        np.savez(tmp_path, **quantizer.state())
+        os.replace(tmp_path, self._path("quantizer.npz", generation))
+        with open(self.meta_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({'method': self.method, 'dim': dim, 'trained_on': trained_on, 'generation': generation}, f)
+        os.replace(self.meta_path + ".tmp", self.meta_path)
+
+    def add(self, ids: List[str], embeddings: List[List[float]]):
+        """
+        追加向量（已存在的 id 覆盖旧值）
+
+        首次写入时用这批向量训练量化器；训练样本不足 PQ_TRAIN_SIZE 时，
+        数据量每增长到训练样本的4倍在后台线程重训一次（不阻塞写入路径）
+        """
+        if not ids:
+            return
+        vectors = normalize(embeddings)
+        with self._locked():
+            if not self.quantizer.trained:
+                sample = vectors[:settings.PQ_TRAIN_SIZE]
+                quantizer = QUANTIZERS[self.method]()
+                quantizer.train(sample)
+                self._save_quantizer(quantizer, vectors.shape[1], len(sample), self.generation)
+                self.refresh()
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"向量维度不一致: {vectors.shape[1]} != {self.dim}")
+
+            first_row = len(self.ids)
+            codes = self.quantizer.encode(vectors)
+            for name, data in (("vectors.f32", vectors), ("codes.bin", codes)):
+                row_bytes = data.shape[1] * data.itemsize
+                with open(self._path(name), 'ab') as f:
+                    # 丢弃异常中断留下的多余行
+                    f.truncate(first_row * row_bytes)
+                    f.write(np.ascontiguousarray(data).tobytes())
+
+            # 最后写 id，保证 id 对应的行已落盘
+            with open(self._path("ids.txt"), 'ab') as f:
+                f.write("".join(f"{doc_id}\n" for doc_id in ids).encode('utf-8'))
+        self.refresh()
+
+        if self.trained_on < settings.PQ_TRAIN_SIZE and len(self) >= 4 * self.trained_on:
+            self.retrain_in_background()
+
+    def remove(self, ids: Iterable[str]):
+        """删除向量（追加删除记录，行在重训时清理）"""
+        with self._locked():
+            rows = [(doc_id, self.row_of[doc_id]) for doc_id in ids if doc_id in self.row_of]
+            if rows:
+                with open(self._path("deleted.txt"), 'ab') as f:
+                    f.write("".join(f"{doc_id}\t{row}\n" for doc_id, row in rows).encode('utf-8'))
+        self.refresh()
+
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        allowed_ids: Optional[Iterable[str]] = None,
+        rerank_factor: int = None
+    ) -> List[Tuple[str, float]]:
+        """
+        压缩码粗排 + 原始向量精排
+
+        Args:
+            query_embedding: 查询向量
+            top_k: 返回数量
+            allowed_ids: 候选 id（元数据过滤结果），None 表示全部
+            rerank_factor: 粗排候选 = top_k * rerank_factor
+
+        Returns:
+            [(id, 余弦相似度)]
+        """
+        if allowed_ids is not None:
+            allowed_ids = list(allowed_ids)
+        query = normalize(query_embedding)
+        for attempt in range(3):
+            generation, quantizer, dim, ids, row_of, live, codes = self._snapshot()
+            if codes is None or not len(ids):
+                return []
+
+            if allowed_ids is None:
+                # 全量：按行块直接切片（不复制压缩码），已删除的行置为 -inf
+                rows = np.arange(len(ids))
+                approx = self._approx_scores(quantizer, codes, query)
+                approx[~live] = -np.inf
+                limit = int(live.sum())
+            else:
+                rows = np.array(sorted({row_of[i] for i in allowed_ids if i in row_of}), dtype=np.int64)
+                approx = self._approx_scores(quantizer, codes, query, rows)
+                limit = rows.size
+            if limit == 0:
+                return []
+
+            shortlist_size = min(limit, top_k * (rerank_factor or settings.COMPRESSION_RERANK_FACTOR))
+            shortlist = rows[np.argpartition(-approx, shortlist_size - 1)[:shortlist_size]]
+            shortlist.sort()  # 顺序读磁盘
+
+            try:
+                full = np.memmap(self._path("vectors.f32", generation), dtype=np.float32, mode='r', shape=(len(ids), dim))
+            except (OSError, ValueError):
+                # 快照所在的代次已被清理（期间重训了两次），用新代次重新检索
+                if attempt == 2:
+                    raise
+                continue
+            exact = np.asarray(full[shortlist]) @ query
+
+            order = np.argsort(-exact)[:top_k]
+            return [(ids[shortlist[i]], float(exact[i])) for i in order]
+
+    @staticmethod
+    def _approx_scores(quantizer, codes: np.ndarray, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """分块计算压缩码的近似内积，限制临时内存"""
+        total = len(codes) if rows is None else rows.size
+        blocks = []
+        for start in range(0, total, SCORE_BLOCK_ROWS):
+            if rows is None:
+                block = codes[start:start + SCORE_BLOCK_ROWS]
+            else:
+                block = codes[rows[start:start + SCORE_BLOCK_ROWS]]
+            blocks.append(quantizer.scores(block, query))
+        return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+
+    def retrain_in_background(self):
+        """在后台线程重训（已有重训在进行时跳过）"""
+        with self._lock:
+            if self._retrain_thread is not None and self._retrain_thread.is_alive():
+                return
+            self._retrain_thread = threading.Thread(
+                target=self._retrain_logged, name=f"retrain-{os.path.basename(self.directory)}", daemon=True
+            )
+            self._retrain_thread.start()
+
+    def _retrain_logged(self):
+        try:
+            self.retrain()
+        except Exception as e:
+            logger.error(f"压缩向量索引重训失败: {self.directory}: {e}")
+
+    def retrain(self):
+        """
+        用磁盘上的原始向量重新训练量化器并重写压缩码，同时清理已删除的行
+
+        训练（采样 PQ_TRAIN_SIZE 条）和分块重编码时不持写锁，内存占用与数据量无关；
+        最后持写锁补上期间新增/删除的数据，再替换文件
+        """
+        with self._file_lock(self.retrain_lock_path):
+            with self._locked():
+                if not self.ids:
+                    return
+                generation, count, dim = self.generation, len(self.ids), self.dim
+                rows = np.flatnonzero(self.live)
+                if not rows.size:
+                    return
+                kept_ids = [self.ids[r] for r in rows]
+            full = np.memmap(self._path("vectors.f32", generation), dtype=np.float32, mode='r', shape=(count, dim))
+
+            rng = np.random.default_rng(0)
+            sample_rows = np.sort(rng.permutation(rows)[:settings.PQ_TRAIN_SIZE])
+            quantizer = QUANTIZERS[self.method]()
+            quantizer.train(np.asarray(full[sample_rows]))
+
+            new_generation = generation + 1
+            new_dir = self._generation_dir(new_generation)
+            shutil.rmtree(new_dir, ignore_errors=True)  # 上次中断留下的
+            os.makedirs(new_dir)
+            with open(self._path("vectors.f32", new_generation), 'wb') as vectors_file, \
+                    open(self._path("codes.bin", new_generation), 'wb') as codes_file:
+
+                def write_rows(source: np.ndarray, selected: np.ndarray):
+                    for start in range(0, selected.size, SCORE_BLOCK_ROWS):
+                        block = np.asarray(source[selected[start:start + SCORE_BLOCK_ROWS]])
+                        vectors_file.write(block.tobytes())
+                        codes_file.write(np.ascontiguousarray(quantizer.encode(block)).tobytes())
+
+                write_rows(full, rows)
+
+                with self._locked():
+                    # 重编码期间其他线程/进程新增的行（只保留仍有效的）
+                    added_rows = count + np.flatnonzero(self.live[count:])
+                    if added_rows.size:
+                        latest = np.memmap(
+                            self._path("vectors.f32", generation), dtype=np.float32, mode='r', shape=(len(self.ids), dim)
+                        )
+                        write_rows(latest, added_rows)
+                    new_ids = kept_ids + [self.ids[r] for r in added_rows]
+                    # 期间删除/覆盖的行（新代次中的行号）
+                    deleted = [
+                        (doc_id, new_row) for new_row, (doc_id, row) in enumerate(zip(kept_ids, rows))
+                        if not self.live[row]
+                    ]
+                    vectors_file.close()
+                    codes_file.close()
+                    with open(self._path("ids.txt", new_generation), 'w', encoding='utf-8') as f:
+                        f.write("".join(f"{doc_id}\n" for doc_id in new_ids))
+                    with open(self._path("deleted.txt", new_generation), 'w', encoding='utf-8') as f:
+                        f.write("".join(f"{doc_id}\t{row}\n" for doc_id, row in deleted))
+                    self._save_quantizer(quantizer, dim, len(sample_rows), new_generation)
+                    self.refresh()
+
+            # 清理上上代（上一代可能还有检索在读）
+            if generation >= 1:
+                self._remove_generation(generation - 1)
+        logger.info(f"压缩向量索引已重训: {self.directory}, {len(new_ids)} 条")
+
+    def _remove_generation(self, generation: int):
+        if generation == 0:
+            for name in self.DATA_FILES:
+                try:
+                    os.remove(self._path(name, 0))
+                except OSError:
+                    pass
+        else:
+            shutil.rmtree(self._generation_dir(generation), ignore_errors=True)
+
+    def drop(self):
+        """删除索引文件"""
+        with self._lock, self._state_lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._reset()
+
+    def get_stats(self) -> Dict:
+        """内存/磁盘占用统计"""
+        _, _, dim, ids, _, live, codes = self._snapshot()
+        return {
+            'method': self.method,
+            'dim': dim,
+            'vectors': int(live.sum()),
+            'rows': len(ids),
+            'code_bytes': int(codes.nbytes) if codes is not None else 0,
+            'full_vector_bytes': len(ids) * (dim or 0) * 4,
+            'retraining': self._retrain_thread is not None and self._retrain_thread.is_alive()
+        }
+
+
+# Global instances
+_indexes: Dict[str, CompressedVectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_compressed_index(collection_name: str) -> CompressedVectorIndex:
+    """获取集合的压缩向量索引（按实际集合名）"""
+    with _indexes_lock:
+        index = _indexes.get(collection_name)
+        if index is None or not os.path.isdir(index.directory):
+            index = CompressedVectorIndex(os.path.join(settings.COMPRESSED_INDEX_DIR, collection_name))
+            _indexes[collection_name] = index
+        return index
+
+
+def compress_collection(collection_name: str, page_size: int = 1000) -> int:
+    """把已有 Chroma 集合的向量迁入压缩层，并把集合重建为占位向量，返回迁移条数"""
+    from app.services.chroma_client import get_chroma_client
+
+    chroma = get_chroma_client()
+    physical_name = chroma.resolve(collection_name)
+    collection = chroma.get_collection(physical_name)
+    index = get_compressed_index(physical_name)
+
+    total = collection.count()
+    records = []
+    for offset in range(0, total, page_size):
+        data = collection.get(
+            limit=page_size, offset=offset,
+            include=["documents", "metadatas", "embeddings"]
+        )
+        index.add(data['ids'], data['embeddings'])
+        records.append((data['ids'], data['documents'], data['metadatas']))
+        logger.info(f"  已压缩 {min(offset + page_size, total)}/{total}")
+
+    metadata = collection.metadata
+    chroma.invalidate(physical_name)
+    chroma.client.delete_collection(name=physical_name)
+    collection = chroma.get_collection(physical_name, metadata=metadata)
+    for ids, documents, metadatas in records:
+        collection.add(
+            ids=ids,
+            documents=documents,
+            metadatas=metadatas,
+            embeddings=[PLACEHOLDER_EMBEDDING] * len(ids)
+        )
+    return total
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    if not settings.VECTOR_COMPRESSION:
+        sys.exit("请先设置 VECTOR_COMPRESSION=int8 或 pq")
+    name = sys.argv[1] if len(sys.argv) > 1 else settings.DOCUMENT_COLLECTION
+    print(f"迁移完成: {compress_collection(name)} 条")
@@ -127,9 +127,10 @@ class SimpleBuilder:
     
     async def _enhance_questions(self):
         """LLM增强处理"""
-        from services.llm_service import GLM4Service
+        from services.llm_service import get_glm4_service
+        from services.llm_scheduler import Priority
         
-        llm = GLM4Service()
+        llm = get_glm4_service()
         
         for i, q in enumerate(self.questions):
             try:
@@ -143,7 +144,8 @@ class SimpleBuilder:
                 
                 tags_result = await llm.chat_completion(
                     [{"role": "user", "content": tags_prompt}],
-                    temperature=0.3
+                    temperature=0.3,
+                    priority=Priority.BATCH
                 )
                 q.tags = [t.strip() for t in tags_result.split('\n') if t.strip()][:5]
                 
@@ -157,7 +159,8 @@ class SimpleBuilder:
                 
                 diff_result = await llm.chat_completion(
                     [{"role": "user", "content": diff_prompt}],
-                    temperature=0.1
+                    temperature=0.1,
+                    priority=Priority.BATCH
                 )
                 
                 try:
@@ -175,7 +178,8 @@ class SimpleBuilder:
                 
                 followup_result = await llm.chat_completion(
                     [{"role": "user", "content": followup_prompt}],
-                    temperature=0.5
+                    temperature=0.5,
+                    priority=Priority.BATCH
                 )
                 q.followup_points = [f.strip() for f in followup_result.split('\n') if f.strip()][:2]
                 
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+文档集合迁移脚本
+把旧版本"每个上传文件一个集合"（集合名 = 文档ID）的数据合并到统一的文档库集合，
+复用已有向量（不重新调用Embedding），合并完成后删除旧集合
+
+用法（在 backend 目录下）:
+    python migrate_document_collections.py [--dry-run] [--keep]
+"""
+
+import argparse
+import logging
+import uuid
+
+from app.core.config import get_settings
+from app.services.chroma_client import get_chroma_client
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+def is_document_collection(name: str) -> bool:
+    """旧版上传文档的集合名为 uuid4"""
+    try:
+        return str(uuid.UUID(name)) == name
+    except ValueError:
+        return False
+
+
+def migrate(dry_run: bool = False, keep: bool = False) -> int:
+    """迁移所有旧文档集合，返回迁移的分块数"""
+    chroma = get_chroma_client()
+    target = chroma.get_collection(settings.DOCUMENT_COLLECTION)
+
+    legacy = [c.name for c in chroma.client.list_collections() if is_document_collection(c.name)]
+    logger.info(f"发现 {len(legacy)} 个旧文档集合，目标集合: {settings.DOCUMENT_COLLECTION}")
+
+    total = 0
+    for name in legacy:
+        collection = chroma.get_collection(name)
+        data = collection.get(include=["documents", "metadatas", "embeddings"])
+        count = len(data['ids'])
+
+        ids, metadatas = [], []
+        for i, metadata in enumerate(data['metadatas']):
+            metadata = dict(metadata or {})
+            metadata['document_id'] = name
+            metadata.setdefault('chunk_index', i)
+            ids.append(f"{name}_{metadata['chunk_index']}")
+            metadatas.append(metadata)
+
+        logger.info(f"  {name}: {count} 个分块")
+        if dry_run:
+            total += count
+            continue
+
+        if count:
+            target.upsert(
+                ids=ids,
+                embeddings=data['embeddings'],
+                documents=data['documents'],
+                metadatas=metadatas
+            )
+        if not keep:
+            chroma.delete_collection(name)
+        total += count
+
+    logger.info(f"迁移完成，共 {total} 个分块" + ("（dry-run，未写入）" if dry_run else ""))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="只统计，不写入")
+    parser.add_argument("--keep", action="store_true", help="迁移后保留旧集合")
+    args = parser.parse_args()
+
+    migrate(dry_run=args.dry_run, keep=args.keep)
+
+
+if __name__ == "__main__":
+    main()
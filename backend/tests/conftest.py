@@ -0,0 +1,35 @@
+"""
+测试环境：数据库、向量库、缓存都放在临时目录，必须在导入 app 之前设置
+"""
+
+import os
+import sys
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="interview-agent-tests-")
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{_TMP}/test.db",
+    'CHROMA_DB_PATH': f"{_TMP}/chroma",
+    'COMPRESSED_INDEX_DIR': f"{_TMP}/compressed",
+    'LLM_CACHE_DB_PATH': "",
+    'EMBEDDING_CACHE_DIR': "",
+    'GLM4_API_KEY': "test.key",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(_TMP)  # 上传目录等相对路径
+
+import pytest
+
+from app.models.database import Base, SessionLocal, engine
+
+
+@pytest.fixture
+def db():
+    """每个测试使用空表"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
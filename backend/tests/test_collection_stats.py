@@ -0,0 +1,29 @@
+"""
+题库集合计数器：并发写入时的读-改-写
+"""
+
+import threading
+
+from app.knowledge_base.vector_store import CollectionStats, VectorStore
+
+
+def test_concurrent_updates_are_not_lost(tmp_path):
+    store = VectorStore(db_path=str(tmp_path), collection_name="stats_test")
+    store._stats().save(CollectionStats.empty())
+
+    barrier = threading.Barrier(8)
+
+    def update():
+        barrier.wait()
+        for _ in range(25):
+            store._update_stats(added=[{'category': "Redis", 'difficulty': 2}])
+
+    threads = [threading.Thread(target=update) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    counters = store._stats().load()
+    assert counters['total'] == 200
+    assert counters['category'] == {"Redis": 200}
@@ -0,0 +1,114 @@
+"""
+内容去重：并发登记同一内容 / 共用分块的文档删除时的引用计数
+"""
+
+import io
+
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+from app.api.routes import interview
+from app.main import app
+from app.models.database import ContentRecord, Document, IngestionJob, SessionLocal
+from app.services.content_registry import content_registry
+
+
+def add_document(db, document_id: str, content_id: str, content_hash: str = None):
+    db.add(Document(id=document_id, title=document_id, file_type="txt", file_path="x.txt",
+                    content_id=content_id, status="completed", chunk_count=3))
+    if content_hash:
+        db.add(ContentRecord(content_hash=content_hash, kind="document", content_id=content_id))
+    db.commit()
+
+
+def test_concurrent_register_keeps_first(db):
+    other = SessionLocal()
+    try:
+        first = content_registry.register(other, "resume", "h1", result={'name': "a"})
+        assert first.result == {'name': "a"}
+
+        # 后登记的回滚（同一事务中的记录一并撤销）并返回已有记录
+        db.add(Document(id="doc-2", title="t", file_type="txt", file_path="x.txt"))
+        second = content_registry.register(db, "resume", "h1", result={'name': "b"})
+        assert second.result == {'name': "a"}
+        assert db.query(Document).count() == 0
+    finally:
+        other.close()
+
+
+@pytest.mark.asyncio
+async def test_upload_losing_race_links_to_winner(db, monkeypatch):
+    data = b"same content"
+    winner = await interview.document_parser.save_upload(UploadFile(file=io.BytesIO(data), filename="a.txt"))
+    add_document(db, "winner", "winner", content_hash=winner[4])
+
+    # 查找时对方尚未提交：登记失败后重新查找并关联
+    lookup = content_registry.lookup
+    misses = []
+
+    def racy_lookup(session, kind, content_hash):
+        if not misses:
+            misses.append(content_hash)
+            return None
+        return lookup(session, kind, content_hash)
+
+    monkeypatch.setattr(content_registry, "lookup", racy_lookup)
+    response = await interview.upload_document(
+        file=UploadFile(file=io.BytesIO(data), filename="a.txt"), title="b", description=None, db=db
+    )
+
+    db.expire_all()
+    doc = db.query(Document).filter(Document.id == response.id).first()
+    assert doc.content_id == "winner"
+    assert response.chunk_count == 3
+    assert db.query(IngestionJob).count() == 0
+    assert db.query(ContentRecord).one().content_id == "winner"
+
+
+@pytest.mark.asyncio
+async def test_shared_chunks_deleted_with_last_document(db, monkeypatch):
+    add_document(db, "a", "a", content_hash="h1")
+    add_document(db, "b", "a")
+
+    deleted = []
+
+    async def delete_documents(collection_name, where):
+        deleted.append(where)
+        return 3
+
+    monkeypatch.setattr(interview.vector_store, "delete_documents", delete_documents)
+
+    await interview.delete_document("a", db=db)
+    assert deleted == []
+    assert db.query(ContentRecord).count() == 1
+
+    await interview.delete_document("b", db=db)
+    assert deleted == [{"document_id": "a"}]
+    assert db.query(ContentRecord).count() == 0
+    assert db.query(Document).count() == 0
+
+
+def test_resume_parsed_once_per_content(db, monkeypatch):
+    calls = []
+
+    async def parse_document(file_path, file_type):
+        return "张三 Go 工程师"
+
+    async def chat_completion(messages, **kwargs):
+        calls.append(messages)
+        return '{"name": "张三", "skills": {"programming_languages": ["Go"]}}'
+
+    monkeypatch.setattr(interview.document_parser, "parse_document", parse_document)
+    monkeypatch.setattr(interview.glm4_service, "chat_completion", chat_completion)
+
+    client = TestClient(app)
+    files = {'file': ("resume.txt", "张三 Go 工程师".encode())}
+    first = client.post("/api/v1/resume/parse", files=files)
+    second = client.post("/api/v1/resume/parse", files=files)
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.json() == first.json() == {"name": "张三", "skills": {"programming_languages": ["Go"]}}
+    assert len(calls) == 1
+    assert db.query(ContentRecord).one().hit_count == 1
@@ -0,0 +1,31 @@
+"""
+数据库：已有表上新增列的启动迁移
+"""
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.models.database import Base, migrate_schema
+
+
+def test_migrate_adds_columns_to_existing_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    with engine.begin() as conn:
+        # 升级前的 documents 表（没有 content_id）
+        conn.execute(text(
+            "CREATE TABLE documents (id VARCHAR PRIMARY KEY, title VARCHAR NOT NULL, description TEXT, "
+            "file_type VARCHAR NOT NULL, file_path VARCHAR NOT NULL, status VARCHAR, chunk_count INTEGER, "
+            "created_at DATETIME, updated_at DATETIME)"
+        ))
+        conn.execute(text(
+            "INSERT INTO documents (id, title, file_type, file_path) VALUES ('d1', 't', 'txt', 'x.txt')"
+        ))
+
+    Base.metadata.create_all(bind=engine)
+    migrate_schema(engine)
+    migrate_schema(engine)  # 幂等
+
+    inspector = inspect(engine)
+    assert "content_id" in {c['name'] for c in inspector.get_columns("documents")}
+    assert "ix_documents_content_id" in {i['name'] for i in inspector.get_indexes("documents")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id, content_id FROM documents")).all() == [("d1", None)]
@@ -0,0 +1,43 @@
+"""
+Embedding微批处理：发送中的批次保留引用，退出时等待完成
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_close_waits_for_in_flight_batches():
+    release = asyncio.Event()
+    sent = []
+
+    async def embed_batch(texts):
+        sent.append(list(texts))
+        await release.wait()
+        return [[float(len(t))] for t in texts]
+
+    batcher = EmbeddingBatcher(embed_batch, max_batch_size=2, max_wait_ms=10000)
+    requests = [asyncio.ensure_future(batcher.embed(t)) for t in ["a", "bb", "ccc"]]
+    await settle()
+
+    # 满批立即发送，任务被持有直到完成
+    assert sent == [["a", "bb"]]
+    assert len(batcher._tasks) == 1
+
+    closing = asyncio.ensure_future(batcher.close())
+    await settle()
+    assert sent == [["a", "bb"], ["ccc"]]
+    assert not closing.done()
+
+    release.set()
+    await closing
+    assert batcher._tasks == set()
+    assert await asyncio.gather(*requests) == [[1.0], [2.0], [3.0]]
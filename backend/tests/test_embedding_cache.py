@@ -0,0 +1,33 @@
+"""
+Embedding缓存：内存层存 float32 数组，文档向量只写磁盘层
+"""
+
+import numpy as np
+import pytest
+
+from app.services.embedding_cache import EmbeddingCache
+
+
+@pytest.mark.asyncio
+async def test_query_vectors_stay_in_memory(tmp_path):
+    cache = EmbeddingCache(memory_entries=2, directory=str(tmp_path), dtype="float32")
+    await cache.put_many("m", ["a", "b", "c"], [[0.5, 1.0], [1.5, 2.0], [2.5, 3.0]])
+
+    assert all(v.dtype == np.float32 for v in cache._memory.values())
+    assert len(cache._memory) == 2
+    assert await cache.get_many("m", ["a", "c"]) == [None, [2.5, 3.0]]
+    assert cache.stats['disk_writes'] == 0
+
+
+@pytest.mark.asyncio
+async def test_document_vectors_only_on_disk(tmp_path):
+    cache = EmbeddingCache(directory=str(tmp_path), dtype="float32")
+    await cache.put_many("m", ["a", "b"], [[0.5, 1.0], [1.5, 2.0]], persist=True)
+    assert len(cache._memory) == 0
+    assert cache.stats['disk_writes'] == 2
+
+    # 其他 worker 读取磁盘层，命中后也不进入内存层
+    other = EmbeddingCache(directory=str(tmp_path), dtype="float32")
+    assert await other.get_many("m", ["b", "x"]) == [[1.5, 2.0], None]
+    assert other.stats['disk_hits'] == 1
+    assert len(other._memory) == 0
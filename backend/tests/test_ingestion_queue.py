@@ -0,0 +1,180 @@
+"""
+入库队列：认领 / 中断重新入队 / 协程异常
+"""
+
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import get_settings
+from app.models.database import Document, IngestionJob, SessionLocal
+from app.services.ingestion_queue import IngestionQueue
+
+settings = get_settings()
+
+
+def add_job(db, job_id: str, status: str = "queued", **fields) -> IngestionJob:
+    db.add(Document(id=f"doc-{job_id}", title=job_id, file_type="txt", file_path="x.txt", content_id=f"doc-{job_id}"))
+    job = IngestionJob(
+        id=job_id, document_id=f"doc-{job_id}", file_path="x.txt", file_type="txt",
+        status=status, **fields
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def get_job(job_id: str) -> IngestionJob:
+    db = SessionLocal()
+    try:
+        return db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+    finally:
+        db.close()
+
+
+def test_concurrent_claims_do_not_requeue_live_job(db):
+    add_job(db, "job-1")
+    queue = IngestionQueue(workers=8)
+
+    results = [None] * 8
+    barrier = threading.Barrier(8)
+
+    def claim(index):
+        barrier.wait()
+        results[index] = queue._claim(index)
+
+    threads = [threading.Thread(target=claim, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    winners = [i for i, job_id in enumerate(results) if job_id == "job-1"]
+    assert len(winners) == 1
+    assert queue._running == {"job-1": winners[0]}
+
+    # 之后的认领（含中断检查）不能把正在处理的任务重新入队
+    assert queue._claim(0) is None
+    job = get_job("job-1")
+    assert job.status == "running"
+    assert job.attempts == 1
+    assert queue.stats['requeued'] == 0
+
+
+def test_release_only_by_owner(db):
+    add_job(db, "job-1")
+    queue = IngestionQueue(workers=2)
+    assert queue._claim(1) == "job-1"
+
+    queue._release("job-1", 0)
+    assert "job-1" in queue._running
+    queue._release("job-1", 1)
+    assert "job-1" not in queue._running
+
+
+def test_interrupted_job_requeued_then_failed(db):
+    queue = IngestionQueue(workers=1)
+    add_job(db, "job-1", status="running", worker=queue.worker_id, attempts=1)
+    add_job(db, "job-2", status="running", worker=queue.worker_id,
+            attempts=settings.INGESTION_MAX_ATTEMPTS)
+
+    # 本进程认领但不在 _running 中（上次运行遗留）：job-1 重新入队并被认领，job-2 放弃
+    assert queue._claim(0) == "job-1"
+    assert get_job("job-1").attempts == 2
+    failed = get_job("job-2")
+    assert failed.status == "failed"
+
+    db.expire_all()
+    assert db.query(Document).filter(Document.id == "doc-job-2").first().status == "failed"
+
+
+def test_stale_job_from_other_host_requeued(db):
+    queue = IngestionQueue(workers=1)
+    stale = datetime.now() - timedelta(seconds=settings.INGESTION_JOB_STALE_SECONDS + 10)
+    add_job(db, "job-1", status="running", worker="other-host:1", attempts=1, updated_at=stale)
+    add_job(db, "job-2", status="running", worker="other-host:1", attempts=1)
+
+    assert queue._claim(0) == "job-1"
+    assert get_job("job-2").status == "running"
+
+
+@pytest.mark.asyncio
+async def test_worker_survives_run_exception(db, monkeypatch):
+    add_job(db, "job-1")
+    add_job(db, "job-2")
+    queue = IngestionQueue(workers=1)
+    seen = []
+
+    async def run(job_id):
+        seen.append(job_id)
+        if job_id == "job-1":
+            raise RuntimeError("boom")
+        session = SessionLocal()
+        session.query(IngestionJob).filter(IngestionJob.id == job_id).update({'status': "completed"})
+        session.commit()
+        session.close()
+
+    monkeypatch.setattr(queue, "_run", run)
+    await queue.start()
+    try:
+        for _ in range(100):
+            if len(seen) == 2:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        await queue.stop()
+
+    assert seen == ["job-1", "job-2"]
+    assert queue._running == {}
+    failed = get_job("job-1")
+    assert failed.status == "failed"
+    assert failed.error == "boom"
+
+
+def test_live_job_with_stale_update_not_requeued(db):
+    stale = datetime.now() - timedelta(seconds=settings.INGESTION_JOB_STALE_SECONDS + 10)
+    add_job(db, "job-1")
+    queue = IngestionQueue(workers=2)
+    assert queue._claim(0) == "job-1"
+
+    # 长时间没有进度写入，但任务仍在本进程中处理
+    db.query(IngestionJob).filter(IngestionJob.id == "job-1").update({'updated_at': stale})
+    db.commit()
+
+    assert queue._claim(1) is None
+    job = get_job("job-1")
+    assert job.status == "running"
+    assert job.attempts == 1
+    assert queue.stats['requeued'] == 0
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_refreshes_running_job(db, monkeypatch):
+    monkeypatch.setattr(settings, "INGESTION_HEARTBEAT_INTERVAL", 0.05)
+    stale = datetime.now() - timedelta(seconds=settings.INGESTION_JOB_STALE_SECONDS + 10)
+    add_job(db, "job-1")
+    queue = IngestionQueue(workers=1)
+    release = asyncio.Event()
+
+    async def run(job_id):
+        session = SessionLocal()
+        session.query(IngestionJob).filter(IngestionJob.id == job_id).update({'updated_at': stale})
+        session.commit()
+        session.close()
+        await release.wait()
+
+    monkeypatch.setattr(queue, "_run", run)
+    await queue.start()
+    try:
+        for _ in range(100):
+            job = get_job("job-1")
+            if job.status == "running" and job.updated_at > stale + timedelta(seconds=1):
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        release.set()
+        await queue.stop()
+
+    assert job.updated_at > datetime.now() - timedelta(seconds=5)
@@ -0,0 +1,89 @@
+"""
+词法索引：按集合写入日志同步其他进程的写入
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.llm_service import VectorStoreService
+
+COLLECTION = "lexical_sync_test"
+
+
+async def add(store: VectorStoreService, ids, texts):
+    await store.add_embeddings(
+        COLLECTION, ids, [[1.0, 0.0]] * len(ids), texts,
+        [{'document_id': doc_id.split("_")[0]} for doc_id in ids]
+    )
+
+
+def ids_of(results):
+    return sorted(r['id'] for r in results)
+
+
+@pytest.mark.asyncio
+async def test_lexical_index_follows_other_writers(monkeypatch):
+    writer, reader = VectorStoreService(), VectorStoreService()
+    writer.retrieval_cache = reader.retrieval_cache = None
+    await writer.delete_collection(COLLECTION)
+
+    await add(writer, ["a_0", "a_1"], ["redis 缓存淘汰", "mysql 索引"])
+    assert ids_of(await reader.search(COLLECTION, "redis", 10, mode="lexical")) == ["a_0"]
+
+    # 位置未变时不访问向量库
+    builds = []
+    monkeypatch.setattr(reader, "_build_lexical_index",
+                        lambda *args: builds.append(args) or pytest.fail("unexpected rebuild"))
+    fetched = []
+    fetch = reader._fetch_lexical_changes
+    monkeypatch.setattr(reader, "_fetch_lexical_changes", lambda *args: fetched.append(args) or fetch(*args))
+
+    await reader.search(COLLECTION, "redis", 10, mode="lexical")
+    assert fetched == []
+
+    # 其他进程写入和删除：增量同步
+    await add(writer, ["b_0"], ["redis 集群"])
+    await writer.delete_documents(COLLECTION, {"document_id": "a"})
+    assert ids_of(await reader.search(COLLECTION, "redis", 10, mode="lexical")) == ["b_0"]
+    assert len(fetched) == 1
+
+    # 本进程的写入直接更新索引，不再拉取
+    await add(reader, ["c_0"], ["redis 持久化"])
+    assert ids_of(await reader.search(COLLECTION, "redis", 10, mode="lexical")) == ["b_0", "c_0"]
+    assert len(fetched) == 1
+    assert builds == []
+
+
+@pytest.mark.asyncio
+async def test_lexical_index_rebuilds_after_log_rotation(monkeypatch):
+    writer, reader = VectorStoreService(), VectorStoreService()
+    writer.retrieval_cache = reader.retrieval_cache = None
+    await writer.delete_collection(COLLECTION)
+
+    await add(writer, ["a_0"], ["redis 缓存"])
+    assert ids_of(await reader.search(COLLECTION, "redis", 10, mode="lexical")) == ["a_0"]
+
+    monkeypatch.setattr(writer.collection_log, "max_bytes", 1)
+    await add(writer, ["b_0"], ["redis 集群"])
+    assert ids_of(await reader.search(COLLECTION, "redis", 10, mode="lexical")) == ["a_0", "b_0"]
+
+
+@pytest.mark.asyncio
+async def test_multi_collection_lexical_search_runs_concurrently(monkeypatch):
+    store = VectorStoreService()
+    store.retrieval_cache = None
+    running, peak = 0, 0
+
+    async def lexical_search(name, query, top_k, filter_dict):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return [{'id': f"{name}_0", 'document': "", 'metadata': {}, 'distance': None, 'score': 1.0}]
+
+    monkeypatch.setattr(store, "_lexical_search", lexical_search)
+    results = await store.search_many(["c1", "c2", "c3"], "redis", 5, mode="lexical")
+    assert peak == 3
+    assert sorted(r['collection'] for r in results) == ["c1", "c2", "c3"]
@@ -0,0 +1,38 @@
+"""
+LLM响应缓存：磁盘层在线程中读写
+"""
+
+import threading
+
+import pytest
+
+from app.services.llm_cache import LLMResponseCache
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_off_event_loop(tmp_path, monkeypatch):
+    cache = LLMResponseCache(max_entries=1, db_path=str(tmp_path / "cache.sqlite3"))
+    loop_thread = threading.get_ident()
+    disk_threads = []
+    for name in ("_disk_get", "_disk_set"):
+        original = getattr(cache, name)
+
+        def wrapper(*args, _original=original):
+            disk_threads.append(threading.get_ident())
+            return _original(*args)
+
+        monkeypatch.setattr(cache, name, wrapper)
+
+    await cache.set("a", "A")
+    await cache.set("b", "B")  # a 被挤出内存层
+    assert await cache.get("b") == "B"
+    assert await cache.get("a") == "A"
+    assert await cache.get("missing") is None
+
+    assert cache.stats['memory_hits'] == 1
+    assert cache.stats['disk_hits'] == 1
+    assert disk_threads and loop_thread not in disk_threads
+
+    # 其他 worker 读取同一个磁盘层
+    other = LLMResponseCache(db_path=str(tmp_path / "cache.sqlite3"))
+    assert await other.get("b") == "B"
@@ -0,0 +1,33 @@
+"""
+GLM-4 传输层：本地JWT签名
+"""
+
+import jwt
+import pytest
+
+from app.services.llm_transport import API_TOKEN_TTL_SECONDS, GLM4Transport
+
+
+def test_auth_token_signed_locally():
+    transport = GLM4Transport()
+    transport.api_key = "key-id.secret"
+
+    token = transport._headers()["Authorization"]
+    header = jwt.get_unverified_header(token)
+    assert (header["alg"], header["sign_type"]) == ("HS256", "SIGN")
+    payload = jwt.decode(token, "secret", algorithms=["HS256"], options={"verify_exp": False})
+    assert payload["api_key"] == "key-id"
+    assert payload["exp"] - payload["timestamp"] == API_TOKEN_TTL_SECONDS * 1000
+
+    # 有效期内复用，换 key 后重新签名
+    assert transport._auth_token() == token
+    transport.api_key = "other-id.secret"
+    assert jwt.decode(transport._auth_token(), "secret", algorithms=["HS256"],
+                      options={"verify_exp": False})["api_key"] == "other-id"
+
+
+def test_invalid_api_key():
+    transport = GLM4Transport()
+    transport.api_key = "no-secret"
+    with pytest.raises(Exception, match="invalid api_key"):
+        transport._auth_token()
@@ -0,0 +1,21 @@
+"""
+面试题索引：重建索引文件后已加载的实例重新加载
+"""
+
+from app.knowledge_base.question_index import QuestionIndex
+
+
+def questions(n: int):
+    return [{'id': f"q{i}", 'text': f"问题{i}", 'category': "Redis", 'difficulty': 3} for i in range(n)]
+
+
+def test_reloads_after_rebuild(tmp_path):
+    QuestionIndex.build(questions(2), [[1.0, 0.0], [0.0, 1.0]], str(tmp_path), dtype="float32")
+    index = QuestionIndex(str(tmp_path))
+    assert len(index.questions) == 2
+    assert not index.reload_if_changed()
+
+    # 紧接着重建（时间戳可能相同）
+    QuestionIndex.build(questions(3), [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]], str(tmp_path), dtype="float32")
+    assert index.reload_if_changed()
+    assert [q['id'] for q in index.search([1.0, 1.0], top_k=1)] == ["q2"]
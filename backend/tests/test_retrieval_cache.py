@@ -0,0 +1,52 @@
+"""
+检索缓存：按 document_id 过滤的检索只因这些文档的写入失效
+"""
+
+import pytest
+
+from app.core.config import get_settings
+from app.services.llm_service import VectorStoreService
+from app.services.retrieval_cache import RetrievalCache
+
+settings = get_settings()
+
+
+async def add(store: VectorStoreService, document_id: str, texts):
+    ids = [f"{document_id}_{i}" for i in range(len(texts))]
+    await store.add_embeddings(
+        settings.DOCUMENT_COLLECTION, ids, [[1.0, 0.0]] * len(ids), texts,
+        [{'document_id': document_id, 'chunk_index': i} for i in range(len(texts))]
+    )
+
+
+@pytest.mark.asyncio
+async def test_document_search_cache_scoped_to_documents(tmp_path):
+    store = VectorStoreService()
+    store.retrieval_cache = cache = RetrievalCache(versions_dir=str(tmp_path))
+    await store.delete_collection(settings.DOCUMENT_COLLECTION)
+
+    await add(store, "a", ["redis 缓存淘汰策略"])
+    await add(store, "b", ["mysql 索引优化"])
+
+    async def search():
+        return await store.search_documents(["a"], "redis 缓存", top_k=3, mode="lexical")
+
+    assert [r['id'] for r in await search()] == ["a_0"]
+    await search()
+    assert cache.stats['hits'] == 1
+
+    # 其他文档的上传和删除不影响
+    await add(store, "c", ["redis 集群"])
+    await store.delete_documents(settings.DOCUMENT_COLLECTION, {"document_id": "b"})
+    await search()
+    assert cache.stats['hits'] == 2
+
+    # 所限定文档的写入使缓存失效
+    await add(store, "a", ["redis 缓存淘汰策略", "redis 缓存穿透"])
+    assert sorted(r['id'] for r in await search()) == ["a_0", "a_1"]
+    assert cache.stats['stale'] == 1
+
+    # 集合删除后所有文档范围失效
+    await store.delete_collection(settings.DOCUMENT_COLLECTION)
+    assert await search() == []
+    assert cache.stats['stale'] == 2
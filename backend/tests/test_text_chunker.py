@@ -0,0 +1,144 @@
+"""
+流式分块：任意切分 feed 的结果与原一次性 chunk_text 相同
+"""
+
+import random
+from typing import List
+
+import pytest
+
+from app.services.document_service import TextChunker, document_parser
+
+
+def reference_chunk_text(text: str, overlap: int = 30):
+    """流式改造前的 DocumentParser.chunk_text（原样保留作对照）"""
+    chunks = []
+    max_api_length = 250  # GLM-4 embedding API 安全限制
+
+    def split_long_text(text: str, max_length: int) -> List[str]:
+        """将长文本强制分割成小块"""
+        if len(text) <= max_length:
+            return [text]
+
+        result = []
+        # 尝试按句子分割
+        sentences = text.replace('。', '\n').replace('！', '\n').replace('？', '\n').replace('.', '\n').replace('!', '\n').replace('?', '\n').split('\n')
+
+        current = ""
+        for sentence in sentences:
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+
+            if len(current) + len(sentence) + 1 <= max_length:
+                if current:
+                    current += " "
+                current += sentence
+            else:
+                if current:
+                    result.append(current)
+                # 如果单句太长，强制分割
+                if len(sentence) > max_length:
+                    for i in range(0, len(sentence), max_length):
+                        result.append(sentence[i:i+max_length])
+                else:
+                    current = sentence
+
+        if current:
+            result.append(current)
+
+        return result if result else [text[:max_length]]
+
+    # Split by paragraphs first
+    paragraphs = text.split('\n\n')
+
+    current_chunk = ""
+
+    for paragraph in paragraphs:
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+
+        # 如果段落太长，先分割段落
+        if len(paragraph) > max_api_length:
+            # 先保存当前块
+            if current_chunk:
+                chunks.append({
+                    'text': current_chunk.strip(),
+                    'size': len(current_chunk)
+                })
+                current_chunk = ""
+
+            # 分割长段落
+            sub_paragraphs = split_long_text(paragraph, max_api_length)
+            for sub in sub_paragraphs:
+                chunks.append({
+                    'text': sub.strip(),
+                    'size': len(sub)
+                })
+            continue
+
+        # 检查添加这个段落后是否会超出限制
+        new_chunk = current_chunk + ("\n\n" if current_chunk else "") + paragraph
+        if len(new_chunk) > max_api_length and current_chunk:
+            # 保存当前块
+            chunks.append({
+                'text': current_chunk.strip(),
+                'size': len(current_chunk)
+            })
+            # 开始新块（带重叠）
+            if len(current_chunk) > overlap:
+                current_chunk = current_chunk[-overlap:] + "\n\n" + paragraph
+            else:
+                current_chunk = paragraph
+        else:
+            current_chunk = new_chunk
+
+    # 保存最后一个块
+    if current_chunk:
+        chunks.append({
+            'text': current_chunk.strip()[:max_api_length],  # 确保不超出限制
+            'size': min(len(current_chunk), max_api_length)
+        })
+
+    return chunks
+
+
+def sample_text(rng: random.Random) -> str:
+    words = ["Redis", "MySQL", "索引", "缓存", "事务", "分布式锁", "goroutine", "channel"]
+    paragraphs = []
+    for _ in range(rng.randint(1, 60)):
+        sentences = []
+        for _ in range(rng.choice([1, 2, 5, 20])):
+            sentence = "".join(rng.choice(words) for _ in range(rng.choice([1, 3, 10, 80])))
+            sentences.append(sentence + rng.choice(["。", "！", "？", ".", ""]))
+        paragraphs.append("".join(sentences))
+    return "".join(p + rng.choice(["\n\n", "\n\n\n", "\n", "\n\n  "]) for p in paragraphs)
+
+
+def feed_in_pieces(text: str, rng: random.Random):
+    chunker = TextChunker()
+    chunks = []
+    position = 0
+    while position < len(text):
+        size = rng.choice([1, 2, 7, 100, 1000])
+        chunks.extend(chunker.feed(text[position:position + size]))
+        position += size
+    return chunks + chunker.finish()
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_streaming_matches_chunk_text(seed):
+    rng = random.Random(seed)
+    text = sample_text(rng)
+    expected = reference_chunk_text(text)
+
+    assert document_parser.chunk_text(text) == expected
+    assert feed_in_pieces(text, rng) == expected
+
+
+def test_page_boundaries():
+    pages = ["第一页 Redis 持久化。\n\n", "RDB 与 AOF", " 的区别。\n\n第二段", "\n\n"]
+    chunker = TextChunker()
+    chunks = [c for page in pages for c in chunker.feed(page)] + chunker.finish()
+    assert chunks == reference_chunk_text("".join(pages))
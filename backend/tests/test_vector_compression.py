@@ -0,0 +1,79 @@
+"""
+压缩向量索引：并发写入/检索、后台重训
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.vector_compression import CompressedVectorIndex, normalize
+
+
+def vectors(count: int, dim: int = 32, seed: int = 0) -> np.ndarray:
+    return normalize(np.random.default_rng(seed).standard_normal((count, dim)))
+
+
+@pytest.mark.parametrize("method", ["int8", "pq"])
+def test_concurrent_search_during_add(tmp_path, method):
+    writer = CompressedVectorIndex(str(tmp_path / "index"), method)
+    reader = CompressedVectorIndex(str(tmp_path / "index"), method)  # 另一个 worker
+    writer.add([f"seed-{i}" for i in range(64)], vectors(64))
+
+    errors = []
+    stop = threading.Event()
+
+    def search(index):
+        rng = np.random.default_rng()
+        while not stop.is_set():
+            try:
+                for doc_id, score in index.search(rng.standard_normal(32), top_k=5):
+                    assert doc_id.startswith(("seed-", "batch-"))
+                    assert -1.01 <= score <= 1.01
+                _, _, _, ids, row_of, live, codes = index._snapshot()
+                assert len(ids) == len(live) == len(codes)
+                assert all(row < len(ids) for row in row_of.values())
+            except Exception as e:  # noqa: BLE001 - 收集到主线程断言
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=search, args=(index,)) for index in [writer, reader] * 4]
+    for t in threads:
+        t.start()
+    try:
+        for batch in range(40):
+            writer.add([f"batch-{batch}-{i}" for i in range(8)], vectors(8, seed=batch + 1))
+            if batch % 10 == 0:
+                writer.remove([f"batch-{batch}-0"])
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+    assert errors == []
+    reader.refresh()
+    assert len(reader) == len(writer) == 64 + 40 * 8 - 4
+
+
+def test_retrain_keeps_concurrent_writes(tmp_path, monkeypatch):
+    from app.services import vector_compression
+
+    monkeypatch.setattr(vector_compression.settings, "PQ_TRAIN_SIZE", 10000)
+    index = CompressedVectorIndex(str(tmp_path / "index"), "int8")
+    data = vectors(400)
+    index.add([f"a-{i}" for i in range(100)], data[:100])
+    assert index.trained_on == 100
+
+    # 写入达到训练样本4倍时在后台重训
+    index.add([f"a-{i}" for i in range(100, 400)], data[100:])
+    index.remove(["a-0", "a-1"])
+    index.add(["a-2"], data[2:3])
+    index._retrain_thread.join()
+    index.retrain()  # 同步重训：清理已删除的行
+
+    assert index.trained_on == 398
+    assert len(index) == len(index.ids) == 398
+    for i in (2, 3, 399):
+        assert index.search(data[i], top_k=1)[0][0] == f"a-{i}"
+    found = {doc_id for doc_id, _ in index.search(data[0], top_k=400)}
+    assert "a-0" not in found and "a-1" not in found
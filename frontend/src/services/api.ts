@@ -22,6 +22,7 @@ export const documentApi = {
     }
   }),
   getAll: () => api.get('/documents'),
+  getStatus: (id: string) => api.get(`/documents/${id}/status`),
   delete: (id: string) => api.delete(`/documents/${id}`),
 }
 
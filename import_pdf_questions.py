@@ -22,13 +22,10 @@ from typing import List, Dict, Any
 
 # 添加backend到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
 
-try:
-    import PyPDF2
-except ImportError:
-    print("❌ 错误: 需要安装PyPDF2")
-    print("   pip install PyPDF2")
-    sys.exit(1)
+# pdfplumber / PyPDF2 都未安装时由 pdf_extractor 报错
+from app.services.pdf_extractor import get_pdf_extractor
 
 
 def clean_text(text: str) -> str:
@@ -56,70 +53,62 @@ def extract_questions_from_pdf(pdf_path: str) -> List[Dict[str, Any]]:
     questions = []
     
     try:
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            
-            print(f"📖 正在解析: {os.path.basename(pdf_path)} ({len(pdf_reader.pages)} 页)")
+        # 进程池按页并行提取（PyPDF2 为主、pdfplumber 回退，单页失败不影响其他页）
+        pages = get_pdf_extractor().extract_pages(pdf_path, engines=("pypdf2", "pdfplumber"))
+        
+        print(f"📖 正在解析: {os.path.basename(pdf_path)} ({len(pages)} 页)")
+        
+        # 提取所有文本
+        full_text = "".join(text + "\n" for text in pages if text)
+        
+        # 清洗文本
+        full_text = clean_text(full_text)
+        
+        # 识别题目模式
+        # 模式1: 包含问号/问号的行
+        # 模式2: 以数字/字母编号开头的问题
+        # 模式3: 包含特定关键词的问题
+        
+        lines = full_text.split('\n')
+        
+        for i, line in enumerate(lines):
+            line = line.strip()
+            if not line:
+                continue
             
-            # 提取所有文本
-            full_text = ""
-            for page_num, page in enumerate(pdf_reader.pages):
-                try:
-                    text = page.extract_text()
-                    if text:
-                        full_text += text + "\n"
-                except Exception as e:
-                    print(f"   ⚠️  第 {page_num + 1} 页解析失败: {e}")
-                    continue
+            # 识别题目
+            is_question = False
             
-            # 清洗文本
-            full_text = clean_text(full_text)
+            # 模式1: 包含问号
+            if '?' in line or '？' in line:
+                if 15 <= len(line) <= 200:
+                    is_question = True
             
-            # 识别题目模式
-            # 模式1: 包含问号/问号的行
-            # 模式2: 以数字/字母编号开头的问题
-            # 模式3: 包含特定关键词的问题
+            # 模式2: 以数字/字母编号开头
+            elif re.match(r'^(\d+[.．、]|[(（]?\d+[)）]?|[A-Za-z][.．、])', line):
+                if 15 <= len(line) <= 200 and ('是' in line or '什么' in line or '怎么' in line or '如何' in line):
+                    is_question = True
             
-            lines = full_text.split('\n')
+            # 模式3: 包含面试题关键词
+            elif re.search(r'(什么是|为什么|请解释|请描述|如何|怎么|介绍)', line):
+                if 15 <= len(line) <= 200:
+                    is_question = True
             
-            for i, line in enumerate(lines):
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # 识别题目
-                is_question = False
-                
-                # 模式1: 包含问号
-                if '?' in line or '？' in line:
-                    if 15 <= len(line) <= 200:
-                        is_question = True
+            if is_question:
+                # 尝试分类
+                category = classify_question(line)
                 
-                # 模式2: 以数字/字母编号开头
-                elif re.match(r'^(\d+[.．、]|[(（]?\d+[)）]?|[A-Za-z][.．、])', line):
-                    if 15 <= len(line) <= 200 and ('是' in line or '什么' in line or '怎么' in line or '如何' in line):
-                        is_question = True
-                
-                # 模式3: 包含面试题关键词
-                elif re.search(r'(什么是|为什么|请解释|请描述|如何|怎么|介绍)', line):
-                    if 15 <= len(line) <= 200:
-                        is_question = True
+                # 生成题目对象
+                question = {
+                    'id': f"pdf_{len(questions)}",
+                    'text': line[:150],
+                    'category': category,
+                    'difficulty': 3,  # 默认中等难度
+                    'type': 'technical',
+                    'source': os.path.basename(pdf_path)
+                }
                 
-                if is_question:
-                    # 尝试分类
-                    category = classify_question(line)
-                    
-                    # 生成题目对象
-                    question = {
-                        'id': f"pdf_{len(questions)}",
-                        'text': line[:150],
-                        'category': category,
-                        'difficulty': 3,  # 默认中等难度
-                        'type': 'technical',
-                        'source': os.path.basename(pdf_path)
-                    }
-                    
-                    questions.append(question)
+                questions.append(question)
     
     except Exception as e:
         print(f"❌ 解析失败 {pdf_path}: {e}")